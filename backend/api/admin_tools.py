@@ -0,0 +1,104 @@
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Фильтр по внешнему ключу с поиском через автодополнение админки:
+    варианты подгружаются по мере ввода, а не перечислением всей таблицы.
+    Модель, на которую ссылается ключ, должна иметь search_fields
+    """
+    template = 'api/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = '{}__{}__exact'.format(
+            field_path, field.target_field.attname
+        )
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.clear_query_string = ''
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        self.clear_query_string = changelist.get_query_string(
+            remove=[self.lookup_kwarg]
+        )
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': self.clear_query_string,
+            'display': 'Все',
+        }
+
+    def rendered_widget(self):
+        return self.form_field.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={
+                'id': f'autocomplete-filter-{self.field_path}',
+                'data-clear-url': self.clear_query_string,
+                'style': 'width: 100%',
+            },
+        )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, берущий для больших таблиц без фильтров оценку числа
+    строк из статистики PostgreSQL вместо COUNT(*) по всей таблице
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where:
+            return super().count
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+        if estimate < getattr(settings, 'ADMIN_ESTIMATED_COUNT_MIN', 10000):
+            return super().count
+        return estimate
+
+
+class FastChangeListMixin:
+    """
+    Настройки списка объектов для больших таблиц: оценочный подсчет
+    строк, без отдельного подсчета всей таблицы, скрипты для
+    AutocompleteFilter
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=('api/js/autocomplete_filter.js',))
+        )
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from recipes.purge import purge_backlog
+
+        from . import metrics, signals  # noqa: F401
+        metrics.register_collector('purge_backlog', purge_backlog)
@@ -1,20 +1,43 @@
+from django.db.models import F
 from django_filters import rest_framework as filters
-from recipes.models import Recipe
+from recipes.models import Ingredient, Recipe
+from recipes.search import search_ingredients
+
+SCORE_ORDERING = {
+    'popular': 'score__popularity',
+    'trending': 'score__trending',
+}
+NUTRITION_ORDERING = {
+    'kcal': F('kcal').asc(nulls_last=True),
+    '-kcal': F('kcal').desc(nulls_last=True),
+}
 
 
 class RecipeFilter(filters.FilterSet):
     """
     Фильтр для рецептов по тегам, авторам, наличию в избранном и списке покупок
+    и калорийности с сортировкой по популярности, трендовости и калорийности
     """
     tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    min_kcal = filters.NumberFilter(field_name='kcal', lookup_expr='gte')
+    max_kcal = filters.NumberFilter(field_name='kcal', lookup_expr='lte')
+    ordering = filters.ChoiceFilter(
+        choices=[
+            (value, value) for value in (*SCORE_ORDERING, *NUTRITION_ORDERING)
+        ],
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+            'min_kcal', 'max_kcal', 'ordering'
+        )
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -25,3 +48,28 @@ class RecipeFilter(filters.FilterSet):
         if self.request.user.is_authenticated and value:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def get_ordering(self, queryset, name, value):
+        if value in NUTRITION_ORDERING:
+            return queryset.order_by(NUTRITION_ORDERING[value], '-pub_date')
+        # внутреннее соединение и порядок только по колонкам RecipeScore:
+        # запрос идет по составному индексу оценки и останавливается
+        # на размере страницы
+        return queryset.filter(score__isnull=False).order_by(
+            f'-{SCORE_ORDERING[value]}', '-score__recipe_id'
+        )
+
+
+class IngredientFilter(filters.FilterSet):
+    """
+    Нечеткий поиск ингредиентов по названию с учетом опечаток,
+    транслитерации и раскладки клавиатуры
+    """
+    name = filters.CharFilter(method='search_name')
+
+    class Meta:
+        model = Ingredient
+        fields = ('name',)
+
+    def search_name(self, queryset, name, value):
+        return search_ingredients(value, queryset=queryset)
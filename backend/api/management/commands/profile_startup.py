@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME_PREFIX = 'import time:'
+STARTUP_CODE = (
+    'from foodgram.wsgi import application\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().reverse_dict\n'
+)
+WARMUP_CODE = (
+    'from foodgram.wsgi import application\n'
+    'from foodgram.warmup import warm_up_master\n'
+    'warm_up_master()\n'
+)
+
+
+def parse_import_times(output):
+    """
+    Строки python -X importtime в кортежи
+    (модуль, собственное время, время с вложенными импортами) в мкс
+    """
+    for line in output.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        own, cumulative, name = line[len(IMPORT_TIME_PREFIX):].split('|')
+        if not own.strip().isdigit():
+            continue
+        yield name.strip(), int(own), int(cumulative)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает приложение в отдельном процессе с python -X importtime '
+        'и показывает самые медленные импорты и пакеты'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=25,
+            help='Количество строк в отчете',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=('self', 'cumulative'),
+            default='cumulative',
+            help='Сортировка модулей: собственное время или с вложенными',
+        )
+        parser.add_argument(
+            '--warmup',
+            action='store_true',
+            help='Профилировать полный прогрев, как в мастере gunicorn',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [
+                sys.executable, '-X', 'importtime', '-c',
+                WARMUP_CODE if options['warmup'] else STARTUP_CODE,
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        times = list(parse_import_times(result.stderr))
+        packages = Counter()
+        for name, own, _ in times:
+            packages[name.split('.')[0]] += own
+        total = sum(packages.values())
+        limit = options['limit']
+        column = 1 if options['sort'] == 'self' else 2
+        self.stdout.write(
+            f'Импортировано модулей: {len(times)}, '
+            f'всего {total / 1000:.1f} мс\n'
+        )
+        self.stdout.write('Модули (собственное / с вложенными, мс):')
+        for name, own, cumulative in sorted(
+            times, key=lambda item: item[column], reverse=True
+        )[:limit]:
+            self.stdout.write(
+                f'{own / 1000:9.1f} {cumulative / 1000:9.1f}  {name}'
+            )
+        self.stdout.write('\nПакеты (собственное время модулей, мс):')
+        for name, own in packages.most_common(limit):
+            self.stdout.write(
+                f'{own / 1000:9.1f} {own / total:6.1%}  {name}'
+            )
@@ -0,0 +1,36 @@
+import threading
+from collections import Counter
+
+counters = Counter()
+gauges = {}
+collectors = {}
+lock = threading.Lock()
+
+
+def increment(name, value=1):
+    """
+    Увеличение счетчика метрики текущего процесса
+    """
+    with lock:
+        counters[name] += value
+
+
+def set_gauge(name, value):
+    with lock:
+        gauges[name] = value
+
+
+def register_collector(name, func):
+    """
+    Метрика, вычисляемая при каждом снимке (например, по данным БД),
+    общая для всех процессов
+    """
+    collectors[name] = func
+
+
+def snapshot():
+    with lock:
+        data = {'counters': dict(counters), 'gauges': dict(gauges)}
+    for name, func in collectors.items():
+        data['gauges'][name] = func()
+    return data
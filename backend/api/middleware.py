@@ -0,0 +1,159 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+from recipes.catalog import get_catalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_CONTENT_TYPES = (
+    'image/', 'video/', 'audio/', 'font/woff',
+    'application/zip', 'application/gzip', 'application/pdf',
+    'application/octet-stream',
+)
+
+
+def parse_accept_encoding(header):
+    """
+    Множество кодировок из Accept-Encoding, разрешенных клиентом (q > 0)
+    """
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def brotli_compress_sequence(sequence):
+    compressor = brotli.Compressor()
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов в br или gzip по Accept-Encoding: с порогом размера,
+    потоковым сжатием StreamingHttpResponse, пропуском уже сжатых типов
+    и кешированием сжатых справочных ответов (теги, ингредиенты).
+    Ключ кеша содержит версию актуального снимка каталога, которую
+    get_catalog сверяет с меткой версии без запросов к БД: изменение
+    справочников в любом процессе сбрасывает сжатые копии во всех
+    остальных. Пока снимка нет или он отстал, ответы не кешируются
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 200)
+        self.use_brotli = (
+            brotli is not None
+            and getattr(settings, 'COMPRESSION_BROTLI', True)
+        )
+        self.cached_paths = tuple(
+            getattr(settings, 'COMPRESSION_CACHED_PATHS', ())
+        )
+        self.cache_timeout = getattr(
+            settings, 'COMPRESSION_CACHE_TIMEOUT', 60 * 60
+        )
+
+    def __call__(self, request):
+        encoding = self.get_encoding(request)
+        cache_key = self.get_cache_key(request, encoding)
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return self.build_cached_response(encoding, *cached)
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = self.compress_sequence(
+                response.streaming_content, encoding
+            )
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            content = self.compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+            if cache_key is not None and response.status_code == 200:
+                cache.set(
+                    cache_key,
+                    (content, response['Content-Type']),
+                    self.cache_timeout
+                )
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def get_encoding(self, request):
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if self.use_brotli and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def get_cache_key(self, request, encoding):
+        if (
+            encoding is None
+            or request.method != 'GET'
+            or not request.path.startswith(self.cached_paths)
+        ):
+            return None
+        catalog = get_catalog()
+        if catalog is None:
+            return None
+        return 'compressed_response:{}:{}:{}:{}'.format(
+            catalog.version,
+            encoding,
+            request.META.get('HTTP_ACCEPT', ''),
+            request.get_full_path(),
+        )
+
+    def build_cached_response(self, encoding, content, content_type):
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if response.get('Content-Type', '').startswith(
+            COMPRESSED_CONTENT_TYPES
+        ):
+            return False
+        return response.streaming or len(response.content) >= self.min_size
+
+    def compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content)
+        return compress_string(content)
+
+    def compress_sequence(self, sequence, encoding):
+        if encoding == 'br':
+            return brotli_compress_sequence(sequence)
+        return compress_sequence(sequence)
@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+from users.models import User
+
+
+class IdempotencyKey(models.Model):
+    """
+    Ответ на изменяющий запрос с заголовком Idempotency-Key. Пока запрос
+    выполняется, статус пустой: строка в БД служит блокировкой ключа
+    для всех процессов сервера
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пользователь'
+    )
+    key = models.CharField(
+        max_length=64,
+        verbose_name='Хеш ключа'
+    )
+    fingerprint = models.CharField(
+        max_length=64,
+        verbose_name='Хеш запроса'
+    )
+    status = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Код ответа'
+    )
+    data = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Тело ответа'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Создан'
+    )
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='unique_idempotency_key'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.key} ({self.status})'
@@ -0,0 +1,39 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.catalog import invalidate_catalog
+from recipes.models import Ingredient, Tag
+from recipes.search import set_similarity_threshold
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .v1.authentication import invalidate_token, invalidate_user
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def reset_reference_cache(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    set_similarity_threshold(connection)
+
+
+@receiver(post_delete, sender=Token)
+def reset_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def reset_cached_user(
+    sender, instance, created=False, update_fields=None, **kwargs
+):
+    # у нового пользователя нет кешированных токенов, вход меняет
+    # только last_login
+    if created or (
+        update_fields is not None and not set(update_fields) - {'last_login'}
+    ):
+        return
+    invalidate_user(instance.pk)
@@ -0,0 +1,14 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(function() {
+        $('.autocomplete-filter select').on('change', function() {
+            const url = new URL(this.dataset.clearUrl, window.location.href);
+            if (this.value) {
+                url.searchParams.set(this.name, this.value);
+            }
+            window.location.href = url.toString();
+        });
+    });
+}
@@ -0,0 +1,81 @@
+import copy
+import threading
+import time
+
+from api import metrics
+from api.cache import TTLCache
+from django.conf import settings
+from recipes.models import Checkpoint
+from rest_framework.authentication import TokenAuthentication
+
+REVOCATION_CHECKPOINT = 'auth.revocations'
+token_cache = TTLCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+revocation_state = {'version': None, 'checked_at': None}
+revocation_lock = threading.Lock()
+
+
+def mark_revoked():
+    """
+    Отметка отзыва в БД в транзакции изменения: по ней остальные
+    процессы сбрасывают свои кеши токенов
+    """
+    Checkpoint.objects.update_or_create(
+        name=REVOCATION_CHECKPOINT, defaults={'position': time.time_ns()}
+    )
+
+
+def sync_revocations():
+    """
+    Сброс кеша токенов, если с прошлой проверки в любом процессе
+    отзывали токен или меняли пользователя. БД проверяется не чаще
+    раза в TOKEN_CACHE_CHECK_INTERVAL секунд
+    """
+    interval = getattr(settings, 'TOKEN_CACHE_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    checked_at = revocation_state['checked_at']
+    if checked_at is not None and now - checked_at < interval:
+        return
+    with revocation_lock:
+        checked_at = revocation_state['checked_at']
+        if checked_at is not None and now - checked_at < interval:
+            return
+        version = Checkpoint.objects.filter(
+            name=REVOCATION_CHECKPOINT
+        ).values_list('position', flat=True).first() or 0
+        if version != revocation_state['version']:
+            token_cache.clear()
+            revocation_state['version'] = version
+        revocation_state['checked_at'] = now
+
+
+def invalidate_token(key):
+    token_cache.pop(key)
+    mark_revoked()
+
+
+def invalidate_user(user_id):
+    token_cache.discard_if(lambda credentials: credentials[0].pk == user_id)
+    mark_revoked()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кешем токен -> пользователь в памяти
+    процесса, чтобы не ходить в БД на каждый запрос. Отзыв токена или
+    деактивация пользователя в другом процессе сбрасывает кеш не позже
+    чем через TOKEN_CACHE_CHECK_INTERVAL секунд
+    """
+    def authenticate_credentials(self, key):
+        sync_revocations()
+        credentials = token_cache.get(key)
+        if credentials is None:
+            metrics.increment('token_cache.miss')
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        else:
+            metrics.increment('token_cache.hit')
+        user, token = credentials
+        return copy.copy(user), token
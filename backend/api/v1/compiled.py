@@ -0,0 +1,214 @@
+"""
+Быстрый путь чтения: словари строятся напрямую из загруженных
+(prefetch) объектов, без обхода полей ModelSerializer.
+Результат совпадает с GetRecipeSerializer, RecipeShortSerializer
+и UsersSerializer.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from recipes.catalog import get_catalog
+from recipes.models import NUTRIENTS, Favorite, ShoppingCart
+from recipes.units import scale_amount
+from users.models import Follow
+
+
+def image_url(image, request):
+    if not image:
+        return None
+    try:
+        url = image.url
+    except AttributeError:
+        return None
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_user(context):
+    request = context.get('request')
+    if request is None or request.user.is_anonymous:
+        return None
+    return request.user
+
+
+def subscribed_ids(context):
+    """
+    Id авторов, на которых подписан пользователь: один запрос на контекст
+    """
+    if '_subscribed_ids' not in context:
+        context['_subscribed_ids'] = set(
+            Follow.objects.filter(
+                user=get_user(context)
+            ).values_list('author_id', flat=True)
+        )
+    return context['_subscribed_ids']
+
+
+def user_to_dict(user, context):
+    if get_user(context) is None:
+        is_subscribed = False
+    elif hasattr(user, 'is_subscribed'):
+        is_subscribed = user.is_subscribed
+    else:
+        is_subscribed = user.id in subscribed_ids(context)
+    return {
+        'email': user.email,
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_subscribed': is_subscribed,
+    }
+
+
+def recipe_short_to_dict(recipe, context):
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'image': image_url(recipe.image, context.get('request')),
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def tag_to_dict(tag):
+    return {
+        'id': tag.id,
+        'name': tag.name,
+        'color': tag.color,
+        'slug': tag.slug,
+    }
+
+
+def ingredient_to_dict(ingredient_id, item=None, catalog=None):
+    """
+    Ингредиент из снимка каталога, если он есть, иначе из загруженного
+    объекта IngredientsInRecipe
+    """
+    if catalog is not None:
+        ingredient = catalog.ingredient(ingredient_id)
+        if ingredient is not None:
+            return ingredient
+    ingredient = item.ingredient
+    return {
+        'id': ingredient.id,
+        'name': ingredient.name,
+        'measurement_unit': ingredient.measurement_unit,
+    }
+
+
+def nutrition_to_dict(recipe, factor=1):
+    """
+    Пищевая ценность рецепта на все порции, None - нет данных
+    ни по одному ингредиенту
+    """
+    if recipe.kcal is None:
+        return None
+    return {
+        name: round((getattr(recipe, name) or 0) * factor, 1)
+        for name in NUTRIENTS
+    }
+
+
+def recipe_to_dict(recipe, context):
+    user = get_user(context)
+    if user is None:
+        is_favorited = is_in_shopping_cart = False
+    else:
+        is_favorited = (
+            recipe.is_favorited if hasattr(recipe, 'is_favorited')
+            else Favorite.objects.filter(user=user, recipe=recipe).exists()
+        )
+        is_in_shopping_cart = (
+            recipe.is_in_shopping_cart
+            if hasattr(recipe, 'is_in_shopping_cart')
+            else ShoppingCart.objects.filter(
+                user=user, recipe=recipe
+            ).exists()
+        )
+    catalog = get_catalog()
+    return {
+        'id': recipe.id,
+        'tags': [tag_to_dict(tag) for tag in recipe.tags.all()],
+        'author': user_to_dict(recipe.author, context),
+        'ingredients': [
+            {
+                **ingredient_to_dict(item.ingredient_id, item, catalog),
+                'amount': item.amount,
+            }
+            for item in recipe.ingridients_in_recipe.all()
+        ],
+        'is_favorited': is_favorited,
+        'is_in_shopping_cart': is_in_shopping_cart,
+        'name': recipe.name,
+        'image': image_url(recipe.image, context.get('request')),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'servings': recipe.servings,
+        'nutrition': nutrition_to_dict(recipe),
+    }
+
+
+def scaled_amounts(recipe, servings):
+    """
+    Количества ингредиентов рецепта на servings порций по id ингредиента.
+    Ключ кеша - хеш самого состава (ингредиент, количество, единица)
+    и порций, поэтому измененный рецепт сразу получает новый ключ во всех
+    процессах без сброса кеша и без гонки с незавершенной транзакцией
+    записи, а старые значения истекают сами
+    """
+    catalog = get_catalog()
+    rows = sorted(
+        (
+            item.ingredient_id,
+            item.amount,
+            ingredient_to_dict(
+                item.ingredient_id, item, catalog
+            )['measurement_unit'],
+        )
+        for item in recipe.ingridients_in_recipe.all()
+    )
+    digest = hashlib.sha256(
+        repr((rows, recipe.servings, servings)).encode()
+    ).hexdigest()
+    key = f'recipe_scaled:{digest}'
+    amounts = cache.get(key)
+    if amounts is None:
+        factor = servings / recipe.servings
+        amounts = {
+            ingredient_id: scale_amount(amount, unit, factor)
+            for ingredient_id, amount, unit in rows
+        }
+        cache.set(
+            key,
+            amounts,
+            getattr(settings, 'SCALED_RECIPE_CACHE_TIMEOUT', 60 * 60)
+        )
+    return amounts
+
+
+def apply_servings(data, recipe, servings):
+    """
+    Подстановка количеств на servings порций в готовое представление
+    рецепта (полное или компактное). Ингредиент, которого нет среди
+    строк рецепта, пересчитывается по своему количеству
+    """
+    if 'ingredients' in data:
+        amounts = scaled_amounts(recipe, servings)
+        for item in data['ingredients']:
+            amount = amounts.get(item['id'])
+            if amount is None:
+                amount = scale_amount(
+                    item['amount'],
+                    item.get('measurement_unit', ''),
+                    servings / recipe.servings,
+                )
+            item['amount'] = amount
+    if 'servings' in data:
+        data['servings'] = servings
+    if 'nutrition' in data:
+        data['nutrition'] = nutrition_to_dict(
+            recipe, servings / recipe.servings
+        )
+    return data
@@ -0,0 +1,188 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from api.models import IdempotencyKey
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import RawPostDataException
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+def parse_list_param(request, name):
+    """
+    Разбор параметра запроса вида ?name=a,b,c в кортеж значений
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return tuple(item.strip() for item in value.split(',') if item.strip())
+
+
+class SparseFieldsetViewMixin:
+    """
+    Миксин вьюсета с выборочными полями (?fields=, ?expand=)
+    и компактным режимом (?compact=1) для чтения
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    @property
+    def is_sparse_action(self):
+        return self.action in self.sparse_actions
+
+    @property
+    def requested_fields(self):
+        if not self.is_sparse_action:
+            return None
+        return parse_list_param(self.request, 'fields')
+
+    @property
+    def expanded_fields(self):
+        if not self.is_sparse_action:
+            return ()
+        return parse_list_param(self.request, 'expand') or ()
+
+    @property
+    def is_compact(self):
+        return (
+            self.is_sparse_action
+            and self.request.query_params.get('compact') in ('1', 'true')
+        )
+
+    def is_field_requested(self, name):
+        fields = self.requested_fields
+        return fields is None or name in fields or name in self.expanded_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.requested_fields
+        if fields is not None:
+            context['fields'] = fields + self.expanded_fields
+        context['expand'] = self.expanded_fields
+        context['compact'] = self.is_compact
+        return context
+
+    def get_included(self, objects):
+        """
+        Справочники связанных объектов для компактного режима
+        """
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_compact:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = list(queryset) if page is None else page
+        data = self.get_serializer(objects, many=True).data
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response({'results': data})
+        response.data['included'] = self.get_included(objects)
+        return response
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    try:
+        digest.update(request.body)
+    except RawPostDataException:
+        pass
+    return digest.hexdigest()
+
+
+class IdempotencyKeyMixin:
+    """
+    Миксин вьюсета с заголовком Idempotency-Key для изменяющих запросов:
+    ответ на первый запрос сохраняется в БД, повтор с тем же ключом
+    (в том числе пришедший в другой процесс) получает его без повторного
+    выполнения, а одновременный повтор - 409
+    """
+    idempotency_header = 'Idempotency-Key'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(self.idempotency_header)
+        if (
+            key
+            and request.method not in SAFE_METHODS
+            and request.user.is_authenticated
+        ):
+            method = request.method.lower()
+            setattr(self, method, self.idempotent(getattr(self, method), key))
+
+    def acquire_key(self, key, fingerprint):
+        """
+        Захват ключа вставкой строки без ответа. Строки старше
+        IDEMPOTENCY_KEY_TTL и зависшие дольше IDEMPOTENCY_LOCK_TIMEOUT
+        блокировки пользователя удаляются. Возвращает строку ключа
+        и признак захвата, None - ключ освободился между запросами
+        """
+        user = self.request.user
+        now = timezone.now()
+        IdempotencyKey.objects.filter(
+            Q(created_at__lt=now - timedelta(seconds=getattr(
+                settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24
+            )))
+            | Q(key=key, status__isnull=True, created_at__lt=now - timedelta(
+                seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+            )),
+            user=user,
+        ).delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user, key=key, fingerprint=fingerprint
+                ), True
+        except IntegrityError:
+            return IdempotencyKey.objects.filter(
+                user=user, key=key
+            ).first(), False
+
+    def idempotent(self, handler, key):
+        key = hashlib.sha256(key.encode()).hexdigest()
+        fingerprint = request_fingerprint(self.request)
+
+        @wraps(handler)
+        def wrapper(request, *args, **kwargs):
+            stored, acquired = self.acquire_key(key, fingerprint)
+            if not acquired:
+                if stored is None or stored.status is None:
+                    return Response(
+                        {'detail': 'Запрос с этим ключом еще выполняется'},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return self.replay(stored, fingerprint)
+            try:
+                response = handler(request, *args, **kwargs)
+            except BaseException:
+                stored.delete()
+                raise
+            if response.status_code >= 500:
+                stored.delete()
+                return response
+            stored.status = response.status_code
+            stored.data = response.data
+            stored.save(update_fields=('status', 'data'))
+            return response
+        return wrapper
+
+    def replay(self, stored, fingerprint):
+        if stored.fingerprint != fingerprint:
+            return Response(
+                {'detail': (
+                    'Ключ идемпотентности уже использован '
+                    'для другого запроса'
+                )},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        response = Response(stored.data, status=stored.status)
+        response['Idempotent-Replayed'] = 'true'
+        return response
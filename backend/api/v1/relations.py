@@ -0,0 +1,125 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+
+
+def parse_id(value):
+    """
+    Идентификатор объекта из URL, нечисловой id - это 404, а не ошибка БД
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise NotFound()
+
+
+def insert_link(model, user, field_name, target_id, returning=(),
+                update=False, **computed):
+    """
+    Связь пользователя с объектом (избранное, список покупок, подписка)
+    через INSERT ... SELECT ... ON CONFLICT: повторная или параллельная
+    вставка не упирается в уникальное ограничение, а для несуществующего
+    или помеченного на удаление объекта строка не вставляется.
+    computed - значения полей в виде (SQL-выражение над строкой объекта,
+    параметры), остальные поля получают значения по умолчанию; при
+    update=True computed перезаписываются и у существующей связи.
+    returning - колонки объекта, нужные ответу: в PostgreSQL они
+    читаются тем же запросом, что и вставка.
+    Возвращает признак добавления строки и словарь колонок объекта,
+    None - объекта нет
+    """
+    quote = connection.ops.quote_name
+    target = model._meta.get_field(field_name)
+    target_table = quote(target.related_model._meta.db_table)
+    target_pk = quote(target.target_field.column)
+    user_column = model._meta.get_field('user').column
+    columns = [user_column, target.column]
+    values = ['%s', target_pk]
+    params = [user.id]
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.name in ('user', field_name):
+            continue
+        columns.append(field.column)
+        if field.name in computed:
+            expression, expression_params = computed[field.name]
+            values.append(expression)
+            params.extend(expression_params)
+        else:
+            values.append('%s')
+            params.append(field.get_db_prep_save(
+                field.get_default(), connection
+            ))
+    params.append(target_id)
+    where = f'{target_pk} = %s'
+    if any(
+        field.name == 'deleted_at'
+        for field in target.related_model._meta.concrete_fields
+    ):
+        where += f' AND {quote("deleted_at")} IS NULL'
+    insert = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(column) for column in columns)}) '
+        f'SELECT {", ".join(values)} FROM {target_table} WHERE {where} '
+    )
+    selected = ''.join(f', {quote(column)}' for column in returning)
+    if connection.vendor == 'postgresql':
+        if update and computed:
+            conflict = (
+                f'ON CONFLICT ({quote(user_column)}, {quote(target.column)}) '
+                'DO UPDATE SET ' + ', '.join(
+                    f'{quote(column)} = EXCLUDED.{quote(column)}'
+                    for column in (
+                        model._meta.get_field(name).column
+                        for name in computed
+                    )
+                )
+            )
+        else:
+            conflict = 'ON CONFLICT DO NOTHING'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH link AS ({insert}{conflict} '
+                f'RETURNING (xmax = 0) AS created) '
+                f'SELECT (SELECT created FROM link){selected} '
+                f'FROM {target_table} WHERE {where}',
+                [*params, target_id],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return False, None
+        return bool(row[0]), dict(zip(returning, row[1:]))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT 1{selected} FROM {target_table} WHERE {where}',
+            [target_id],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return False, None
+        cursor.execute(f'{insert}ON CONFLICT DO NOTHING', params)
+        created = cursor.rowcount > 0
+    if not created and update and computed:
+        model.objects.filter(user=user, **{field_name: target_id}).update(**{
+            name: RawSQL(
+                f'SELECT {expression} FROM {target_table} '
+                f'WHERE {target_pk} = %s',
+                [*expression_params, target_id],
+            )
+            for name, (expression, expression_params) in computed.items()
+        })
+    return created, dict(zip(returning, row[1:]))
+
+
+def delete_link(model, user, field_name, target_id):
+    """
+    Удаление связи одним DELETE ... WHERE без предварительной выборки
+    объекта и связи, возвращает число удаленных строк. Связи с помеченными
+    на удаление объектами не трогаются: счетчики по ним уже уменьшены,
+    строки удалит фоновая очистка
+    """
+    deleted, _ = model.objects.filter(
+        user=user, **{
+            field_name: target_id, f'{field_name}__deleted_at__isnull': True
+        }
+    ).delete()
+    return deleted
@@ -1,16 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+from events.models import Event
+from events.rollups import ROLLUPS
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipes.catalog import get_catalog
+from recipes.models import (MAX_SERVINGS, AuthorStats, Favorite, Ingredient,
+                            IngredientsInRecipe, MealPlan, PantryItem, Recipe,
                             ShoppingCart, Tag)
+from recipes.nutrition import refresh_recipe_nutrition
+from recipes.scores import ensure_recipe_scores
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
-from rest_framework.validators import UniqueTogetherValidator
 from users.models import Follow, User
 
+from . import compiled
+
+
+class SparseFieldsetMixin:
+    """
+    Миксин сериализатора, оставляющий только запрошенные поля
+    и подменяющий связи компактным представлением
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        context = kwargs.get('context') or {}
+        fields = context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if context.get('compact'):
+            expand = context.get('expand') or ()
+            for name, field in self.get_compact_fields().items():
+                if name in self.fields and name not in expand:
+                    self.fields[name] = field
+
+    def get_compact_fields(self):
+        return {}
+
+    @property
+    def is_sparse(self):
+        return (
+            self.context.get('fields') is not None
+            or bool(self.context.get('compact'))
+        )
+
 
-class UsersSerializer(UserSerializer):
+class UsersSerializer(SparseFieldsetMixin, UserSerializer):
     """
     Сериализатор пользователя с отметкой о подписке
     """
@@ -23,10 +64,17 @@ class UsersSerializer(UserSerializer):
             'last_name', 'is_subscribed'
         )
 
+    def to_representation(self, instance):
+        if self.is_sparse:
+            return super().to_representation(instance)
+        return compiled.user_to_dict(instance, self.context)
+
     def get_is_subscribed(self, obj: User):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(
             user=request.user, author=obj).exists()
 
@@ -46,7 +94,7 @@ class IngridientSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = ('id', 'name', 'measurement_unit')
 
 
 class GetIngredientsInRecipeSerializer(serializers.ModelSerializer):
@@ -75,7 +123,22 @@ class GetIngredientsInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class GetRecipeSerializer(serializers.ModelSerializer):
+class CompactIngredientsInRecipeSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор ингредиентов рецепта для компактного режима:
+    только id ингредиента и количество
+    """
+    id = serializers.PrimaryKeyRelatedField(
+        source='ingredient',
+        read_only=True
+    )
+
+    class Meta:
+        model = IngredientsInRecipe
+        fields = ('id', 'amount')
+
+
+class GetRecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Сериализатор получения рецептов, дополненный полями
     наличия в списке покупок и избранном
@@ -90,19 +153,44 @@ class GetRecipeSerializer(serializers.ModelSerializer):
     author = UsersSerializer(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
+    nutrition = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'text', 'cooking_time', 'servings', 'nutrition'
         )
 
+    def get_compact_fields(self):
+        return {
+            'tags': serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True
+            ),
+            'ingredients': CompactIngredientsInRecipeSerializer(
+                many=True,
+                read_only=True,
+                source='ingridients_in_recipe',
+            ),
+        }
+
+    def to_representation(self, instance):
+        if self.is_sparse:
+            data = super().to_representation(instance)
+        else:
+            data = compiled.recipe_to_dict(instance, self.context)
+        servings = self.context.get('servings')
+        if servings is not None:
+            compiled.apply_servings(data, instance, servings)
+        return data
+
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorite.objects.filter(
             user=request.user, recipe__id=obj.id).exists()
 
@@ -110,16 +198,35 @@ class GetRecipeSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return ShoppingCart.objects.filter(
             user=request.user, recipe__id=obj.id).exists()
 
+    def get_nutrition(self, obj):
+        return compiled.nutrition_to_dict(obj)
+
+
+class CatalogIngredientField(serializers.PrimaryKeyRelatedField):
+    """
+    Ингредиент по id с проверкой по снимку каталога без запроса к БД,
+    при отсутствии снимка или ингредиента в нем - обычная проверка
+    """
+    def to_internal_value(self, data):
+        catalog = get_catalog()
+        if catalog is not None and isinstance(data, int):
+            ingredient = catalog.ingredient(data)
+            if ingredient is not None:
+                return Ingredient(**ingredient)
+        return super().to_internal_value(data)
+
 
 class CreateIngredientsInRecipeSerializer(serializers.ModelSerializer):
     """
     Сериализатор создания и изменения ингредиентов в рецептах
     с проверкой количества
     """
-    id = serializers.PrimaryKeyRelatedField(
+    id = CatalogIngredientField(
         source='ingredient',
         queryset=Ingredient.objects.all()
     )
@@ -166,7 +273,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'image', 'tags', 'author', 'ingredients',
-            'name', 'text', 'cooking_time',
+            'name', 'text', 'cooking_time', 'servings',
         )
 
     @transaction.atomic
@@ -205,7 +312,10 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             **validated_data
         )
         self.create_ingredients(recipe, ingredients)
+        refresh_recipe_nutrition(recipe)
+        ensure_recipe_scores([recipe.id])
         recipe.tags.set(tags)
+        enqueue('recipes.refresh_similar', {'recipe_id': recipe.id})
         return recipe
 
     @transaction.atomic
@@ -214,7 +324,10 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         recipe = instance
         IngredientsInRecipe.objects.filter(recipe=recipe).delete()
         self.create_ingredients(recipe, ingredients)
-        return super().update(recipe, validated_data)
+        enqueue('recipes.refresh_similar', {'recipe_id': recipe.id})
+        recipe = super().update(recipe, validated_data)
+        refresh_recipe_nutrition(recipe)
+        return recipe
 
     def to_representation(self, instance):
         return GetRecipeSerializer(
@@ -233,21 +346,32 @@ class RecipeShortSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def to_representation(self, instance):
+        return compiled.recipe_short_to_dict(instance, self.context)
+
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
     """
-    Сериализатор списка покупок с проверкой на уникальность
+    Сериализатор изменения числа порций рецепта в списке покупок,
+    из которого считается множитель
     """
+    servings = serializers.IntegerField(
+        write_only=True,
+        required=False,
+        min_value=1,
+        max_value=MAX_SERVINGS,
+    )
+
     class Meta:
-        fields = ['recipe', 'user']
+        fields = ['recipe', 'user', 'servings']
+        read_only_fields = ['recipe', 'user']
         model = ShoppingCart
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=['recipe', 'user'],
-                message='Данный рецепт уже есть в корзине'
-            )
-        ]
+
+    def validate(self, data):
+        servings = data.pop('servings', None)
+        if servings is not None:
+            data['multiplier'] = servings / self.instance.recipe.servings
+        return data
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -255,26 +379,123 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         return RecipeShortSerializer(instance.recipe, context=context).data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class PantryItemSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор запаса ингредиента в единице измерения ингредиента
+    """
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        fields = ('id', 'name', 'measurement_unit', 'amount', 'updated_at')
+        model = PantryItem
+
+
+class PantryWriteSerializer(serializers.Serializer):
+    """
+    Элемент пачки запасов: нулевое количество удаляет запас
+    """
+    ingredient = serializers.IntegerField(min_value=1)
+    amount = serializers.FloatField(min_value=0)
+
+
+class PantryBatchSerializer(serializers.ListSerializer):
+    """
+    Пачка запасов из клиента: существование ингредиентов проверяется
+    одним запросом, повторы ингредиента схлопываются (побеждает
+    последний)
+    """
+    child = PantryWriteSerializer()
+
+    def validate(self, data):
+        max_items = getattr(settings, 'PANTRY_MAX_ITEMS', 1000)
+        if len(data) > max_items:
+            raise ValidationError(
+                f'Не больше {max_items} ингредиентов за запрос'
+            )
+        amounts = {item['ingredient']: item['amount'] for item in data}
+        missing = set(amounts) - set(Ingredient.objects.filter(
+            pk__in=amounts
+        ).values_list('pk', flat=True))
+        if missing:
+            raise ValidationError(
+                'Ингредиенты не найдены: {}'.format(
+                    ', '.join(map(str, sorted(missing)))
+                )
+            )
+        return amounts
+
+
+class MealPlanSerializer(serializers.ModelSerializer):
     """
-    Сериализатор избранного с проверкой на уникальность
+    Сериализатор рецепта в плане питания, по умолчанию
+    количество порций берется из рецепта
     """
+    recipe = serializers.PrimaryKeyRelatedField(
+        queryset=Recipe.objects.all()
+    )
+    servings = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_SERVINGS,
+    )
+
     class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=['recipe', 'user'],
-                message='Данный рецепт уже в избранном'
+        fields = ('id', 'date', 'slot', 'recipe', 'servings')
+        model = MealPlan
+
+    def validate(self, data):
+        instance = self.instance
+        recipe = data.get('recipe', getattr(instance, 'recipe', None))
+        if instance is None and 'servings' not in data:
+            data['servings'] = recipe.servings
+        duplicate = MealPlan.objects.filter(
+            user=self.context['request'].user,
+            date=data.get('date', getattr(instance, 'date', None)),
+            slot=data.get('slot', getattr(instance, 'slot', None)),
+            recipe=recipe,
+        )
+        if instance is not None:
+            duplicate = duplicate.exclude(pk=instance.pk)
+        if duplicate.exists():
+            raise ValidationError(
+                'Рецепт уже запланирован на этот прием пищи'
             )
-        ]
+        return data
 
     def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        return RecipeShortSerializer(
-            instance.recipe, context=context).data
+        data = super().to_representation(instance)
+        data['recipe'] = RecipeShortSerializer(
+            instance.recipe, context=self.context
+        ).data
+        return data
+
+
+class MealPlanPeriodSerializer(serializers.Serializer):
+    """
+    Период плана питания: по умолчанию неделя с понедельника,
+    содержащая start (или текущую дату)
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        start = data.get('start')
+        if start is None:
+            today = timezone.localdate()
+            start = today - timedelta(days=today.weekday())
+        end = data.get('end') or start + timedelta(days=6)
+        if end < start:
+            raise ValidationError({'end': ['Конец периода раньше начала']})
+        max_days = getattr(settings, 'MEAL_PLAN_MAX_DAYS', 62)
+        if (end - start).days >= max_days:
+            raise ValidationError({
+                'end': [f'Период не может быть длиннее {max_days} дней']
+            })
+        return {'start': start, 'end': end}
 
 
 class FollowersSerializer(serializers.ModelSerializer):
@@ -316,31 +537,45 @@ class FollowersSerializer(serializers.ModelSerializer):
         ).exists()
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class JobSerializer(serializers.ModelSerializer):
     """
-    Сериализатор подписки на авторов
+    Сериализатор состояния фоновой задачи для опроса клиентом
     """
     class Meta:
-        model = Follow
-        fields = ('user', 'author')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=('user', 'author'),
-                message='Вы уже подписаны на автора'
-            )
-        ]
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'result', 'error',
+            'created_at', 'started_at', 'finished_at'
+        )
 
-    def validate(self, data):
-        get_object_or_404(User, username=data['author'])
-        if self.context['request'].user == data['author']:
-            raise ValidationError({
-                'Подписка на самого себя запрещена'
-            })
-        return data
 
-    def to_representation(self, instance):
-        return FollowersSerializer(
-            instance.author,
-            context={'request': self.context.get('request')}
-        ).data
+class AuthorStatsSerializer(serializers.ModelSerializer):
+    """
+    Статистика автора из предрассчитанной строки, id - id автора
+    """
+    id = serializers.IntegerField(source='author_id')
+
+    class Meta:
+        model = AuthorStats
+        fields = (
+            'id',
+            'recipes_count',
+            'favorites_count',
+            'shopping_cart_count',
+            'followers_count',
+            'top_ingredients',
+            'tags',
+        )
+
+
+class ActivityQuerySerializer(serializers.Serializer):
+    """
+    Параметры выборки из сводок событий
+    """
+    period = serializers.ChoiceField(
+        choices=tuple(ROLLUPS), default='day'
+    )
+    kind = serializers.ChoiceField(choices=Event.KINDS, required=False)
+    recipe = serializers.IntegerField(min_value=1, required=False)
+    author = serializers.IntegerField(min_value=1, required=False)
+    since = serializers.DateTimeField(required=False)
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LocalBucketStore:
+    """
+    Хранилище корзин токенов в памяти процесса. Размер ограничен
+    max_keys: при переполнении вытесняется корзина, к которой дольше
+    всего не обращались
+    """
+    max_keys = 10000
+
+    def __init__(self):
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, now):
+        with self.lock:
+            tokens, stamp = self.buckets.get(key, (capacity, now))
+            tokens, wait = take_token(tokens, stamp, capacity, rate, now)
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class CacheBucketStore:
+    """
+    Хранилище корзин токенов в общем кеше Django
+    для нескольких процессов и серверов. Чтение и запись корзины идут
+    под блокировкой cache.add, чтобы одновременные запросы не взяли
+    один и тот же токен; не дождавшийся блокировки запрос отклоняется
+    """
+    lock_attempts = 20
+    lock_delay = 0.005
+
+    def consume(self, key, capacity, rate, now):
+        lock_key = f'{key}:lock'
+        for _ in range(self.lock_attempts):
+            if cache.add(lock_key, 1, 1):
+                break
+            time.sleep(self.lock_delay)
+        else:
+            return 1 / rate
+        try:
+            tokens, stamp = cache.get(key, (capacity, now))
+            tokens, wait = take_token(tokens, stamp, capacity, rate, now)
+            cache.set(key, (tokens, now), int(capacity / rate) + 1)
+        finally:
+            cache.delete(lock_key)
+        return wait
+
+
+def take_token(tokens, stamp, capacity, rate, now):
+    """
+    Пополнение корзины за прошедшее время и попытка взять токен.
+    Возвращает остаток токенов и время ожидания (0, если токен взят)
+    """
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+STORES = {
+    'local': LocalBucketStore,
+    'cache': CacheBucketStore,
+}
+bucket_store = STORES[getattr(settings, 'THROTTLE_STORE', 'local')]()
+trusted_tokens = frozenset(getattr(settings, 'THROTTLE_TRUSTED_TOKENS', ()))
+
+
+def is_trusted(request):
+    """
+    Доверенный внутренний токен: проверка только по заголовку, без БД
+    """
+    if not trusted_tokens:
+        return False
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    return len(header) == 2 and header[1] in trusted_tokens
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов по алгоритму корзины токенов:
+    емкость и скорость пополнения берутся из DEFAULT_THROTTLE_RATES
+    """
+    wait_time = None
+
+    def allow_request(self, request, view):
+        if self.rate is None or is_trusted(request):
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.wait_time = bucket_store.consume(
+            key,
+            self.num_requests,
+            self.num_requests / self.duration,
+            self.timer()
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+    def get_ident_key(self, request):
+        """
+        Ключ корзины: пользователь или IP клиента. За nginx IP берется
+        из X-Forwarded-For с учетом NUM_PROXIES
+        """
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """
+    Общий лимит для анонимных запросов
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            return None
+        return self.get_ident_key(request)
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """
+    Общий лимит для запросов авторизованного пользователя
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.get_ident_key(request)
+
+
+class WriteBucketThrottle(TokenBucketThrottle):
+    """
+    Отдельный лимит для изменяющих запросов
+    """
+    scope = 'writes'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return self.get_ident_key(request)
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    """
+    Лимит по throttle_scope вьюсета или экшена, например для выгрузок
+    """
+    def __init__(self):
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(request)
@@ -0,0 +1,204 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils import timezone as django_timezone
+from rest_framework import serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (TokenObtainPairSerializer,
+                                                  TokenRefreshSerializer)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import RevokedToken, User
+
+USER_CLAIMS = (
+    'email', 'username', 'first_name', 'last_name',
+    'role', 'is_staff', 'is_superuser', 'is_active',
+)
+
+
+class BloomFilter:
+    """
+    Компактный фильтр Блума: возможны ложноположительные ответы,
+    ложноотрицательные исключены
+    """
+    def __init__(self, size=2 ** 20, hashes=7):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray(size // 8)
+
+    def positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=32).digest()
+        for index in range(self.hashes):
+            chunk = digest[index * 4:index * 4 + 4]
+            yield int.from_bytes(chunk, 'big') % self.size
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self.positions(value)
+        )
+
+
+class RevocationList:
+    """
+    Список отозванных jti: фильтр Блума в памяти процесса, дочитываемый
+    из таблицы RevokedToken не чаще раза в refresh_interval секунд.
+    В БД идем только при попадании в фильтр
+    """
+    def __init__(self, refresh_interval, rebuild_interval):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.last_id = 0
+        self.synced_at = 0
+        self.built_at = 0
+
+    def sync(self):
+        now = time.monotonic()
+        if (
+            self.bloom is not None
+            and now - self.synced_at < self.refresh_interval
+        ):
+            return
+        with self.lock:
+            if (
+                self.bloom is None
+                or now - self.built_at >= self.rebuild_interval
+            ):
+                RevokedToken.objects.filter(
+                    expires_at__lt=django_timezone.now()
+                ).delete()
+                self.bloom = BloomFilter()
+                self.last_id = 0
+                self.built_at = now
+            for pk, jti in RevokedToken.objects.filter(
+                pk__gt=self.last_id
+            ).order_by('pk').values_list('pk', 'jti'):
+                self.bloom.add(jti)
+                self.last_id = pk
+            self.synced_at = now
+
+    def revoke(self, token):
+        """
+        Отзыв токена, False - токен уже был отозван (в том числе
+        одновременным запросом: уникальный jti допускает одну вставку)
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        _, created = RevokedToken.objects.get_or_create(
+            jti=jti,
+            defaults={'expires_at': datetime.fromtimestamp(
+                token['exp'], tz=timezone.utc
+            )}
+        )
+        self.sync()
+        with self.lock:
+            self.bloom.add(jti)
+        return created
+
+    def is_revoked(self, token):
+        self.sync()
+        jti = token[api_settings.JTI_CLAIM]
+        if jti not in self.bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+
+revocation_list = RevocationList(
+    refresh_interval=getattr(settings, 'JWT_REVOCATION_REFRESH', 30),
+    rebuild_interval=getattr(settings, 'JWT_REVOCATION_REBUILD', 60 * 60),
+)
+
+
+def password_fingerprint(user):
+    return hashlib.sha256(user.password.encode()).hexdigest()[:16]
+
+
+def set_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token['pwd'] = password_fingerprint(user)
+    return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по короткоживущему access-токену: подпись и список
+    отзыва проверяются без обращения к БД, пользователь собирается
+    из claims токена (остальные поля догружаются лениво)
+    """
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocation_list.is_revoked(token):
+            raise InvalidToken('Токен отозван')
+        return token
+
+    def get_user(self, validated_token):
+        if USER_CLAIMS[0] not in validated_token:
+            return super().get_user(validated_token)
+        data = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        data['id'] = validated_token[api_settings.USER_ID_CLAIM]
+        names = [
+            field.attname for field in User._meta.concrete_fields
+            if field.attname in data
+        ]
+        return User.from_db('default', names, [data[name] for name in names])
+
+
+class JWTObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Выдача пары токенов с данными пользователя в claims
+    """
+    @classmethod
+    def get_token(cls, user):
+        return set_user_claims(super().get_token(user), user)
+
+
+class JWTRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление пары токенов с ротацией: старый refresh-токен отзывается,
+    claims перечитываются из БД, смена пароля или блокировка
+    пользователя делает refresh-токены недействительными. Отзыв
+    проверяется по таблице, а не по фильтру Блума, который в других
+    процессах дочитывается с задержкой: повтор уже обмененного токена
+    (в том числе одновременный) отклоняется
+    """
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        user = User.objects.filter(
+            pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+        ).first()
+        if user is None or refresh.get('pwd') != password_fingerprint(user):
+            raise InvalidToken('Токен недействителен')
+        if not revocation_list.revoke(refresh):
+            raise InvalidToken('Токен отозван')
+        refresh.set_jti()
+        refresh.set_exp()
+        set_user_claims(refresh, user)
+        return {
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+        }
+
+
+class JWTLogoutSerializer(serializers.Serializer):
+    """
+    Отзыв refresh-токена при выходе
+    """
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        request = self.context['request']
+        if refresh[api_settings.USER_ID_CLAIM] != request.user.pk:
+            raise InvalidToken('Токен принадлежит другому пользователю')
+        attrs['token'] = refresh
+        return attrs
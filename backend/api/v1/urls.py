@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UsersViewSet
+from .views import (ActivityView, ExportView, IngredientViewSet, JobViewSet,
+                    JWTCreateView, JWTLogoutView, JWTRefreshView,
+                    MealPlanViewSet, MetricsView, PantryViewSet, RecipeViewSet,
+                    TagViewSet, UsersViewSet)
 
 router = routers.DefaultRouter()
 
@@ -9,8 +13,23 @@ router.register('users', UsersViewSet)
 router.register('ingredients', IngredientViewSet)
 router.register('recipes', RecipeViewSet)
 router.register('tags', TagViewSet)
+router.register('jobs', JobViewSet, basename='jobs')
+router.register('meal-plans', MealPlanViewSet, basename='meal-plans')
+router.register('pantry', PantryViewSet, basename='pantry')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('activity/', ActivityView.as_view(), name='activity'),
+    path('export/<slug:dataset>/', ExportView.as_view(), name='export'),
 ]
+
+if settings.JWT_AUTH:
+    urlpatterns += [
+        path('auth/jwt/create/', JWTCreateView.as_view(), name='jwt_create'),
+        path(
+            'auth/jwt/refresh/', JWTRefreshView.as_view(), name='jwt_refresh'
+        ),
+        path('auth/jwt/logout/', JWTLogoutView.as_view(), name='jwt_logout'),
+    ]
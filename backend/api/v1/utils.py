@@ -1,31 +1,42 @@
-from django.http import HttpResponse
-from recipes.models import ShoppingCart
+from django.http import FileResponse
+from jobs.queue import enqueue
+from recipes.shopping_list import EXPORT_FORMATS, get_export
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .serializers import JobSerializer
 
 
 def download_shopping_cart(request):
-    shopping_cart = ShoppingCart.objects.filter(user=request.user).all()
-    shopping_list = {}
-    for item in shopping_cart:
-        for ingridients in item.recipe.ingridients_in_recipe.all():
-            name = ingridients.ingredient.name
-            measuring_unit = ingridients.ingredient.measurement_unit
-            amount = ingridients.amount
-            if name not in shopping_list:
-                shopping_list[name] = {
-                    'name': name,
-                    'measurement_unit': measuring_unit,
-                    'amount': amount
-                }
-            else:
-                shopping_list[name]['amount'] += amount
-    content = (
-        [f'{item["name"]} ({item["measurement_unit"]}) '
-         f'- {item["amount"]}\n'
-         for item in shopping_list.values()]
-    )
-    filename = 'shopping_list.txt'
-    response = HttpResponse(content, content_type='text/plain')
-    response['Content-Disposition'] = (
-        'attachment; filename={0}'.format(filename)
+    """
+    GET отдает готовый файл списка покупок (из кеша, если корзина
+    не менялась), POST ставит выгрузку в очередь и возвращает задачу.
+    Запасы пользователя вычитаются, если не передан ?pantry=0
+    """
+    file_format = request.query_params.get('file_format', 'txt')
+    if file_format not in EXPORT_FORMATS:
+        raise ValidationError({'file_format': [
+            'Доступные форматы: {}'.format(', '.join(EXPORT_FORMATS))
+        ]})
+    use_pantry = request.query_params.get('pantry') not in ('0', 'false')
+    if request.method == 'POST':
+        job = enqueue(
+            'recipes.export_shopping_list',
+            {
+                'user_id': request.user.pk,
+                'file_format': file_format,
+                'use_pantry': use_pantry,
+            },
+            user=request.user,
+        )
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+    export = get_export(request.user, file_format, use_pantry)
+    return FileResponse(
+        export.file.open('rb'),
+        as_attachment=True,
+        filename=f'shopping_list.{file_format}',
+        content_type=EXPORT_FORMATS[file_format],
     )
-    return response
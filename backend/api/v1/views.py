@@ -1,49 +1,161 @@
-from api.filters import RecipeFilter
+from collections import defaultdict
+
+from api import metrics
+from api.filters import IngredientFilter, RecipeFilter
+from django.db import models
+from django.db.models import Case, Exists, OuterRef, Prefetch, Value, When
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from rest_framework import status
+from events.buffer import record
+from events.models import Event
+from events.rollups import get_activity
+from jobs.models import Job
+from recipes.catalog import get_catalog
+from recipes.export import (DATASETS, EXPORT_FORMATS, get_columns, iter_rows,
+                            render_rows)
+from recipes.meal_plans import get_plan_ingredients, plan_to_shopping_cart
+from recipes.models import (MAX_SERVINGS, NUTRIENTS, Favorite, Ingredient,
+                            IngredientsInRecipe, MealPlan, PantryItem, Recipe,
+                            ShoppingCart, SimilarRecipe, Tag)
+from recipes.pantry import sync_pantry
+from recipes.purge import soft_delete_recipes, soft_delete_user
+from recipes.search import search_ingredient_ids
+from recipes.stats import adjust_author_stats, get_author_stats
+from rest_framework import mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.fields import IntegerField
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.views import APIView
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.views import (TokenObtainPairView,
+                                            TokenRefreshView)
 from users.models import Follow, User
 
+from .compiled import ingredient_to_dict
+from .mixins import IdempotencyKeyMixin, SparseFieldsetViewMixin
 from .pagination import RecipePagination
 from .permissions import IsAdminOrAuthorOrReadOnlyPermission
-from .serializers import (CreateRecipeSerializer, FavoriteSerializer,
-                          FollowersSerializer, FollowSerializer,
+from .relations import delete_link, insert_link, parse_id
+from .serializers import (ActivityQuerySerializer, AuthorStatsSerializer,
+                          CreateRecipeSerializer, FollowersSerializer,
                           GetRecipeSerializer, IngridientSerializer,
+                          JobSerializer, MealPlanPeriodSerializer,
+                          MealPlanSerializer, PantryBatchSerializer,
+                          PantryItemSerializer, RecipeShortSerializer,
                           ShoppingCartSerializer, TagSerializer)
+from .tokens import (JWTLogoutSerializer, JWTObtainPairSerializer,
+                     JWTRefreshSerializer, revocation_list)
 from .utils import download_shopping_cart
 
+LINK_EVENTS = {
+    Favorite: (Event.FAVORITE_ADDED, Event.FAVORITE_REMOVED),
+    ShoppingCart: (Event.CART_ADDED, Event.CART_REMOVED),
+}
+LINK_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
 
 class TagViewSet(ModelViewSet):
     """
-    Вьюсет для тегов рецептов
+    Вьюсет для тегов рецептов, чтение из снимка каталога
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def list(self, request, *args, **kwargs):
+        catalog = get_catalog()
+        if catalog is None:
+            return super().list(request, *args, **kwargs)
+        return Response(catalog.tags())
+
+    def retrieve(self, request, *args, **kwargs):
+        catalog = get_catalog()
+        tag = None if catalog is None else catalog.tag(parse_id(kwargs['pk']))
+        if tag is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(tag)
+
 
 class IngredientViewSet(ModelViewSet):
     """
-    Вьюсет для тегов ингредиетов, с поиском по названию
+    Вьюсет для тегов ингредиетов, с поиском по началу названия (search)
+    и нечетким поиском (name), чтение из снимка каталога
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngridientSerializer
-    filter_backends = (SearchFilter,)
+    filter_backends = (SearchFilter, DjangoFilterBackend)
+    filterset_class = IngredientFilter
     search_fields = ('^name', )
 
+    def list(self, request, *args, **kwargs):
+        catalog = get_catalog()
+        if catalog is None:
+            return super().list(request, *args, **kwargs)
+        name = request.query_params.get('name')
+        search = self.filter_backends[0]().get_search_terms(request)
+        if not name:
+            return Response(
+                catalog.search_prefix(search) if search
+                else catalog.ingredient_list()
+            )
+        ingredients = catalog.ingredients(search_ingredient_ids(name))
+        return Response([
+            ingredient for ingredient in ingredients
+            if all(
+                ingredient['name'].lower().startswith(term.lower())
+                for term in search
+            )
+        ])
+
+    def retrieve(self, request, *args, **kwargs):
+        catalog = get_catalog()
+        ingredient = None if catalog is None else catalog.ingredient(
+            parse_id(kwargs['pk'])
+        )
+        if ingredient is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(ingredient)
+
 
-class UsersViewSet(UserViewSet):
+class UsersViewSet(
+    IdempotencyKeyMixin, SparseFieldsetViewMixin, UserViewSet
+):
     """
-    Юзер вьюсет с добавлением ендпоинтов для подписок, кастомной пагинацией
+    Юзер вьюсет с добавлением ендпоинтов для подписок, кастомной пагинацией,
+    выборочными полями и заголовком Idempotency-Key
     """
     pagination_class = RecipePagination
+    user_columns = ('email', 'username', 'first_name', 'last_name')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.is_sparse_action:
+            return queryset
+        queryset = queryset.only(*(
+            column for column in self.user_columns
+            if self.is_field_requested(column)
+        ))
+        user = self.request.user
+        if user.is_authenticated and self.is_field_requested('is_subscribed'):
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return queryset
+
+    def perform_destroy(self, instance):
+        soft_delete_user(instance)
 
     @action(['get'], detail=False, permission_classes=[IsAuthenticated])
     def me(self, request, *args, **kwargs):
@@ -62,32 +174,57 @@ class UsersViewSet(UserViewSet):
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(methods=['get'], detail=True, permission_classes=(AllowAny,))
+    def stats(self, request, id):
+        stats = get_author_stats(parse_id(id))
+        if stats is None:
+            raise NotFound()
+        etag = quote_etag(f'{stats.author_id}-{stats.version}')
+        if etag in (
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.headers.get('If-None-Match', ''))
+        ):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(AuthorStatsSerializer(stats).data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
     @action(methods=['post', 'delete'], detail=True)
     def subscribe(self, request, id):
+        author_id = parse_id(id)
         if request.method != 'POST':
-            subscription = get_object_or_404(
-                Follow,
-                author=get_object_or_404(User, id=id),
-                user=request.user
-            )
-            self.perform_destroy(subscription)
+            if not delete_link(Follow, request.user, 'author', author_id):
+                raise NotFound()
+            record(Event.FOLLOW_REMOVED, request.user, author=author_id)
+            adjust_author_stats(author_id, followers_count=-1)
             return Response(status=status.HTTP_204_NO_CONTENT)
-        serializer = FollowSerializer(
-            data={
-                'user': request.user.id,
-                'author': get_object_or_404(User, id=id).id
-            },
+        if author_id == request.user.id:
+            raise ValidationError('Подписка на самого себя запрещена')
+        created, _ = insert_link(
+            Follow, request.user, 'author', author_id
+        )
+        if created:
+            record(Event.FOLLOW_ADDED, request.user, author=author_id)
+            adjust_author_stats(author_id, followers_count=1)
+        serializer = FollowersSerializer(
+            get_object_or_404(User, id=author_id),
             context={'request': request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(
+    IdempotencyKeyMixin, SparseFieldsetViewMixin, ModelViewSet
+):
     """
     Вьюсет для рецептов с добавлением/удалением из
-    избранного/списка покупок, выгрузкой списка покупок
+    избранного/списка покупок, выгрузкой списка покупок,
+    выборочными полями и компактным режимом
     """
     queryset = Recipe.objects.all()
     serializer_class = GetRecipeSerializer
@@ -97,51 +234,443 @@ class RecipeViewSet(ModelViewSet):
     permission_classes = (
         IsAdminOrAuthorOrReadOnlyPermission, IsAuthenticatedOrReadOnly
     )
+    throttle_scope = None
+
+    recipe_columns = (
+        'name', 'image', 'text', 'cooking_time', 'servings', 'author'
+    )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.is_sparse_action:
+            return queryset
+        columns = [
+            column for column in self.recipe_columns
+            if self.is_field_requested(column)
+        ]
+        if self.is_field_requested('nutrition'):
+            columns.extend(NUTRIENTS)
+        queryset = queryset.only(*columns)
+        if self.is_field_requested('author'):
+            queryset = queryset.select_related('author')
+        if self.is_field_requested('tags'):
+            queryset = queryset.prefetch_related('tags')
+        if self.is_field_requested('ingredients'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'ingridients_in_recipe', queryset=self.get_ingredients()
+            ))
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        if self.is_field_requested('is_favorited'):
+            queryset = queryset.annotate(is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        if self.is_field_requested('is_in_shopping_cart'):
+            queryset = queryset.annotate(is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        return queryset
+
+    def get_ingredients(self):
+        """
+        Ингредиенты рецептов для prefetch. Названия без снимка справочников
+        берутся из БД, а выборочные поля и expand в компактном режиме
+        сериализуют ингредиент целиком
+        """
+        ingredients = IngredientsInRecipe.objects.all()
+        if self.is_compact:
+            full = 'ingredients' in self.expanded_fields
+        else:
+            full = self.requested_fields is not None
+        if full or get_catalog() is None:
+            ingredients = ingredients.select_related('ingredient')
+        return ingredients
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return GetRecipeSerializer
         return CreateRecipeSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        servings = self.request.query_params.get('servings')
+        if self.action == 'retrieve' and servings is not None:
+            field = IntegerField(min_value=1, max_value=MAX_SERVINGS)
+            try:
+                context['servings'] = field.run_validation(servings)
+            except ValidationError as error:
+                raise ValidationError({'servings': error.detail})
+        return context
+
+    def perform_create(self, serializer):
+        recipe = serializer.save()
+        record(
+            Event.RECIPE_CREATED, self.request.user, recipe, recipe.author_id
+        )
+        adjust_author_stats(
+            recipe.author_id, composition=True, recipes_count=1
+        )
+
+    def perform_update(self, serializer):
+        recipe = serializer.save()
+        record(
+            Event.RECIPE_UPDATED, self.request.user, recipe, recipe.author_id
+        )
+        adjust_author_stats(recipe.author_id, composition=True)
+
+    def perform_destroy(self, instance):
+        if soft_delete_recipes(Recipe.objects.filter(pk=instance.pk)):
+            record(
+                Event.RECIPE_DELETED, self.request.user, instance,
+                instance.author_id
+            )
+            adjust_author_stats(
+                instance.author_id,
+                composition=True,
+                recipes_count=-1,
+                favorites_count=-Favorite.objects.filter(
+                    recipe=instance
+                ).count(),
+                shopping_cart_count=-ShoppingCart.objects.filter(
+                    recipe=instance
+                ).count(),
+            )
+
+    def get_included(self, recipes):
+        included = {}
+        if (
+            self.is_field_requested('tags')
+            and 'tags' not in self.expanded_fields
+        ):
+            tags = {
+                tag.id: tag for recipe in recipes for tag in recipe.tags.all()
+            }
+            included['tags'] = {
+                str(tag_id): TagSerializer(tag).data
+                for tag_id, tag in tags.items()
+            }
+        if (
+            self.is_field_requested('ingredients')
+            and 'ingredients' not in self.expanded_fields
+        ):
+            catalog = get_catalog()
+            items = {
+                item.ingredient_id: item
+                for recipe in recipes
+                for item in recipe.ingridients_in_recipe.all()
+            }
+            included['ingredients'] = {
+                str(ingredient_id): ingredient_to_dict(
+                    ingredient_id, item, catalog
+                )
+                for ingredient_id, item in items.items()
+            }
+        return included
+
     @staticmethod
-    def post_method_for_actions(request, pk, serializers):
-        data = {'user': request.user.id, 'recipe': pk}
-        serializer = serializers(data=data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def post_method_for_actions(request, pk, model, **computed):
+        recipe_id = parse_id(pk)
+        created, row = insert_link(
+            model, request.user, 'recipe', recipe_id,
+            returning=('name', 'image', 'cooking_time', 'author_id'),
+            update=True, **computed
+        )
+        if row is None:
+            raise NotFound()
+        recipe = Recipe(id=recipe_id, **row)
+        if created:
+            record(
+                LINK_EVENTS[model][0], request.user, recipe, recipe.author_id
+            )
+            adjust_author_stats(recipe.author_id, **{LINK_COUNTERS[model]: 1})
+        serializer = RecipeShortSerializer(
+            recipe, context={'request': request}
+        )
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
     @staticmethod
     def delete_method_for_actions(request, pk, model):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        model_instance = get_object_or_404(model, user=user, recipe=recipe)
-        model_instance.delete()
+        recipe_id = parse_id(pk)
+        author_id = Recipe.objects.filter(pk=recipe_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is None or not delete_link(
+            model, request.user, 'recipe', recipe_id
+        ):
+            raise NotFound()
+        record(LINK_EVENTS[model][1], request.user, recipe_id, author_id)
+        adjust_author_stats(author_id, **{LINK_COUNTERS[model]: -1})
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'])
     def shopping_cart(self, request, pk):
+        computed = {}
+        servings = request.data.get('servings')
+        if servings is not None:
+            field = IntegerField(min_value=1, max_value=MAX_SERVINGS)
+            try:
+                servings = field.run_validation(servings)
+            except ValidationError as error:
+                raise ValidationError({'servings': error.detail})
+            computed['multiplier'] = (
+                'CAST(%s AS DOUBLE PRECISION) / servings', [servings]
+            )
         return self.post_method_for_actions(
-            request, pk, serializers=ShoppingCartSerializer
+            request, pk, model=ShoppingCart, **computed
         )
 
+    @shopping_cart.mapping.patch
+    def update_shopping_cart(self, request, pk):
+        cart_item = get_object_or_404(
+            ShoppingCart, user=request.user, recipe_id=pk
+        )
+        serializer = ShoppingCartSerializer(
+            cart_item,
+            data={'servings': request.data.get('servings')},
+            partial=True,
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
         return self.delete_method_for_actions(
             request=request, pk=pk, model=ShoppingCart)
 
     @action(
-        detail=False, methods=['get'], permission_classes=(IsAuthenticated,)
+        detail=False,
+        methods=['get', 'post'],
+        permission_classes=(IsAuthenticated,),
+        throttle_scope='exports',
     )
     def download_shopping_cart(self, request):
         return download_shopping_cart(request)
 
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk):
+        recipe_id = parse_id(pk)
+        if not Recipe.objects.filter(id=recipe_id).exists():
+            raise NotFound()
+        neighbors = SimilarRecipe.objects.filter(
+            recipe_id=recipe_id, similar__deleted_at__isnull=True
+        ).select_related('similar').order_by('-score')
+        recipes = [neighbor.similar for neighbor in neighbors]
+        serializer = RecipeShortSerializer(
+            recipes, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def favorite(self, request, pk):
         return self.post_method_for_actions(
-            request=request, pk=pk, serializers=FavoriteSerializer)
+            request=request, pk=pk, model=Favorite)
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk):
         return self.delete_method_for_actions(
             request=request, pk=pk, model=Favorite)
+
+
+class MealPlanViewSet(ModelViewSet):
+    """
+    План питания текущего пользователя: список за период (по умолчанию
+    текущая неделя) и перенос рецептов периода в список покупок
+    """
+    serializer_class = MealPlanSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+    slot_order = Case(
+        *(
+            When(slot=slot, then=Value(position))
+            for position, (slot, _) in enumerate(MealPlan.SLOTS)
+        ),
+        output_field=models.IntegerField(),
+    )
+
+    def get_period(self, data):
+        serializer = MealPlanPeriodSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def get_queryset(self):
+        queryset = MealPlan.objects.filter(
+            user=self.request.user, recipe__deleted_at__isnull=True
+        ).select_related('recipe')
+        if self.action == 'list':
+            period = self.get_period(self.request.query_params)
+            queryset = queryset.filter(
+                date__range=(period['start'], period['end'])
+            )
+        return queryset.order_by('date', self.slot_order, 'id')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'])
+    def to_shopping_cart(self, request):
+        period = self.get_period(request.data)
+        created, updated = plan_to_shopping_cart(
+            request.user, period['start'], period['end']
+        )
+        added_by_author = defaultdict(int)
+        for recipe_id, author_id in created.items():
+            record(Event.CART_ADDED, request.user, recipe_id, author_id)
+            added_by_author[author_id] += 1
+        for author_id, added in added_by_author.items():
+            adjust_author_stats(author_id, shopping_cart_count=added)
+        return Response({
+            **period,
+            'added': len(created),
+            'updated': updated,
+            'ingredients': [
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+                for name, unit, amount in get_plan_ingredients(
+                    request.user, period['start'], period['end']
+                )
+            ],
+        })
+
+
+class PantryViewSet(
+    mixins.ListModelMixin, mixins.DestroyModelMixin, GenericViewSet
+):
+    """
+    Запасы ингредиентов текущего пользователя. POST пачкой добавляет
+    и изменяет запасы, PUT sync/ заменяет запасы целиком (синхронизация
+    с мобильного клиента), удаление - по id ингредиента
+    """
+    serializer_class = PantryItemSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+    lookup_field = 'ingredient'
+
+    def get_queryset(self):
+        return PantryItem.objects.filter(
+            user=self.request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+
+    def apply_batch(self, request, replace):
+        serializer = PantryBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sync_pantry(request.user, serializer.validated_data, replace)
+        return self.list(request)
+
+    def create(self, request):
+        return self.apply_batch(request, replace=False)
+
+    @action(detail=False, methods=['put'])
+    def sync(self, request):
+        return self.apply_batch(request, replace=True)
+
+
+class JobViewSet(mixins.RetrieveModelMixin, GenericViewSet):
+    """
+    Вьюсет для опроса состояния своих фоновых задач
+    """
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
+
+
+class MetricsView(APIView):
+    """
+    Метрики текущего процесса для администраторов
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class ActivityView(APIView):
+    """
+    Активность по часам или дням из сводок событий для администраторов
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        serializer = ActivityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(get_activity(**serializer.validated_data))
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка набора данных в NDJSON или CSV для администраторов,
+    ?after=<id> продолжает выгрузку после последней полученной строки
+    """
+    permission_classes = (IsAdminUser,)
+    throttle_scope = 'exports'
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise NotFound(f'Неизвестный набор данных: {dataset}')
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            raise ValidationError({'file_format': [
+                'Доступные форматы: {}'.format(', '.join(EXPORT_FORMATS))
+            ]})
+        try:
+            after = IntegerField(min_value=0).run_validation(
+                request.query_params.get('after', 0)
+            )
+        except ValidationError as error:
+            raise ValidationError({'after': error.detail})
+        response = StreamingHttpResponse(
+            render_rows(
+                iter_rows(dataset, after), get_columns(dataset), file_format
+            ),
+            content_type=EXPORT_FORMATS[file_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{file_format}"'
+        )
+        return response
+
+
+class JWTCreateView(TokenObtainPairView):
+    """
+    Выдача пары JWT-токенов по email и паролю
+    """
+    serializer_class = JWTObtainPairSerializer
+
+
+class JWTRefreshView(TokenRefreshView):
+    """
+    Обновление пары JWT-токенов с ротацией refresh-токена
+    """
+    serializer_class = JWTRefreshSerializer
+
+
+class JWTLogoutView(APIView):
+    """
+    Выход: отзыв refresh-токена и текущего access-токена.
+    Только для входа по JWT
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        if not isinstance(request.auth, Token):
+            raise ValidationError(
+                'Выход доступен только при входе по JWT-токену'
+            )
+        serializer = JWTLogoutSerializer(
+            data=request.data, context={'request': request}
+        )
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as error:
+            raise InvalidToken(error.args[0])
+        revocation_list.revoke(serializer.validated_data['token'])
+        revocation_list.revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
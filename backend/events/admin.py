@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import DailyRollup, Event
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    """
+    Панель админа для просмотра журнала событий
+    """
+    list_display = (
+        'id',
+        'created_at',
+        'kind',
+        'user_id',
+        'recipe_id',
+        'author_id',
+    )
+    list_filter = ('kind',)
+    date_hierarchy = 'created_at'
+    show_full_result_count = False
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    """
+    Панель админа для просмотра дневных сводок событий
+    """
+    list_display = ('bucket', 'kind', 'recipe_id', 'author_id', 'count')
+    list_filter = ('kind',)
+    date_hierarchy = 'bucket'
@@ -0,0 +1,13 @@
+import atexit
+
+from django.apps import AppConfig
+from django.core.signals import request_finished
+
+
+class EventsConfig(AppConfig):
+    name = 'events'
+
+    def ready(self):
+        from .buffer import flush_events, flush_events_if_due
+        request_finished.connect(flush_events_if_due)
+        atexit.register(flush_events)
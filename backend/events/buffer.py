@@ -0,0 +1,98 @@
+"""
+Буфер событий в памяти процесса: события пишутся в БД пачками через
+bulk_create, когда набралось EVENTS_BUFFER_SIZE штук или с последней
+записи прошло EVENTS_FLUSH_INTERVAL секунд (проверяется при новом событии
+и по окончании каждого запроса), а также при остановке процесса.
+При падении процесса теряются только события из буфера
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.utils import timezone
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def is_due(self):
+        return (
+            len(self.events) >= getattr(settings, 'EVENTS_BUFFER_SIZE', 100)
+            or time.monotonic() - self.flushed_at
+            >= getattr(settings, 'EVENTS_FLUSH_INTERVAL', 5)
+        )
+
+    def add(self, event):
+        with self.lock:
+            self.events.append(event)
+            due = self.is_due()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Запись накопленных событий, возвращает их число. При ошибке БД
+        события возвращаются в буфер, но не больше EVENTS_BUFFER_LIMIT,
+        чтобы недоступная БД не съела память процесса
+        """
+        with self.lock:
+            events, self.events = self.events, []
+            self.flushed_at = time.monotonic()
+        if not events:
+            return 0
+        try:
+            with transaction.atomic():
+                Event.objects.bulk_create(events, batch_size=500)
+        except DatabaseError:
+            logger.exception('События не записаны: %s', len(events))
+            limit = getattr(settings, 'EVENTS_BUFFER_LIMIT', 10000)
+            with self.lock:
+                self.events = (events + self.events)[-limit:]
+            return 0
+        return len(events)
+
+    def flush_if_due(self):
+        with self.lock:
+            due = bool(self.events) and self.is_due()
+        return self.flush() if due else 0
+
+
+buffer = EventBuffer()
+
+
+def record(kind, user=None, recipe=None, author=None):
+    """
+    Событие в буфер. user, recipe и author - объекты или id
+    """
+    buffer.add(Event(
+        created_at=timezone.now(),
+        kind=kind,
+        user_id=getattr(user, 'pk', user),
+        recipe_id=getattr(recipe, 'pk', recipe),
+        author_id=getattr(author, 'pk', author),
+    ))
+
+
+def flush_events(**kwargs):
+    return buffer.flush()
+
+
+def flush_events_if_due(**kwargs):
+    """
+    Обработчик request_finished: срабатывает после закрытия соединений
+    запроса, поэтому открытое для записи соединение закрывается по тем же
+    правилам CONN_MAX_AGE. Внутри открытой транзакции (тесты, вызовы
+    из atomic) соединение не закрывается
+    """
+    if buffer.flush_if_due() and not connection.in_atomic_block:
+        close_old_connections()
@@ -0,0 +1,62 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from events.models import Event
+from events.partitions import (drop_partitions_before, ensure_partitions,
+                               is_partitioned)
+from events.rollups import floor_day, update_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет часовые и дневные сводки событий, создает секции '
+        'журнала событий на следующие месяцы и удаляет устаревшие'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=parse_date,
+            default=None,
+            help='Пересчитать сводки с даты YYYY-MM-DD',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=2,
+            help='На сколько месяцев вперед создавать секции',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for name in ensure_partitions(
+            timezone.localdate(now), options['months_ahead']
+        ):
+            self.stdout.write(f'Создана секция {name}')
+        since = options['since']
+        if since is not None:
+            since = timezone.make_aware(
+                datetime.datetime.combine(since, datetime.time())
+            )
+        retention = getattr(settings, 'EVENTS_RETENTION_DAYS', None)
+        if retention:
+            cutoff = floor_day(now - datetime.timedelta(days=retention))
+            if since is not None:
+                # сводки за удаленные периоды не пересчитываются
+                since = max(since, cutoff)
+            if is_partitioned():
+                for name in drop_partitions_before(cutoff.date()):
+                    self.stdout.write(f'Удалена секция {name}')
+            else:
+                deleted, _ = Event.objects.filter(
+                    created_at__lt=cutoff
+                ).delete()
+                self.stdout.write(f'Удалено событий: {deleted}')
+        result = update_rollups(since, now)
+        self.stdout.write(
+            f'Строк в часовых сводках: {result["hourly"]}, '
+            f'в дневных: {result["daily"]}'
+        )
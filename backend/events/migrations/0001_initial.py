@@ -0,0 +1,114 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def partition_event_table(apps, schema_editor):
+    """
+    На PostgreSQL таблица событий пересоздается секционированной
+    по created_at. Первичный ключ секционированной таблицы обязан
+    включать ключ секционирования, поэтому он составной (id, created_at),
+    id по-прежнему выдается последовательностью
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TABLE events_event')
+    schema_editor.execute(
+        'CREATE TABLE events_event ('
+        'id bigserial NOT NULL, '
+        'created_at timestamp with time zone NOT NULL, '
+        'kind varchar(32) NOT NULL, '
+        'user_id integer NULL, '
+        'recipe_id integer NULL, '
+        'author_id integer NULL, '
+        'PRIMARY KEY (id, created_at)'
+        ') PARTITION BY RANGE (created_at)'
+    )
+    schema_editor.execute(
+        'CREATE TABLE events_event_default PARTITION OF events_event DEFAULT'
+    )
+    schema_editor.execute(
+        'CREATE INDEX events_event_created_at_idx '
+        'ON events_event (created_at)'
+    )
+
+
+def unpartition_event_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TABLE events_event CASCADE')
+    schema_editor.create_model(apps.get_model('events', 'Event'))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Начало периода')),
+                ('kind', models.CharField(choices=[('favorite_added', 'Добавлен в избранное'), ('favorite_removed', 'Удален из избранного'), ('cart_added', 'Добавлен в список покупок'), ('cart_removed', 'Удален из списка покупок'), ('follow_added', 'Подписка'), ('follow_removed', 'Отписка'), ('recipe_created', 'Рецепт создан'), ('recipe_updated', 'Рецепт изменен'), ('recipe_deleted', 'Рецепт удален')], max_length=32, verbose_name='Тип')),
+                ('recipe_id', models.IntegerField(default=0, verbose_name='Рецепт')),
+                ('author_id', models.IntegerField(default=0, verbose_name='Автор')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Сводка за день',
+                'verbose_name_plural': 'Сводки за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время')),
+                ('kind', models.CharField(choices=[('favorite_added', 'Добавлен в избранное'), ('favorite_removed', 'Удален из избранного'), ('cart_added', 'Добавлен в список покупок'), ('cart_removed', 'Удален из списка покупок'), ('follow_added', 'Подписка'), ('follow_removed', 'Отписка'), ('recipe_created', 'Рецепт создан'), ('recipe_updated', 'Рецепт изменен'), ('recipe_deleted', 'Рецепт удален')], max_length=32, verbose_name='Тип')),
+                ('user_id', models.IntegerField(null=True, verbose_name='Пользователь')),
+                ('recipe_id', models.IntegerField(null=True, verbose_name='Рецепт')),
+                ('author_id', models.IntegerField(null=True, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Начало периода')),
+                ('kind', models.CharField(choices=[('favorite_added', 'Добавлен в избранное'), ('favorite_removed', 'Удален из избранного'), ('cart_added', 'Добавлен в список покупок'), ('cart_removed', 'Удален из списка покупок'), ('follow_added', 'Подписка'), ('follow_removed', 'Отписка'), ('recipe_created', 'Рецепт создан'), ('recipe_updated', 'Рецепт изменен'), ('recipe_deleted', 'Рецепт удален')], max_length=32, verbose_name='Тип')),
+                ('recipe_id', models.IntegerField(default=0, verbose_name='Рецепт')),
+                ('author_id', models.IntegerField(default=0, verbose_name='Автор')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Сводка за час',
+                'verbose_name_plural': 'Сводки за час',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='hourlyrollup',
+            index=models.Index(fields=['recipe_id', 'bucket'], name='hourly_rollup_recipe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlyrollup',
+            constraint=models.UniqueConstraint(fields=('bucket', 'kind', 'recipe_id', 'author_id'), name='unique_hourly_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrollup',
+            index=models.Index(fields=['recipe_id', 'bucket'], name='daily_rollup_recipe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('bucket', 'kind', 'recipe_id', 'author_id'), name='unique_daily_rollup'),
+        ),
+        migrations.RunPython(partition_event_table, unpartition_event_table),
+    ]
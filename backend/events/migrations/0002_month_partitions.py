@@ -0,0 +1,41 @@
+import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def next_month(value):
+    return datetime.date(
+        value.year + value.month // 12, value.month % 12 + 1, 1
+    )
+
+
+def create_month_partitions(apps, schema_editor):
+    """
+    Секции текущего и двух следующих месяцев сразу при миграции, чтобы
+    события до первого запуска rollup_events не копились в DEFAULT.
+    Секция DEFAULT только что создана и пуста, переносить из нее нечего
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    month = timezone.localdate().replace(day=1)
+    for _ in range(3):
+        following = next_month(month)
+        schema_editor.execute(
+            f'CREATE TABLE IF NOT EXISTS '
+            f'events_event_y{month.year:04d}m{month.month:02d} '
+            f'PARTITION OF events_event FOR VALUES FROM (%s) TO (%s)',
+            params=[month.isoformat(), following.isoformat()],
+        )
+        month = following
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_month_partitions, migrations.RunPython.noop),
+    ]
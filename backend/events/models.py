@@ -0,0 +1,130 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Event(models.Model):
+    """
+    Событие активности пользователей. Таблица только дополняется,
+    поэтому идентификаторы хранятся без внешних ключей: удаление
+    пользователя или рецепта не затрагивает журнал. На PostgreSQL
+    таблица секционирована по месяцам по created_at
+    """
+    FAVORITE_ADDED = 'favorite_added'
+    FAVORITE_REMOVED = 'favorite_removed'
+    CART_ADDED = 'cart_added'
+    CART_REMOVED = 'cart_removed'
+    FOLLOW_ADDED = 'follow_added'
+    FOLLOW_REMOVED = 'follow_removed'
+    RECIPE_CREATED = 'recipe_created'
+    RECIPE_UPDATED = 'recipe_updated'
+    RECIPE_DELETED = 'recipe_deleted'
+    KINDS = (
+        (FAVORITE_ADDED, 'Добавлен в избранное'),
+        (FAVORITE_REMOVED, 'Удален из избранного'),
+        (CART_ADDED, 'Добавлен в список покупок'),
+        (CART_REMOVED, 'Удален из списка покупок'),
+        (FOLLOW_ADDED, 'Подписка'),
+        (FOLLOW_REMOVED, 'Отписка'),
+        (RECIPE_CREATED, 'Рецепт создан'),
+        (RECIPE_UPDATED, 'Рецепт изменен'),
+        (RECIPE_DELETED, 'Рецепт удален'),
+    )
+    id = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Время'
+    )
+    kind = models.CharField(
+        max_length=32,
+        choices=KINDS,
+        verbose_name='Тип'
+    )
+    user_id = models.IntegerField(
+        null=True,
+        verbose_name='Пользователь'
+    )
+    recipe_id = models.IntegerField(
+        null=True,
+        verbose_name='Рецепт'
+    )
+    author_id = models.IntegerField(
+        null=True,
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+
+    def __str__(self):
+        return f'{self.created_at}: {self.kind}'
+
+
+class Rollup(models.Model):
+    """
+    Число событий за период по типу, рецепту и автору,
+    0 вместо id - измерение не задано
+    """
+    bucket = models.DateTimeField(
+        verbose_name='Начало периода'
+    )
+    kind = models.CharField(
+        max_length=32,
+        choices=Event.KINDS,
+        verbose_name='Тип'
+    )
+    recipe_id = models.IntegerField(
+        default=0,
+        verbose_name='Рецепт'
+    )
+    author_id = models.IntegerField(
+        default=0,
+        verbose_name='Автор'
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f'{self.bucket}: {self.kind} {self.count}'
+
+
+class HourlyRollup(Rollup):
+    class Meta:
+        verbose_name = 'Сводка за час'
+        verbose_name_plural = 'Сводки за час'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('bucket', 'kind', 'recipe_id', 'author_id'),
+                name='unique_hourly_rollup'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe_id', 'bucket'),
+                name='hourly_rollup_recipe_idx'
+            )
+        ]
+
+
+class DailyRollup(Rollup):
+    class Meta:
+        verbose_name = 'Сводка за день'
+        verbose_name_plural = 'Сводки за день'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('bucket', 'kind', 'recipe_id', 'author_id'),
+                name='unique_daily_rollup'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe_id', 'bucket'),
+                name='daily_rollup_recipe_idx'
+            )
+        ]
@@ -0,0 +1,133 @@
+"""
+Месячные секции таблицы событий на PostgreSQL. Секции создаются заранее,
+секция DEFAULT принимает события вне созданных диапазонов, чтобы запись
+никогда не падала; ее строки переносятся в секцию месяца при создании
+секции. Старые события удаляются целыми секциями через
+DROP TABLE без DELETE и VACUUM. На остальных БД функции ничего не делают
+"""
+import datetime
+import re
+
+from django.db import connection, transaction
+
+from .models import Event
+
+PARTITION_NAME = re.compile(r'_y(\d{4})m(\d{2})$')
+DEFAULT_PARTITION = f'{Event._meta.db_table}_default'
+
+
+def is_partitioned():
+    return connection.vendor == 'postgresql'
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def next_month(value):
+    return datetime.date(
+        value.year + value.month // 12, value.month % 12 + 1, 1
+    )
+
+
+def partition_name(month):
+    return f'{Event._meta.db_table}_y{month.year:04d}m{month.month:02d}'
+
+
+def list_partitions():
+    """
+    Месячные секции таблицы событий: {первое число месяца: имя}
+    """
+    if not is_partitioned():
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON pg_inherits.inhparent = parent.oid '
+            'JOIN pg_class child ON pg_inherits.inhrelid = child.oid '
+            'WHERE parent.relname = %s',
+            [Event._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.search(name)
+        if match:
+            year, month = map(int, match.groups())
+            partitions[datetime.date(year, month, 1)] = name
+    return partitions
+
+
+def create_partition(month):
+    """
+    Секция месяца. События этого месяца, уже попавшие в секцию DEFAULT
+    (например, записанные до первого запуска), PostgreSQL не дает
+    оставить там при создании секции, поэтому DEFAULT на время
+    отсоединяется, а ее строки за месяц переносятся в новую секцию
+    """
+    quote = connection.ops.quote_name
+    table = quote(Event._meta.db_table)
+    default = quote(DEFAULT_PARTITION)
+    bounds = [month.isoformat(), next_month(month).isoformat()]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {default} '
+            f'WHERE created_at >= %s AND created_at < %s)',
+            bounds,
+        )
+        misplaced = cursor.fetchone()[0]
+        if misplaced:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        cursor.execute(
+            f'CREATE TABLE {quote(partition_name(month))} PARTITION OF '
+            f'{table} FOR VALUES FROM (%s) TO (%s)',
+            bounds,
+        )
+        if misplaced:
+            cursor.execute(
+                f'INSERT INTO {table} SELECT * FROM {default} '
+                f'WHERE created_at >= %s AND created_at < %s',
+                bounds,
+            )
+            cursor.execute(
+                f'DELETE FROM {default} '
+                f'WHERE created_at >= %s AND created_at < %s',
+                bounds,
+            )
+            cursor.execute(
+                f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT'
+            )
+
+
+def ensure_partitions(today, months_ahead=2):
+    """
+    Секции с текущего месяца на months_ahead месяцев вперед,
+    возвращает имена созданных секций
+    """
+    if not is_partitioned():
+        return []
+    existing = list_partitions()
+    created = []
+    month = month_start(today)
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            create_partition(month)
+            created.append(partition_name(month))
+        month = next_month(month)
+    return created
+
+
+def drop_partitions_before(day):
+    """
+    Удаление секций, целиком лежащих раньше day,
+    возвращает имена удаленных секций
+    """
+    quote = connection.ops.quote_name
+    dropped = []
+    for month, name in sorted(list_partitions().items()):
+        if next_month(month) > day:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {quote(name)}')
+        dropped.append(name)
+    return dropped
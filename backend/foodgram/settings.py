@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
 
@@ -10,13 +11,20 @@ SECRET_KEY = os.getenv('SECRET_KEY', default='My_Secret_KEY')
 
 DEBUG = True
 
+JWT_AUTH = os.getenv('JWT_AUTH', default='False') == 'True'
+
 ALLOWED_HOSTS = ['*']
 
+# Процессы, обслуживающие только API, могут не загружать админку
+# и ее зависимости (import_export): ADMIN_ENABLED=False
+ADMIN_ENABLED = os.getenv('ADMIN_ENABLED', default='True') == 'True'
+
 INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
-    'django.contrib.admin',
+    'jobs.apps.JobsConfig',
+    'events.apps.EventsConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -27,24 +35,38 @@ INSTALLED_APPS = [
     'colorfield',
     'rest_framework',
     'djoser',
-    'import_export',
     'rest_framework.authtoken',
 ]
 
+if ADMIN_ENABLED:
+    INSTALLED_APPS += [
+        'django.contrib.admin',
+        'import_export',
+    ]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
 ]
 
 CORS_ORIGIN_ALLOW_ALL = True
 
+COMPRESSION_MIN_SIZE = 200
+
+COMPRESSION_BROTLI = True
+
+COMPRESSION_CACHED_PATHS = ('/api/v1/tags/', '/api/v1/ingredients/')
+
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -73,7 +95,13 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Соединение живет между запросами: воркер gunicorn открывает его
+        # при прогреве после fork и не платит за подключение на запросе
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default='60')),
+        # Параллельные тесты на SQLite требуют файловой тестовой базы:
+        # в общей базе в памяти конкурирующие записи не ждут блокировку
+        'TEST': {'NAME': os.getenv('DB_TEST_NAME')},
     }
 }
 
@@ -122,10 +150,126 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.v1.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.v1.throttling.AnonBucketThrottle',
+        'api.v1.throttling.UserBucketThrottle',
+        'api.v1.throttling.WriteBucketThrottle',
+        'api.v1.throttling.ScopedBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '120/min',
+        'user': '600/min',
+        'writes': '60/min',
+        'exports': '10/min',
+    },
+    # IP клиента для лимитов анонимов - из X-Forwarded-For, который
+    # выставляет nginx (infra/nginx.conf), а не адрес самого nginx
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default='1')),
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.v1.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.v1.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+if JWT_AUTH:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(
+        0, 'api.v1.tokens.StatelessJWTAuthentication'
+    )
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'ROTATE_REFRESH_TOKENS': True,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+}
+
+JWT_REVOCATION_REFRESH = 30
+
+JWT_REVOCATION_REBUILD = 60 * 60
+
+POPULARITY_WEIGHTS = {
+    'favorite': 2,
+    'shopping_cart': 1,
+}
+
+TRENDING_HALF_LIFE = 3 * 24 * 60 * 60
+
+SIMILAR_RECIPES_COUNT = 10
+
+SIMILAR_RECIPES_INGREDIENT_WEIGHT = 0.7
+
+JOBS_EAGER = os.getenv('JOBS_EAGER', default='False') == 'True'
+
+JOB_LEASE = 60
+
+JOB_HEARTBEAT_INTERVAL = 15
+
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+JOB_PRUNE_INTERVAL = 60 * 60
+
+SHOPPING_LIST_EXPORT_TTL = 7 * 24 * 60 * 60
+
+SCALED_RECIPE_CACHE_TIMEOUT = 60 * 60
+
+INGREDIENT_SEARCH_LIMIT = 20
+
+INGREDIENT_SEARCH_THRESHOLD = 0.3
+
+PURGE_BATCH_SIZE = 500
+
+CATALOG_SNAPSHOT_DIR = os.getenv(
+    'CATALOG_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'catalog')
+)
+
+CATALOG_CHECK_INTERVAL = 1
+
+CATALOG_VERSION_INTERVAL = 60
+
+MEAL_PLAN_MAX_DAYS = 62
+
+PANTRY_MAX_ITEMS = 1000
+
+NUTRITION_RECOMPUTE_CHUNK_SIZE = 500
+
+AUTHOR_STATS_TOP_INGREDIENTS = 10
+
+AUTHOR_STATS_BATCH_SIZE = 500
+
+EVENTS_BUFFER_SIZE = 100
+
+EVENTS_FLUSH_INTERVAL = 5
+
+EVENTS_BUFFER_LIMIT = 10000
+
+EVENTS_ROLLUP_LATENESS = 60 * 60
+
+EVENTS_RETENTION_DAYS = int(os.getenv('EVENTS_RETENTION_DAYS', default='0'))
+
+TOKEN_CACHE_TTL = 60
+
+TOKEN_CACHE_SIZE = 10000
+
+TOKEN_CACHE_CHECK_INTERVAL = 5
+
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', default='local')
+
+THROTTLE_TRUSTED_TOKENS = [
+    token for token in os.getenv('THROTTLE_TRUSTED_TOKENS', '').split(',')
+    if token
+]
+
 DJOSER = {
     'HIDE_USERS': False,
     'SERIALIZERS': {
@@ -0,0 +1,96 @@
+"""
+Прогрев процесса до первого запроса: в мастере gunicorn (preload_app)
+загружаются все модули и кеши, которые иначе каждый воркер подгружал бы
+на первом запросе, а воркеры после fork получают их копией страниц
+и открывают только собственные соединения с БД
+"""
+import inspect
+import logging
+import time
+
+from django.apps import apps
+from django.db import connection, connections
+from django.urls import get_resolver
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+SERIALIZER_MODULES = ('api.v1.serializers',)
+
+
+def warm_urls():
+    """
+    Построение URL-резолвера: импортирует все urls, вьюхи и сериализаторы
+    """
+    get_resolver().reverse_dict
+
+
+def warm_models():
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.related_objects
+
+
+def warm_serializers():
+    """
+    Построение полей сериализаторов: загружает описания полей моделей
+    и модули полей (в том числе Pillow для картинок)
+    """
+    from PIL import Image
+    Image.preinit()
+    for module_name in SERIALIZER_MODULES:
+        module = __import__(module_name, fromlist=['*'])
+        for _, serializer_class in inspect.getmembers(
+            module, inspect.isclass
+        ):
+            if (
+                not issubclass(serializer_class, BaseSerializer)
+                or serializer_class.__module__ != module_name
+            ):
+                continue
+            try:
+                serializer_class(context={}).fields
+            except Exception:
+                logger.warning(
+                    'Не удалось прогреть %s', serializer_class, exc_info=True
+                )
+
+
+def warm_reference_data():
+    """
+    Снимок каталога (с постановкой построения, если его нет) и индекс
+    нечеткого поиска (если поиск не в БД)
+    """
+    from recipes.catalog import ensure_catalog
+    from recipes.search import get_index
+    ensure_catalog()
+    if connection.vendor != 'postgresql':
+        get_index()
+
+
+def warm_up_master():
+    """
+    Прогрев в мастере перед fork. Соединения с БД, открытые при прогреве,
+    закрываются, чтобы воркеры не унаследовали общие сокеты
+    """
+    started = time.monotonic()
+    warm_urls()
+    warm_models()
+    warm_serializers()
+    try:
+        warm_reference_data()
+    finally:
+        connections.close_all()
+    logger.info('Прогрев за %.0f мс', (time.monotonic() - started) * 1000)
+
+
+def warm_up_worker():
+    """
+    Прогрев воркера после fork: собственные соединения с БД. Они
+    переживают первый запрос только при CONN_MAX_AGE > 0, иначе Django
+    закрывает их на request_started и прогревать нечего
+    """
+    connections.close_all()
+    for database in connections:
+        if connections[database].settings_dict['CONN_MAX_AGE']:
+            connections[database].ensure_connection()
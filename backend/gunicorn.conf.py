@@ -0,0 +1,21 @@
+"""
+Настройки gunicorn: приложение загружается и прогревается в мастере
+(preload_app), воркеры после fork только открывают соединения с БД
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', default='1'))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default='0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+preload_app = True
+
+
+def when_ready(server):
+    from foodgram.warmup import warm_up_master
+    warm_up_master()
+
+
+def post_fork(server, worker):
+    from foodgram.warmup import warm_up_worker
+    warm_up_worker()
@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Панель админа для просмотра фоновых задач
+    """
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name',)
+    search_fields = ('name',)
+    raw_id_fields = ('user',)
+    empty_value_display = '-пусто-'
@@ -0,0 +1,96 @@
+import logging
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from jobs.queue import claim, prune_jobs, run_job
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Обработчик очереди: забирает задачи, пока не получит сигнал остановки.
+    В простое не чаще раза в JOB_PRUNE_INTERVAL секунд удаляет старые
+    выполненные задачи
+    """
+    def __init__(self, poll_interval, once):
+        self.poll_interval = poll_interval
+        self.once = once
+        self.stopped = False
+        self.pruned_at = None
+
+    def prune(self):
+        interval = getattr(settings, 'JOB_PRUNE_INTERVAL', 60 * 60)
+        now = time.monotonic()
+        if self.pruned_at is not None and now - self.pruned_at < interval:
+            return
+        self.pruned_at = now
+        try:
+            prune_jobs()
+        except DatabaseError:
+            logger.exception('Не удалось удалить выполненные задачи')
+
+    def stop(self, signum, frame):
+        self.stopped = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.stopped:
+            try:
+                job = claim()
+            except DatabaseError:
+                logger.exception('Не удалось получить задачу из очереди')
+                connections.close_all()
+                time.sleep(self.poll_interval)
+                continue
+            if job is not None:
+                run_job(job)
+                continue
+            self.prune()
+            if self.once:
+                break
+            time.sleep(self.poll_interval)
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов для выполнения фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help='Количество процессов-обработчиков',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, сек.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить задачи из очереди и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        connections.close_all()
+        worker = Worker(options['poll_interval'], options['once'])
+        processes = [
+            multiprocessing.Process(target=worker.run)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        signal.signal(signal.SIGTERM, lambda signum, frame: [
+            process.terminate() for process in processes
+        ])
+        for process in processes:
+            process.join()
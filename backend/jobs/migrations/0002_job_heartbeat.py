@@ -0,0 +1,29 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_heartbeats(apps, schema_editor):
+    """
+    Задачи в работе до появления аренды считаются продленными
+    в момент запуска
+    """
+    Job = apps.get_model('jobs', 'Job')
+    Job.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний сигнал обработчика'),
+        ),
+        migrations.RunPython(fill_heartbeats, migrations.RunPython.noop),
+    ]
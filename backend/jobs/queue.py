@@ -0,0 +1,212 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name):
+    """
+    Регистрация функции как фоновой задачи с заданным именем.
+    Функция получает параметры задачи как именованные аргументы,
+    ее результат должен сериализоваться в JSON
+    """
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, priority=0, max_attempts=3, user=None):
+    """
+    Постановка задачи в очередь. В режиме JOBS_EAGER задача выполняется
+    сразу после коммита текущей транзакции
+    """
+    if name not in registry:
+        raise KeyError(f'Неизвестная задача: {name}')
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        user=user,
+    )
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: run_job(claim(job_id=job.pk)))
+    return job
+
+
+def enqueue_once(name, payload=None, **kwargs):
+    """
+    Постановка задачи, если такая же задача еще не ждет выполнения:
+    частые изменения схлопываются в один пересчет
+    """
+    if Job.objects.filter(
+        name=name, payload=payload or {}, status=Job.QUEUED
+    ).exists():
+        return None
+    return enqueue(name, payload, **kwargs)
+
+
+def fail_stale(expired_before):
+    """
+    Зависшие задачи без оставшихся попыток: обработчик упал на последней
+    попытке, повторять такую задачу нельзя
+    """
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat_at__lt=expired_before,
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED,
+        error='Обработчик перестал подавать сигнал (JOB_LEASE)',
+        finished_at=timezone.now(),
+    )
+
+
+def claim(job_id=None):
+    """
+    Захват следующей задачи: SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому несколько обработчиков не берут одну задачу.
+    Задача в работе принадлежит обработчику, пока он раз в
+    JOB_HEARTBEAT_INTERVAL секунд продлевает heartbeat_at. Задачи без
+    сигнала дольше JOB_LEASE секунд возвращаются в очередь, а исчерпавшие
+    max_attempts помечаются ошибкой
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'JOB_LEASE', 60))
+    with transaction.atomic():
+        queryset = Job.objects.select_for_update(skip_locked=True)
+        if job_id is not None:
+            queryset = queryset.filter(pk=job_id, status=Job.QUEUED)
+        else:
+            fail_stale(now - lease)
+            queryset = queryset.filter(
+                Q(status=Job.QUEUED, run_after__lte=now)
+                | Q(
+                    status=Job.RUNNING,
+                    heartbeat_at__lt=now - lease,
+                    attempts__lt=F('max_attempts'),
+                )
+            ).order_by('-priority', 'run_after', 'id')
+        job = queryset.first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=(
+            'status', 'attempts', 'started_at', 'heartbeat_at'
+        ))
+    return job
+
+
+def owned(job):
+    """
+    Задача, пока ее выполняет этот обработчик: после повторного захвата
+    другим обработчиком меняется число попыток
+    """
+    return Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    )
+
+
+def touch_job(job):
+    """
+    Продление аренды задачи, False - задачу уже забрал другой обработчик
+    """
+    return bool(owned(job).update(heartbeat_at=timezone.now()))
+
+
+def heartbeat(job, finished):
+    """
+    Сигнал обработчика в отдельном потоке со своим соединением с БД,
+    пока задача выполняется
+    """
+    interval = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 15)
+    try:
+        while not finished.wait(interval):
+            try:
+                if not touch_job(job):
+                    logger.warning('Задачу %s забрал другой обработчик', job)
+                    return
+            except DatabaseError:
+                logger.exception('Не удалось продлить задачу %s', job)
+    finally:
+        connections.close_all()
+
+
+def execute(job):
+    finished = threading.Event()
+    beat = threading.Thread(target=heartbeat, args=(job, finished))
+    beat.daemon = True
+    beat.start()
+    try:
+        return registry[job.name](**job.payload)
+    finally:
+        finished.set()
+        beat.join()
+
+
+def run_job(job):
+    """
+    Выполнение захваченной задачи с сохранением результата
+    или повтором с экспоненциальной задержкой при ошибке. Результат
+    задачи, которую после потери аренды забрал другой обработчик,
+    не записывается
+    """
+    if job is None:
+        return None
+    try:
+        result = execute(job)
+    except Exception:
+        logger.exception('Задача %s завершилась с ошибкой', job)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=2 ** job.attempts
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    if not owned(job).update(
+        status=job.status, result=job.result, error=job.error,
+        run_after=job.run_after, finished_at=job.finished_at,
+    ):
+        logger.warning('Результат задачи %s отброшен: аренда истекла', job)
+    return job
+
+
+def prune_jobs(batch_size=1000):
+    """
+    Удаление выполненных задач старше JOB_RETENTION секунд пачками,
+    чтобы таблица очереди не росла. Возвращает число удаленных строк
+    """
+    retention = getattr(settings, 'JOB_RETENTION', 7 * 24 * 60 * 60)
+    expired = Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(seconds=retention),
+    ).order_by()
+    deleted = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += Job.objects.filter(pk__in=pks).delete()[0]
@@ -1,13 +1,20 @@
+from api.admin_tools import AutocompleteFilter, FastChangeListMixin
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
+from jobs.queue import enqueue
 
-from .models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
-                     ShoppingCart, Tag)
+from .models import (NUTRIENTS, Favorite, Ingredient, IngredientsInRecipe,
+                     Recipe, ShoppingCart, Tag)
+from .nutrition import RECOMPUTE_TASK, refresh_recipe_nutrition
+from .purge import soft_delete_recipes
 
 
 class IngredientsInRecipeAdmin(admin.TabularInline):
     model = IngredientsInRecipe
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Tag)
@@ -33,6 +40,7 @@ class IngredientResource(resources.ModelResource):
     """
     class Meta:
         model = Ingredient
+        exclude = ('canonical_unit', 'unit_factor', 'nutrition_factor')
 
 
 @admin.register(Ingredient)
@@ -48,9 +56,15 @@ class IngredientAdmin(ImportExportModelAdmin):
     list_filter = ('name',)
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recompute = {*NUTRIENTS, 'measurement_unit'} & set(form.changed_data)
+        if change and recompute:
+            enqueue(RECOMPUTE_TASK, {'ingredient_ids': [obj.pk]})
+
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(FastChangeListMixin, admin.ModelAdmin):
     """
     Панель админа для редактирования рецептов со всеми необходимыми полями,
     фильтрами и поисками
@@ -62,36 +76,70 @@ class RecipeAdmin(admin.ModelAdmin):
         'pub_date',
     )
     list_display_links = ('name',)
+    list_select_related = ('author',)
     search_fields = ('name',)
-    list_filter = ('name', 'author',)
+    list_filter = (('author', AutocompleteFilter),)
+    autocomplete_fields = ('author',)
     empty_value_display = '-пусто-'
     readonly_fields = ('in_favorited',)
     filter_horizontal = ('tags',)
     inlines = (IngredientsInRecipeAdmin,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(
+                Favorite.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    total=Count('id')
+                ).values('total')
+            ), 0)
+        )
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def in_favorited(self, obj):
-        return obj.in_favorited.all().count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_recipe_nutrition(form.instance)
+
+    def delete_model(self, request, obj):
+        soft_delete_recipes(Recipe.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_recipes(queryset)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(FastChangeListMixin, admin.ModelAdmin):
     """
     Панель админа для редактирования избранного со всеми необходимыми полями,
     фильтрами и поисками
     """
     list_display = ('user', 'recipe',)
-    search_fields = ('user', 'recipe',)
-    list_filter = ('recipe',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name',)
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('recipe', AutocompleteFilter),
+    )
+    autocomplete_fields = ('user', 'recipe')
     empty_value_display = '-пусто-'
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(FastChangeListMixin, admin.ModelAdmin):
     """
     Панель админа для редактирования списка покупок со всеми необходимыми
     полями, фильтрами и поисками
     """
-    list_display = ('user', 'recipe',)
-    search_fields = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
+    list_display = ('user', 'recipe', 'multiplier',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name',)
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('recipe', AutocompleteFilter),
+    )
+    autocomplete_fields = ('user', 'recipe')
     empty_value_display = '-пусто-'
@@ -0,0 +1,385 @@
+"""
+Неизменяемый снимок справочников (ингредиенты и теги) в двоичном файле.
+Файл открывается через mmap, поэтому все процессы gunicorn читают одни
+и те же страницы page cache. Новый снимок пишется во временный файл
+и публикуется атомарной заменой указателя current, процессы подхватывают
+его без перезапуска.
+
+Формат (little-endian): заголовок HEADER, таблица единиц измерения UNIT,
+ингредиенты INGREDIENT по возрастанию названия в нижнем регистре,
+индекс ID_ROW (id -> строка) по возрастанию id, теги TAG в порядке
+модели и общий блок строк UTF-8, на который ссылаются (смещение, длина)
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from jobs.queue import enqueue_once
+
+from .models import Checkpoint, Ingredient, Tag
+
+MAGIC = b'FGCAT001'
+HEADER = struct.Struct('<8sQ8I')
+UNIT = struct.Struct('<IH')
+INGREDIENT = struct.Struct('<IIHH')
+ID_ROW = struct.Struct('<II')
+TAG = struct.Struct('<IIHIHIH')
+POINTER = 'current'
+VERSION_FILE = 'version'
+VERSION_CHECKPOINT = 'catalog'
+BUILD_TASK = 'recipes.build_catalog'
+KEEP_SNAPSHOTS = 2
+
+
+def snapshot_dir():
+    return getattr(settings, 'CATALOG_SNAPSHOT_DIR', None)
+
+
+def source_version():
+    """
+    Версия данных справочников - время последнего изменения в наносекундах.
+    Хранится в БД, а не в кеше, чтобы ее одинаково видели веб-процессы
+    и обработчики фоновых задач
+    """
+    return Checkpoint.objects.filter(
+        name=VERSION_CHECKPOINT
+    ).values_list('position', flat=True).first() or 0
+
+
+def read_version(directory):
+    try:
+        with open(os.path.join(directory, VERSION_FILE), 'rb') as source:
+            return int(source.read())
+    except (OSError, ValueError):
+        return 0
+
+
+def publish_version(directory, version):
+    """
+    Метка последней закоммиченной версии рядом со снимками: процессы
+    сравнивают с ней заголовок снимка, не обращаясь к БД
+    """
+    os.makedirs(directory, exist_ok=True)
+    if read_version(directory) < version:
+        write_atomic(
+            os.path.join(directory, VERSION_FILE), str(version).encode()
+        )
+    state['checked_at'] = None
+
+
+def invalidate_catalog():
+    """
+    Снимок устарел: после коммита процессы перестают им пользоваться
+    до публикации нового, который строится в фоне
+    """
+    version = time.time_ns()
+    Checkpoint.objects.update_or_create(
+        name=VERSION_CHECKPOINT, defaults={'position': version}
+    )
+    directory = snapshot_dir()
+    if directory:
+        enqueue_once(BUILD_TASK)
+        transaction.on_commit(
+            lambda: publish_version(directory, version)
+        )
+
+
+class StringTable:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        encoded = text.encode()
+        if text not in self.offsets:
+            self.offsets[text] = len(self.data)
+            self.data += encoded
+        return self.offsets[text], len(encoded)
+
+
+def pack_snapshot(version, ingredients, tags):
+    """
+    Двоичное представление снимка из кортежей (id, название, единица)
+    и (id, название, цвет, slug)
+    """
+    ingredients = sorted(
+        ingredients, key=lambda item: (item[1].lower(), item[0])
+    )
+    units = sorted({unit for _, _, unit in ingredients})
+    unit_ids = {unit: unit_id for unit_id, unit in enumerate(units)}
+    strings = StringTable()
+    unit_rows = b''.join(UNIT.pack(*strings.add(unit)) for unit in units)
+    ingredient_rows = b''.join(
+        INGREDIENT.pack(pk, *strings.add(name), unit_ids[unit])
+        for pk, name, unit in ingredients
+    )
+    id_rows = b''.join(
+        ID_ROW.pack(pk, row) for pk, row in sorted(
+            (item[0], row) for row, item in enumerate(ingredients)
+        )
+    )
+    tag_rows = b''.join(
+        TAG.pack(
+            pk, *strings.add(name), *strings.add(color), *strings.add(slug)
+        )
+        for pk, name, color, slug in tags
+    )
+    units_offset = HEADER.size
+    ingredients_offset = units_offset + len(unit_rows)
+    ids_offset = ingredients_offset + len(ingredient_rows)
+    tags_offset = ids_offset + len(id_rows)
+    strings_offset = tags_offset + len(tag_rows)
+    header = HEADER.pack(
+        MAGIC, version, len(units), len(ingredients), len(tags),
+        units_offset, ingredients_offset, ids_offset, tags_offset,
+        strings_offset,
+    )
+    return b''.join((
+        header, unit_rows, ingredient_rows, id_rows, tag_rows,
+        bytes(strings.data),
+    ))
+
+
+def write_atomic(path, data):
+    directory = os.path.dirname(path)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            output.write(data)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def build_snapshot(directory=None):
+    """
+    Построение и публикация снимка. Версия берется до чтения БД, поэтому
+    изменение во время построения сделает снимок устаревшим, а не
+    незаметно потерянным. Возвращает путь к файлу снимка
+    """
+    directory = directory or snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    version = source_version()
+    data = pack_snapshot(
+        version,
+        Ingredient.objects.values_list('id', 'name', 'measurement_unit'),
+        list(Tag.objects.values_list('id', 'name', 'color', 'slug')),
+    )
+    name = f'catalog-{version}-{time.time_ns()}.bin'
+    write_atomic(os.path.join(directory, name), data)
+    write_atomic(os.path.join(directory, POINTER), name.encode())
+    snapshots = sorted(
+        (item for item in os.listdir(directory)
+         if item.startswith('catalog-') and item != name),
+        key=lambda item: os.path.getmtime(os.path.join(directory, item)),
+    )
+    for old in snapshots[:max(len(snapshots) - KEEP_SNAPSHOTS + 1, 0)]:
+        try:
+            os.unlink(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+    return os.path.join(directory, name)
+
+
+class CatalogSnapshot:
+    """
+    Чтение снимка через mmap: записи разбираются по запросу,
+    в памяти процесса хранится только словарь тегов
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            self.buffer = mmap.mmap(
+                source.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (
+            magic, self.version, self.unit_count, self.ingredient_count,
+            self.tag_count, self.units_offset, self.ingredients_offset,
+            self.ids_offset, self.tags_offset, self.strings_offset,
+        ) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Неизвестный формат снимка: {path}')
+        self.path = path
+        self.tag_list = [self.tag_at(row) for row in range(self.tag_count)]
+        self.tags_by_id = {tag['id']: tag for tag in self.tag_list}
+
+    def string(self, offset, length):
+        start = self.strings_offset + offset
+        return self.buffer[start:start + length].decode()
+
+    def unit(self, unit_id):
+        return self.string(*UNIT.unpack_from(
+            self.buffer, self.units_offset + unit_id * UNIT.size
+        ))
+
+    def ingredient_record(self, row):
+        return INGREDIENT.unpack_from(
+            self.buffer, self.ingredients_offset + row * INGREDIENT.size
+        )
+
+    def name_at(self, row):
+        _, name_offset, name_length, _ = self.ingredient_record(row)
+        return self.string(name_offset, name_length)
+
+    def ingredient_at(self, row):
+        pk, name_offset, name_length, unit_id = self.ingredient_record(row)
+        return {
+            'id': pk,
+            'name': self.string(name_offset, name_length),
+            'measurement_unit': self.unit(unit_id),
+        }
+
+    def find_row(self, pk):
+        low, high = 0, self.ingredient_count
+        while low < high:
+            middle = (low + high) // 2
+            middle_pk, row = ID_ROW.unpack_from(
+                self.buffer, self.ids_offset + middle * ID_ROW.size
+            )
+            if middle_pk == pk:
+                return row
+            if middle_pk < pk:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def ingredient(self, pk):
+        row = self.find_row(pk)
+        return None if row is None else self.ingredient_at(row)
+
+    def ingredients(self, pks):
+        """
+        Ингредиенты по списку id в том же порядке, отсутствующие
+        пропускаются
+        """
+        rows = (self.find_row(pk) for pk in pks)
+        return [self.ingredient_at(row) for row in rows if row is not None]
+
+    def ingredient_list(self):
+        """
+        Все ингредиенты в порядке модели (по убыванию названия)
+        """
+        return [
+            self.ingredient_at(row)
+            for row in range(self.ingredient_count - 1, -1, -1)
+        ]
+
+    def search_prefix(self, terms):
+        """
+        Ингредиенты, название которых начинается с каждого из terms
+        без учета регистра (как поиск ^name в SearchFilter)
+        """
+        terms = [term.lower() for term in terms]
+        prefix = max(terms, key=len)
+        low, high = 0, self.ingredient_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.name_at(middle).lower() < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        for row in range(low, self.ingredient_count):
+            name = self.name_at(row).lower()
+            if not name.startswith(prefix):
+                break
+            if all(name.startswith(term) for term in terms):
+                found.append(self.ingredient_at(row))
+        found.reverse()
+        return found
+
+    def iter_names(self):
+        for row in range(self.ingredient_count):
+            pk, name_offset, name_length, _ = self.ingredient_record(row)
+            yield pk, self.string(name_offset, name_length)
+
+    def tag_at(self, row):
+        (
+            pk, name_offset, name_length, color_offset, color_length,
+            slug_offset, slug_length,
+        ) = TAG.unpack_from(self.buffer, self.tags_offset + row * TAG.size)
+        return {
+            'id': pk,
+            'name': self.string(name_offset, name_length),
+            'color': self.string(color_offset, color_length),
+            'slug': self.string(slug_offset, slug_length),
+        }
+
+    def tags(self):
+        return self.tag_list
+
+    def tag(self, pk):
+        return self.tags_by_id.get(pk)
+
+
+state = {
+    'snapshot': None, 'fresh': False, 'checked_at': None,
+    'db_version': 0, 'db_checked_at': None,
+}
+state_lock = threading.Lock()
+
+
+def refresh_state(directory, now):
+    """
+    Сравнение заголовка снимка с меткой версии в каталоге снимков.
+    Версия в БД перечитывается не чаще раза в CATALOG_VERSION_INTERVAL
+    секунд - на случай, если процесс упал между коммитом и меткой.
+    Новый снимок строит задача, поставленная при изменении справочников
+    """
+    try:
+        with open(os.path.join(directory, POINTER), 'rb') as pointer:
+            path = os.path.join(directory, pointer.read().decode().strip())
+        snapshot = state['snapshot']
+        if snapshot is None or snapshot.path != path:
+            state['snapshot'] = CatalogSnapshot(path)
+    except (OSError, ValueError, struct.error):
+        pass
+    interval = getattr(settings, 'CATALOG_VERSION_INTERVAL', 60)
+    db_checked_at = state['db_checked_at']
+    if db_checked_at is None or now - db_checked_at >= interval:
+        state['db_version'] = source_version()
+        state['db_checked_at'] = now
+    snapshot = state['snapshot']
+    state['fresh'] = snapshot is not None and snapshot.version >= max(
+        read_version(directory), state['db_version']
+    )
+
+
+def get_catalog():
+    """
+    Актуальный снимок каталога или None, если снимков нет или снимок
+    отстал от справочников - тогда читать нужно из БД. Указатель и метка
+    версии проверяются не чаще раза в CATALOG_CHECK_INTERVAL секунд,
+    замена снимка - одно присваивание, поэтому запрос, взявший снимок,
+    работает с ним до конца
+    """
+    directory = snapshot_dir()
+    if not directory:
+        return None
+    interval = getattr(settings, 'CATALOG_CHECK_INTERVAL', 1)
+    now = time.monotonic()
+    checked_at = state['checked_at']
+    if checked_at is None or now - checked_at >= interval:
+        with state_lock:
+            checked_at = state['checked_at']
+            if checked_at is None or now - checked_at >= interval:
+                refresh_state(directory, now)
+                state['checked_at'] = now
+    return state['snapshot'] if state['fresh'] else None
+
+
+def ensure_catalog():
+    """
+    Постановка построения снимка, если его нет или он отстал от БД.
+    Вызывается при старте сервера: чтения задачи не ставят
+    """
+    if snapshot_dir() and get_catalog() is None:
+        enqueue_once(BUILD_TASK)
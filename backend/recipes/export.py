@@ -0,0 +1,120 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from users.models import Follow, User
+
+from .models import Favorite, IngredientsInRecipe, Recipe, ShoppingCart
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+FLAT_DATASETS = {
+    'users': (User, (
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'role', 'is_active', 'date_joined',
+    )),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+    'favorites': (Favorite, ('id', 'user_id', 'recipe_id')),
+    'carts': (ShoppingCart, ('id', 'user_id', 'recipe_id', 'multiplier')),
+}
+RECIPE_COLUMNS = (
+    'id', 'author_id', 'name', 'text', 'cooking_time', 'servings',
+    'pub_date', 'image', 'tags', 'ingredients',
+)
+DATASETS = ('recipes', *FLAT_DATASETS)
+
+
+def get_columns(dataset):
+    if dataset == 'recipes':
+        return RECIPE_COLUMNS
+    return FLAT_DATASETS[dataset][1]
+
+
+def iter_flat(dataset, after, chunk_size):
+    model, columns = FLAT_DATASETS[dataset]
+    return model.objects.filter(
+        pk__gt=after
+    ).order_by('pk').values(*columns).iterator(chunk_size=chunk_size)
+
+
+def iter_recipes(after, chunk_size):
+    """
+    Рецепты пачками по первичному ключу: iterator() не поддерживает
+    prefetch_related, поэтому связи догружаются на каждую пачку
+    """
+    queryset = Recipe.objects.order_by('pk').prefetch_related(
+        'tags',
+        Prefetch(
+            'ingridients_in_recipe',
+            queryset=IngredientsInRecipe.objects.select_related('ingredient')
+        ),
+    )
+    while True:
+        chunk = list(queryset.filter(pk__gt=after)[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield {
+                'id': recipe.id,
+                'author_id': recipe.author_id,
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'servings': recipe.servings,
+                'pub_date': recipe.pub_date,
+                'image': recipe.image.name,
+                'tags': [tag.slug for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'id': item.ingredient_id,
+                        'name': item.ingredient.name,
+                        'measurement_unit': item.ingredient.measurement_unit,
+                        'amount': item.amount,
+                    }
+                    for item in recipe.ingridients_in_recipe.all()
+                ],
+            }
+        after = chunk[-1].pk
+
+
+def iter_rows(dataset, after=0, chunk_size=2000):
+    """
+    Строки набора данных по возрастанию id, начиная после after
+    """
+    if dataset == 'recipes':
+        return iter_recipes(after, chunk_size)
+    return iter_flat(dataset, after, chunk_size)
+
+
+class Echo:
+    """
+    Псевдофайл для csv.writer: возвращает строку вместо записи
+    """
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return value
+
+
+def render_rows(rows, columns, file_format):
+    """
+    Генератор строк выгрузки в формате NDJSON или CSV
+    """
+    if file_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(
+                row, cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
+        return
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([csv_value(row[column]) for column in columns])
@@ -0,0 +1,265 @@
+import json
+import os
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from users.models import User
+
+from .models import MAX_SERVINGS, Ingredient, IngredientsInRecipe, Recipe, Tag
+from .nutrition import update_recipe_nutrition
+from .scores import ensure_recipe_scores
+
+NAME_MAX_LENGTH = Recipe._meta.get_field('name').max_length
+
+
+class ImportMaps:
+    """
+    Справочники для разбора записей без обращения к БД:
+    теги по slug и названию, ингредиенты по id, по (название, единица)
+    и по названию
+    """
+    def __init__(self, tags, ingredients):
+        self.tags = tags
+        self.ingredient_ids = {pk for pk, _, _ in ingredients}
+        self.ingredients = {
+            (name.lower(), unit): pk for pk, name, unit in ingredients
+        }
+        self.ingredients_by_name = defaultdict(list)
+        for pk, name, _ in ingredients:
+            self.ingredients_by_name[name.lower()].append(pk)
+
+    @classmethod
+    def load(cls):
+        tags = {}
+        for pk, slug, name in Tag.objects.values_list('id', 'slug', 'name'):
+            tags[slug] = pk
+            tags[name.lower()] = pk
+        return cls(tags, list(Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        )))
+
+    def resolve_tag(self, value):
+        return self.tags.get(str(value)) or self.tags.get(str(value).lower())
+
+    def resolve_ingredient(self, item):
+        if 'id' in item:
+            return item['id'] if item['id'] in self.ingredient_ids else None
+        name = str(item.get('name', '')).lower()
+        if 'measurement_unit' in item:
+            return self.ingredients.get((name, item['measurement_unit']))
+        candidates = self.ingredients_by_name.get(name, ())
+        return candidates[0] if len(candidates) == 1 else None
+
+
+worker_state = {}
+
+
+def init_worker(maps, images_dir):
+    worker_state['maps'] = maps
+    worker_state['images_dir'] = images_dir
+
+
+def positive_number(value, minimum, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if value < minimum or (maximum is not None and value > maximum):
+        return None
+    return value
+
+
+def clean_fields(record, errors):
+    name = record.get('name')
+    if not isinstance(name, str) or not name.strip():
+        errors['name'] = 'Обязательное поле'
+    elif len(name) > NAME_MAX_LENGTH:
+        errors['name'] = f'Не более {NAME_MAX_LENGTH} символов'
+    text = record.get('text')
+    if not isinstance(text, str) or not text.strip():
+        errors['text'] = 'Обязательное поле'
+    cooking_time = positive_number(record.get('cooking_time'), 1, 32767)
+    if not isinstance(cooking_time, int):
+        errors['cooking_time'] = 'Целое число не менее 1'
+    servings = positive_number(record.get('servings', 1), 1, MAX_SERVINGS)
+    if not isinstance(servings, int):
+        errors['servings'] = f'Целое число от 1 до {MAX_SERVINGS}'
+    author = record.get('author')
+    if author is not None and not isinstance(author, str):
+        errors['author'] = 'Username автора строкой'
+    if errors:
+        return {}
+    return {
+        'author': record.get('author'),
+        'name': name.strip(),
+        'text': text,
+        'cooking_time': cooking_time,
+        'servings': servings,
+    }
+
+
+def clean_tags(record, maps, errors):
+    tags = record.get('tags') or []
+    if not isinstance(tags, list):
+        errors['tags'] = ['Ожидается список тегов']
+        return []
+    tag_ids = []
+    for tag in tags:
+        tag_id = maps.resolve_tag(tag)
+        if tag_id is None:
+            errors.setdefault('tags', []).append(f'Неизвестный тег: {tag}')
+        elif tag_id not in tag_ids:
+            tag_ids.append(tag_id)
+    return tag_ids
+
+
+def clean_ingredient(raw, maps, ingredients):
+    if not isinstance(raw, dict):
+        return 'Ингредиент должен быть объектом'
+    if 'id' in raw and (
+        isinstance(raw['id'], bool) or not isinstance(raw['id'], int)
+    ):
+        return f'id ингредиента должен быть целым числом: {raw}'
+    if 'measurement_unit' in raw and not isinstance(
+        raw['measurement_unit'], str
+    ):
+        return f'Единица измерения должна быть строкой: {raw}'
+    ingredient_id = maps.resolve_ingredient(raw)
+    amount = positive_number(raw.get('amount'), 0.001)
+    if ingredient_id is None:
+        return f'Неизвестный ингредиент: {raw}'
+    if amount is None:
+        return f'Количество должно быть не менее 0.001: {raw}'
+    if ingredient_id in ingredients:
+        return f'Ингредиент повторяется: {raw}'
+    ingredients[ingredient_id] = amount
+    return None
+
+
+def clean_ingredients(record, maps, errors):
+    raw_ingredients = record.get('ingredients')
+    if not isinstance(raw_ingredients, list) or not raw_ingredients:
+        errors['ingredients'] = ['Нужен хотя бы один ингредиент']
+        return []
+    ingredients = {}
+    for raw in raw_ingredients:
+        error = clean_ingredient(raw, maps, ingredients)
+        if error is not None:
+            errors.setdefault('ingredients', []).append(error)
+    return list(ingredients.items())
+
+
+def clean_image(record, images_dir, errors):
+    image = record.get('image')
+    if not image:
+        return None
+    path = os.path.join(images_dir or '', os.path.basename(str(image)))
+    if images_dir is None or not os.path.isfile(path):
+        errors['image'] = f'Файл не найден: {image}'
+    return path
+
+
+def validate_record(item):
+    """
+    Разбор и проверка одной строки NDJSON в процессе-обработчике.
+    Возвращает (номер строки, очищенная запись, None)
+    или (номер строки, None, ошибки). Любое исключение при разборе -
+    ошибка этой записи, а не всего импорта
+    """
+    line_number, line = item
+    try:
+        return check_record(line_number, line)
+    except Exception as error:
+        return line_number, None, {
+            'record': f'Ошибка разбора: {type(error).__name__}: {error}'
+        }
+
+
+def check_record(line_number, line):
+    maps = worker_state['maps']
+    try:
+        record = json.loads(line)
+    except ValueError as error:
+        return line_number, None, {'record': f'Некорректный JSON: {error}'}
+    if not isinstance(record, dict):
+        return line_number, None, {'record': 'Ожидается объект'}
+    errors = {}
+    cleaned = clean_fields(record, errors)
+    cleaned['tags'] = clean_tags(record, maps, errors)
+    cleaned['ingredients'] = clean_ingredients(record, maps, errors)
+    cleaned['image'] = clean_image(
+        record, worker_state['images_dir'], errors
+    )
+    if errors:
+        return line_number, None, errors
+    return line_number, cleaned, None
+
+
+def resolve_authors(records, default_author):
+    usernames = {
+        record['author'] for _, record in records if record['author']
+    }
+    authors = dict(User.objects.filter(
+        username__in=usernames
+    ).values_list('username', 'id'))
+    if default_author is not None:
+        authors[None] = default_author.id
+    return authors
+
+
+def write_batch(records, default_author):
+    """
+    Запись пачки проверенных рецептов одной транзакцией: рецепты,
+    ингредиенты и теги через bulk_create, пищевая ценность одним
+    запросом на пачку. Возвращает пары
+    (рецепт, запись) и отклоненные записи с ошибками
+    """
+    authors = resolve_authors(records, default_author)
+    accepted, rejected = [], []
+    for line_number, record in records:
+        author_id = authors.get(record['author'])
+        if author_id is None:
+            rejected.append((line_number, record, {
+                'author': f'Неизвестный автор: {record["author"]}'
+            }))
+            continue
+        accepted.append((Recipe(
+            author_id=author_id,
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            servings=record['servings'],
+        ), record))
+    recipes = [recipe for recipe, _ in accepted]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe, record in accepted
+            for ingredient_id, amount in record['ingredients']
+        )
+        update_recipe_nutrition([recipe.id for recipe in recipes])
+        ensure_recipe_scores([recipe.id for recipe in recipes])
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe, record in accepted
+            for tag_id in record['tags']
+        )
+    return accepted, rejected
+
+
+def store_image(recipe_id, path):
+    """
+    Копирование картинки в хранилище, выполняется в фоновом потоке
+    после записи рецепта
+    """
+    field = Recipe._meta.get_field('image')
+    name = field.generate_filename(None, os.path.basename(path))
+    with open(path, 'rb') as source:
+        return recipe_id, default_storage.save(name, File(source))
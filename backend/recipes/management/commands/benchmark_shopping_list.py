@@ -0,0 +1,99 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import (Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart)
+from recipes.shopping_list import get_shopping_list
+from recipes.units import UNITS
+from users.models import User
+
+INGREDIENTS_PER_RECIPE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время сборки списка покупок на синтетической корзине '
+        'с заданным числом строк. Данные создаются во временной '
+        'транзакции и откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=5000,
+            help='Число строк ингредиентов в корзине',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Число повторов замера',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.fill_cart(options['lines'])
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                rows = get_shopping_list(user)
+                timings.append(time.perf_counter() - started)
+            transaction.set_rollback(True)
+        self.stdout.write(
+            'Строк в корзине: {}, позиций в списке: {}, '
+            'мин. {:.1f} мс, сред. {:.1f} мс'.format(
+                options['lines'],
+                len(rows),
+                min(timings) * 1000,
+                sum(timings) / len(timings) * 1000,
+            )
+        )
+
+    def fill_cart(self, lines):
+        user = User.objects.create_user(
+            username='benchmark_shopping_list',
+            email='benchmark_shopping_list@example.com',
+            first_name='benchmark',
+            last_name='benchmark',
+        )
+        units = itertools.cycle(UNITS)
+        ingredients = [
+            Ingredient(name=f'benchmark {index % 40}', measurement_unit=unit)
+            for index, unit in zip(range(INGREDIENTS_PER_RECIPE * 5), units)
+        ]
+        for ingredient in ingredients:
+            ingredient.save()
+        recipe_count = -(-lines // INGREDIENTS_PER_RECIPE)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'benchmark {index}',
+                text='benchmark',
+                cooking_time=1,
+            )
+            for index in range(recipe_count)
+        )
+        if not all(recipe.pk for recipe in recipes):
+            recipes = list(Recipe.objects.filter(author=user))
+        IngredientsInRecipe.objects.bulk_create(
+            (
+                IngredientsInRecipe(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (index + shift) % len(ingredients)
+                    ],
+                    amount=1 + (index + shift) % 7,
+                )
+                for index, recipe in enumerate(recipes)
+                for shift in range(INGREDIENTS_PER_RECIPE)
+            ),
+            batch_size=1000,
+        )
+        ShoppingCart.objects.bulk_create(
+            (ShoppingCart(user=user, recipe=recipe) for recipe in recipes),
+            batch_size=1000,
+        )
+        return user
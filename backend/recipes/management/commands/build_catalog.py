@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from recipes.catalog import CatalogSnapshot, build_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит и публикует снимок каталога ингредиентов и тегов, '
+        'работающие процессы подхватывают его без перезапуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            help='Каталог снимков, по умолчанию CATALOG_SNAPSHOT_DIR',
+        )
+
+    def handle(self, *args, **options):
+        path = build_snapshot(options['dir'])
+        snapshot = CatalogSnapshot(path)
+        self.stdout.write(
+            f'Снимок {path}: ингредиентов {snapshot.ingredient_count}, '
+            f'тегов {snapshot.tag_count}, версия {snapshot.version}'
+        )
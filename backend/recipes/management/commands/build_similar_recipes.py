@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from recipes.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих рецептов по общим ингредиентам '
+        'и совместным добавлениям в избранное'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Количество процессов для расчета',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Количество рецептов в одной части',
+        )
+
+    def handle(self, *args, **options):
+        count = build_similar_recipes(
+            workers=options['workers'], chunk_size=options['chunk_size']
+        )
+        self.stdout.write(f'Пересчитано рецептов: {count}')
@@ -0,0 +1,110 @@
+import os
+
+from django.core.management.base import BaseCommand
+from recipes.export import (DATASETS, EXPORT_FORMATS, get_columns, iter_rows,
+                            render_rows)
+from recipes.models import Checkpoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка рецептов, пользователей, подписок, избранного '
+        'и списков покупок в NDJSON или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=tuple(EXPORT_FORMATS),
+            default='ndjson',
+            help='Формат выгрузки',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--after',
+            type=int,
+            default=0,
+            help='Выгружать только строки с id больше заданного',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'Продолжить с контрольной точки export_data.<набор>, '
+                'дописывая файл и сохраняя точку после каждой пачки'
+            ),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Размер пачки чтения из БД',
+        )
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        chunk_size = options['chunk_size']
+        path = options['output']
+        after = options['after']
+        checkpoint = None
+        if options['incremental']:
+            checkpoint, _ = Checkpoint.objects.get_or_create(
+                name=f'export_data.{dataset}'
+            )
+            after = checkpoint.position
+        skip_header = (
+            checkpoint is not None
+            and options['file_format'] == 'csv'
+            and path is not None
+            and os.path.exists(path)
+            and os.path.getsize(path) > 0
+        )
+        state = {'last_id': after, 'count': 0}
+
+        def tracked(rows):
+            for row in rows:
+                state['last_id'] = row['id']
+                state['count'] += 1
+                yield row
+
+        lines = render_rows(
+            tracked(iter_rows(dataset, after, chunk_size)),
+            get_columns(dataset),
+            options['file_format'],
+        )
+        if skip_header:
+            next(lines)
+        if path is None:
+            self.stdout.ending = ''
+            self.write_lines(
+                lines, self.stdout, checkpoint, state, chunk_size
+            )
+        else:
+            mode = 'a' if checkpoint is not None else 'w'
+            with open(path, mode, encoding='utf-8', newline='') as output:
+                self.write_lines(
+                    lines, output, checkpoint, state, chunk_size
+                )
+        self.stderr.write(
+            f'Выгружено строк: {state["count"]}, '
+            f'последний id: {state["last_id"]}'
+        )
+
+    def write_lines(self, lines, output, checkpoint, state, chunk_size):
+        for line in lines:
+            output.write(line)
+            if checkpoint is not None and state['count'] % chunk_size == 0:
+                self.save_checkpoint(output, checkpoint, state)
+        if checkpoint is not None:
+            self.save_checkpoint(output, checkpoint, state)
+
+    def save_checkpoint(self, output, checkpoint, state):
+        output.flush()
+        if checkpoint.position != state['last_id']:
+            checkpoint.position = state['last_id']
+            checkpoint.save(update_fields=('position',))
@@ -0,0 +1,139 @@
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from jobs.queue import enqueue_once
+from recipes.importer import (ImportMaps, init_worker, store_image,
+                              validate_record, write_batch)
+from recipes.models import Recipe
+from recipes.stats import RECONCILE_TASK
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт рецептов из NDJSON: проверка записей в нескольких '
+        'процессах, запись пачками через bulk_create, картинки из каталога '
+        'копируются в фоне, ошибочные записи пишутся в файл отказов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON с рецептами')
+        parser.add_argument(
+            '--images',
+            help='Каталог с картинками, указанными в поле image',
+        )
+        parser.add_argument(
+            '--author',
+            help='Username автора для записей без поля author',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Количество процессов для проверки записей',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество рецептов в одной транзакции',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Файл отказов, по умолчанию <path>.rejects',
+        )
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options['author']:
+            default_author = User.objects.filter(
+                username=options['author']
+            ).first()
+            if default_author is None:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден'
+                )
+        maps = ImportMaps.load()
+        connections.close_all()
+        self.default_author = default_author
+        self.imported = self.rejected = 0
+        self.images = {}
+        rejects_path = options['rejects'] or options['path'] + '.rejects'
+        executor = ProcessPoolExecutor(
+            max_workers=options['workers'],
+            initializer=init_worker,
+            initargs=(maps, options['images']),
+        )
+        with open(options['path'], encoding='utf-8') as source, \
+                open(rejects_path, 'w', encoding='utf-8') as rejects, \
+                executor, ThreadPoolExecutor(max_workers=4) as image_pool:
+            self.rejects = rejects
+            self.image_pool = image_pool
+            lines = (
+                (number, line)
+                for number, line in enumerate(source, 1) if line.strip()
+            )
+            while True:
+                batch = list(itertools.islice(lines, options['batch_size']))
+                if not batch:
+                    break
+                self.import_batch(executor, batch)
+            self.attach_images(wait=True)
+        if self.imported:
+            enqueue_once(RECONCILE_TASK)
+        self.stdout.write(
+            f'Импортировано рецептов: {self.imported}, '
+            f'отклонено: {self.rejected} ({rejects_path})'
+        )
+
+    def import_batch(self, executor, batch):
+        raw_lines = dict(batch)
+        valid = []
+        for number, record, errors in executor.map(
+            validate_record, batch, chunksize=16
+        ):
+            if errors:
+                self.reject(number, raw_lines[number], errors)
+            else:
+                valid.append((number, record))
+        if not valid:
+            return
+        accepted, rejected = write_batch(valid, self.default_author)
+        for number, _, errors in rejected:
+            self.reject(number, raw_lines[number], errors)
+        for recipe, record in accepted:
+            if record['image']:
+                future = self.image_pool.submit(
+                    store_image, recipe.id, record['image']
+                )
+                self.images[future] = record['image']
+        self.imported += len(accepted)
+        self.attach_images(wait=False)
+
+    def reject(self, number, line, errors):
+        self.rejected += 1
+        self.rejects.write(json.dumps(
+            {'line': number, 'errors': errors, 'record': line.strip()},
+            ensure_ascii=False,
+        ) + '\n')
+
+    def attach_images(self, wait):
+        """
+        Запись имен скопированных картинок в рецепты
+        """
+        done = [
+            future for future in self.images if wait or future.done()
+        ]
+        recipes = []
+        for future in done:
+            path = self.images.pop(future)
+            try:
+                recipe_id, name = future.result()
+            except OSError as error:
+                self.stderr.write(f'Картинка {path} не скопирована: {error}')
+                continue
+            recipes.append(Recipe(id=recipe_id, image=name))
+        Recipe.objects.bulk_update(recipes, ('image',), batch_size=500)
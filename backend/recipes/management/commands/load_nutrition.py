@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from jobs.queue import enqueue
+from recipes.nutrition import (RECOMPUTE_TASK, load_nutrition,
+                               recompute_nutrition)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пищевую ценность ингредиентов из CSV и запускает '
+        'пересчет затронутых рецептов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help=(
+                'CSV рядом с data/ingredients.csv: название, единица, ккал, '
+                'белки, жиры, углеводы на 100 г, 100 мл или 1 шт.'
+            ),
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Пересчитать рецепты сразу, а не фоновой задачей',
+        )
+
+    def handle(self, *args, **options):
+        changed, errors = load_nutrition(options['path'])
+        for line_number, error in errors:
+            self.stderr.write(f'Строка {line_number}: {error}')
+        self.stdout.write(
+            f'Изменено ингредиентов: {len(changed)}, ошибок: {len(errors)}'
+        )
+        if not changed:
+            return
+        if options['sync']:
+            recipes = recompute_nutrition(changed)
+            self.stdout.write(f'Пересчитано рецептов: {recipes}')
+        else:
+            enqueue(RECOMPUTE_TASK, {'ingredient_ids': changed})
+            self.stdout.write('Пересчет рецептов поставлен в очередь')
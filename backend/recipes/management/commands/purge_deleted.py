@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from recipes.purge import purge_backlog, purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет помеченных на удаление пользователей '
+        'и рецепты вместе со связанными строками пачками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Количество строк в одном DELETE',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать очередь на удаление',
+        )
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            for name, count in purge_deleted(options['batch_size']).items():
+                self.stdout.write(f'Удалено строк ({name}): {count}')
+        for name, backlog in purge_backlog().items():
+            self.stdout.write(
+                f'Осталось помеченных ({name}): {backlog["count"]}'
+            )
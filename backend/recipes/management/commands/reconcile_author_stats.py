@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from recipes.stats import rebuild_author_stats, reconcile_author_stats
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет статистику авторов с рецептами, избранным, списками '
+        'покупок и подписками и исправляет расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author',
+            type=int,
+            action='append',
+            help='Сверить только указанных авторов (id)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Количество авторов в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        if options['author']:
+            author_ids = list(User.all_objects.filter(
+                pk__in=options['author']
+            ).values_list('pk', flat=True))
+            fixed = rebuild_author_stats(author_ids) if author_ids else 0
+            checked = len(author_ids)
+        else:
+            result = reconcile_author_stats(options['batch_size'])
+            checked, fixed = result['checked'], result['fixed']
+        self.stdout.write(
+            f'Проверено авторов: {checked}, исправлено: {fixed}'
+        )
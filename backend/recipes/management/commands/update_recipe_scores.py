@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from recipes.scores import update_recipe_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет оценки популярности и трендовости рецептов по сводкам '
+        'событий избранного и списка покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать оценки по таблицам избранного и списка покупок',
+        )
+
+    def handle(self, *args, **options):
+        count = update_recipe_scores(full=options['full'])
+        self.stdout.write(f'Обновлено оценок рецептов: {count}')
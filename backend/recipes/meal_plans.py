@@ -0,0 +1,119 @@
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast
+
+from .models import IngredientsInRecipe, MealPlan, ShoppingCart
+from .shopping_list import summarize_ingredients
+
+
+def get_plan(user, start, end):
+    return MealPlan.objects.filter(
+        user=user, date__range=(start, end), recipe__deleted_at__isnull=True
+    )
+
+
+def get_plan_ingredients(user, start, end):
+    """
+    Ингредиенты плана питания за период одним запросом с группировкой:
+    количество из рецепта пересчитывается на запланированные порции
+    """
+    return summarize_ingredients(
+        IngredientsInRecipe.objects.filter(
+            recipe__meal_plans__user=user,
+            recipe__meal_plans__date__range=(start, end),
+            recipe__deleted_at__isnull=True,
+        ),
+        Cast('recipe__meal_plans__servings', FloatField())
+        / F('recipe__servings'),
+    )
+
+
+def locked_cart_items(user, recipe_ids):
+    return {
+        cart_item.recipe_id: cart_item
+        for cart_item in ShoppingCart.objects.select_for_update().filter(
+            user=user, recipe_id__in=recipe_ids
+        )
+    }
+
+
+def insert_cart_items(user, multipliers):
+    """
+    Вставка строк списка покупок с ON CONFLICT DO NOTHING (на PostgreSQL
+    одним INSERT ... RETURNING). Возвращает id рецептов, строки которых
+    вставлены этим запросом: строки, добавленные параллельным запросом,
+    новыми не считаются
+    """
+    if not multipliers:
+        return set()
+    quote = connection.ops.quote_name
+    recipe_column = quote(ShoppingCart._meta.get_field('recipe').column)
+    columns = ', '.join(
+        quote(ShoppingCart._meta.get_field(name).column)
+        for name in ('user', 'recipe', 'multiplier')
+    )
+    insert = (
+        f'INSERT INTO {quote(ShoppingCart._meta.db_table)} ({columns}) '
+        'VALUES {} ON CONFLICT DO NOTHING'
+    )
+    user_id = getattr(user, 'pk', user)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                insert.format(', '.join(['(%s, %s, %s)'] * len(multipliers)))
+                + f' RETURNING {recipe_column}',
+                [
+                    value for recipe_id, multiplier in multipliers.items()
+                    for value in (user_id, recipe_id, multiplier)
+                ],
+            )
+            return {recipe_id for recipe_id, in cursor.fetchall()}
+        inserted = set()
+        for recipe_id, multiplier in multipliers.items():
+            cursor.execute(
+                insert.format('(%s, %s, %s)'),
+                [user_id, recipe_id, multiplier],
+            )
+            if cursor.rowcount > 0:
+                inserted.add(recipe_id)
+        return inserted
+
+
+def plan_to_shopping_cart(user, start, end):
+    """
+    Перенос рецептов плана за период в список покупок: новые строки
+    добавляются вставкой без выборки, у рецептов, уже лежащих в корзине,
+    множитель порций заменяется запланированным. Возвращает словарь
+    {id добавленного рецепта: id автора} и число обновленных строк.
+    Строки, которые параллельный запрос вставил между выборкой и INSERT,
+    обновляются, а не считаются добавленными
+    """
+    planned = get_plan(user, start, end).order_by().values_list(
+        'recipe_id', 'recipe__author_id', 'recipe__servings'
+    ).annotate(total=Sum('servings'))
+    multipliers = {}
+    authors = {}
+    for recipe_id, author_id, recipe_servings, servings in planned:
+        multipliers[recipe_id] = servings / recipe_servings
+        authors[recipe_id] = author_id
+    with transaction.atomic():
+        existing = locked_cart_items(user, multipliers)
+        inserted = insert_cart_items(user, {
+            recipe_id: multiplier
+            for recipe_id, multiplier in multipliers.items()
+            if recipe_id not in existing
+        })
+        conflicts = [
+            recipe_id for recipe_id in multipliers
+            if recipe_id not in existing and recipe_id not in inserted
+        ]
+        if conflicts:
+            existing.update(locked_cart_items(user, conflicts))
+        changed = []
+        for recipe_id, cart_item in existing.items():
+            if cart_item.multiplier != multipliers[recipe_id]:
+                cart_item.multiplier = multipliers[recipe_id]
+                changed.append(cart_item)
+        ShoppingCart.objects.bulk_update(changed, ('multiplier',))
+    created = {recipe_id: authors[recipe_id] for recipe_id in inserted}
+    return created, len(changed)
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListExport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, verbose_name='Хеш списка')),
+                ('file_format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('file', models.FileField(upload_to='shopping_lists/', verbose_name='Файл')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Выгрузка списка покупок',
+                'verbose_name_plural': 'Выгрузки списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistexport',
+            constraint=models.UniqueConstraint(fields=('digest', 'file_format'), name='unique_shopping_list_export'),
+        ),
+    ]
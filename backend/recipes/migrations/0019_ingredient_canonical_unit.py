@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+from recipes.units import get_unit
+
+
+def fill_canonical_units(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    units = Ingredient.objects.values_list(
+        'measurement_unit', flat=True
+    ).order_by().distinct()
+    for measurement_unit in list(units):
+        unit = get_unit(measurement_unit)
+        Ingredient.objects.filter(measurement_unit=measurement_unit).update(
+            canonical_unit=unit.canonical, unit_factor=unit.factor
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_shoppinglistexport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='canonical_unit',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='Каноническая единица'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit_factor',
+            field=models.FloatField(default=1, editable=False, verbose_name='Множитель к канонической единице'),
+        ),
+        migrations.RunPython(fill_canonical_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:19
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_ingredient_canonical_unit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, message='Количество порций должно быть не менее 1!'), django.core.validators.MaxValueValidator(100, message='Количество порций должно быть не более 100!')], verbose_name='Количество порций'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='multiplier',
+            field=models.FloatField(default=1, validators=[django.core.validators.MinValueValidator(0.01, message='Множитель порций должен быть не менее 0.01.')], verbose_name='Множитель порций'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_soft_delete'),
+        ('recipes', '0022_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.user', verbose_name='Автор')),
+                ('recipes_count', models.IntegerField(default=0, verbose_name='Рецептов')),
+                ('favorites_count', models.IntegerField(default=0, verbose_name='В избранном')),
+                ('shopping_cart_count', models.IntegerField(default=0, verbose_name='В списках покупок')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Подписчиков')),
+                ('top_ingredients', models.JSONField(default=list, verbose_name='Частые ингредиенты')),
+                ('tags', models.JSONField(default=list, verbose_name='Распределение по тегам')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+    ]
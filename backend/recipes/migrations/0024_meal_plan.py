@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:49
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0023_author_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealPlan',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('slot', models.CharField(choices=[('breakfast', 'Завтрак'), ('lunch', 'Обед'), ('dinner', 'Ужин'), ('snack', 'Перекус')], max_length=16, verbose_name='Прием пищи')),
+                ('servings', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Количество порций должно быть не менее 1!'), django.core.validators.MaxValueValidator(100, message='Количество порций должно быть не более 100!')], verbose_name='Количество порций')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meal_plans', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meal_plans', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в плане питания',
+                'verbose_name_plural': 'План питания',
+                'ordering': ('date',),
+                'default_related_name': 'meal_plans',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mealplan',
+            constraint=models.UniqueConstraint(fields=('user', 'date', 'slot', 'recipe'), name='unique_meal_plan'),
+        ),
+    ]
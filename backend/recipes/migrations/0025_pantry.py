@@ -0,0 +1,36 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:51
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0024_meal_plan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PantryItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.FloatField(validators=[django.core.validators.MinValueValidator(0, message='Количество не может быть отрицательным.')], verbose_name='Количество')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменено')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pantry_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pantry_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запас ингредиента',
+                'verbose_name_plural': 'Запасы ингредиентов',
+                'default_related_name': 'pantry_items',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pantryitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_pantry_item'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:54
+
+import django.core.validators
+from django.db import migrations, models
+
+from recipes.units import nutrition_factor
+
+
+def fill_nutrition_factors(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    units = Ingredient.objects.values_list(
+        'measurement_unit', flat=True
+    ).order_by().distinct()
+    for measurement_unit in list(units):
+        Ingredient.objects.filter(measurement_unit=measurement_unit).update(
+            nutrition_factor=nutrition_factor(measurement_unit)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0025_pantry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='carbs',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Углеводы, г'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='fat',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Жиры, г'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='kcal',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Калорийность, ккал'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='nutrition_factor',
+            field=models.FloatField(default=0, editable=False, verbose_name='Множитель к базе пищевой ценности'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='protein',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Белки, г'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='carbs',
+            field=models.FloatField(editable=False, null=True, verbose_name='Углеводы, г'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fat',
+            field=models.FloatField(editable=False, null=True, verbose_name='Жиры, г'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='kcal',
+            field=models.FloatField(db_index=True, editable=False, null=True, verbose_name='Калорийность, ккал'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='protein',
+            field=models.FloatField(editable=False, null=True, verbose_name='Белки, г'),
+        ),
+        migrations.RunPython(fill_nutrition_factors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+def fill_recipe_scores(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeScore = apps.get_model('recipes', 'RecipeScore')
+    Checkpoint = apps.get_model('recipes', 'Checkpoint')
+    RecipeScore.objects.bulk_create(
+        (
+            RecipeScore(recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.filter(
+                score__isnull=True
+            ).values_list('id', flat=True).iterator()
+        ),
+        batch_size=1000,
+    )
+    Checkpoint.objects.filter(name__startswith='recipe_score.').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0026_nutrition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipescore',
+            name='popularity',
+            field=models.FloatField(default=0, verbose_name='Популярность'),
+        ),
+        migrations.AlterField(
+            model_name='recipescore',
+            name='trending',
+            field=models.FloatField(default=0, verbose_name='Трендовость (логарифм)'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-popularity', '-recipe'], name='recipe_score_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-trending', '-recipe'], name='recipe_score_trending_idx'),
+        ),
+        migrations.RunPython(fill_recipe_scores, migrations.RunPython.noop),
+    ]
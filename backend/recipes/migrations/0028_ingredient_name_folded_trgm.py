@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_folded_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_folded_trgm '
+        'ON recipes_ingredient USING gin '
+        "(translate(name, 'Ёё', 'Ее') gin_trgm_ops)"
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_ingredient_name_trgm')
+
+
+def drop_folded_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm '
+        'ON recipes_ingredient USING gin (name gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_ingredient_name_folded_trgm'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0027_recipe_score_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_folded_index, drop_folded_index),
+    ]
@@ -1,8 +1,13 @@
 from colorfield.fields import ColorField
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from users.models import User
 
+from .units import get_unit, nutrition_factor
+
+MAX_SERVINGS = 100
+NUTRIENTS = ('kcal', 'protein', 'fat', 'carbs')
+
 
 class Tag(models.Model):
     """
@@ -33,7 +38,8 @@ class Tag(models.Model):
 
 class Ingredient(models.Model):
     """
-    Модель ингредиентов
+    Модель ингредиентов. Пищевая ценность необязательна и задается
+    на 100 г, 100 мл или 1 шт. в канонической единице ингредиента
     """
     name = models.CharField(
         max_length=200,
@@ -44,6 +50,46 @@ class Ingredient(models.Model):
         max_length=50,
         verbose_name='Единица измерения'
     )
+    canonical_unit = models.CharField(
+        max_length=50,
+        blank=True,
+        editable=False,
+        verbose_name='Каноническая единица'
+    )
+    unit_factor = models.FloatField(
+        default=1,
+        editable=False,
+        verbose_name='Множитель к канонической единице'
+    )
+    kcal = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name='Калорийность, ккал'
+    )
+    protein = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name='Белки, г'
+    )
+    fat = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name='Жиры, г'
+    )
+    carbs = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name='Углеводы, г'
+    )
+    nutrition_factor = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Множитель к базе пищевой ценности'
+    )
 
     class Meta:
         ordering = ('-name',)
@@ -53,10 +99,26 @@ class Ingredient(models.Model):
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
 
+    def save(self, *args, **kwargs):
+        unit = get_unit(self.measurement_unit)
+        self.canonical_unit = unit.canonical
+        self.unit_factor = unit.factor
+        self.nutrition_factor = nutrition_factor(self.measurement_unit)
+        super().save(*args, **kwargs)
+
+
+class RecipeManager(models.Manager):
+    """
+    Менеджер рецептов без помеченных на удаление
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class Recipe(models.Model):
     """
-    Модель рецептов
+    Модель рецептов. Удаление мягкое: рецепт помечается deleted_at
+    и пропадает из objects, связанные строки удаляет фоновая очистка
     """
     tags = models.ManyToManyField(
         Tag,
@@ -92,10 +154,58 @@ class Recipe(models.Model):
         )],
         verbose_name='Время приготовления, мин.'
     )
+    servings = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[
+            MinValueValidator(
+                1,
+                message='Количество порций должно быть не менее 1!'
+            ),
+            MaxValueValidator(
+                MAX_SERVINGS,
+                message=(
+                    'Количество порций должно быть '
+                    f'не более {MAX_SERVINGS}!'
+                )
+            ),
+        ],
+        verbose_name='Количество порций'
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Помечен на удаление'
+    )
+    kcal = models.FloatField(
+        null=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Калорийность, ккал'
+    )
+    protein = models.FloatField(
+        null=True,
+        editable=False,
+        verbose_name='Белки, г'
+    )
+    fat = models.FloatField(
+        null=True,
+        editable=False,
+        verbose_name='Жиры, г'
+    )
+    carbs = models.FloatField(
+        null=True,
+        editable=False,
+        verbose_name='Углеводы, г'
+    )
+
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -156,6 +266,14 @@ class ShoppingCart(models.Model):
         User,
         on_delete=models.CASCADE,
     )
+    multiplier = models.FloatField(
+        default=1,
+        validators=[MinValueValidator(
+            0.01,
+            message='Множитель порций должен быть не менее 0.01.'
+        )],
+        verbose_name='Множитель порций'
+    )
 
     class Meta:
         default_related_name = 'shopping_cart'
@@ -194,3 +312,294 @@ class Favorite(models.Model):
                 name='unique_favorite'
             )
         ]
+
+
+class RecipeScore(models.Model):
+    """
+    Предрассчитанные оценки популярности рецептов: общая популярность
+    и трендовость с экспоненциальным затуханием во времени. Строка есть
+    у каждого рецепта (без событий - нули), поэтому сортировка по оценке
+    идет по составному индексу от этой таблицы
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт'
+    )
+    popularity = models.FloatField(
+        default=0,
+        verbose_name='Популярность'
+    )
+    trending = models.FloatField(
+        default=0,
+        verbose_name='Трендовость (логарифм)'
+    )
+
+    class Meta:
+        verbose_name = 'Оценка рецепта'
+        verbose_name_plural = 'Оценки рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popularity', '-recipe'],
+                name='recipe_score_popular_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='recipe_score_trending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popularity}'
+
+
+class PantryItem(models.Model):
+    """
+    Запас ингредиента у пользователя в единице измерения ингредиента,
+    вычитается из списка покупок
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.FloatField(
+        validators=[MinValueValidator(
+            0,
+            message='Количество не может быть отрицательным.'
+        )],
+        verbose_name='Количество'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+
+    class Meta:
+        default_related_name = 'pantry_items'
+        verbose_name = 'Запас ингредиента'
+        verbose_name_plural = 'Запасы ингредиентов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_pantry_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.amount}'
+
+
+class MealPlan(models.Model):
+    """
+    Рецепт в плане питания пользователя на дату и прием пищи
+    """
+    BREAKFAST = 'breakfast'
+    LUNCH = 'lunch'
+    DINNER = 'dinner'
+    SNACK = 'snack'
+    SLOTS = (
+        (BREAKFAST, 'Завтрак'),
+        (LUNCH, 'Обед'),
+        (DINNER, 'Ужин'),
+        (SNACK, 'Перекус'),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    date = models.DateField(
+        verbose_name='Дата'
+    )
+    slot = models.CharField(
+        max_length=16,
+        choices=SLOTS,
+        verbose_name='Прием пищи'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    servings = models.PositiveSmallIntegerField(
+        validators=[
+            MinValueValidator(
+                1,
+                message='Количество порций должно быть не менее 1!'
+            ),
+            MaxValueValidator(
+                MAX_SERVINGS,
+                message=(
+                    'Количество порций должно быть '
+                    f'не более {MAX_SERVINGS}!'
+                )
+            ),
+        ],
+        verbose_name='Количество порций'
+    )
+
+    class Meta:
+        default_related_name = 'meal_plans'
+        ordering = ('date',)
+        verbose_name = 'Рецепт в плане питания'
+        verbose_name_plural = 'План питания'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'slot', 'recipe'],
+                name='unique_meal_plan'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.slot}: {self.recipe}'
+
+
+class AuthorStats(models.Model):
+    """
+    Статистика автора, которую поддерживают пути записи (счетчики)
+    и сверка с исходными таблицами. version растет при каждом изменении
+    и служит ETag ответа
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    recipes_count = models.IntegerField(
+        default=0,
+        verbose_name='Рецептов'
+    )
+    favorites_count = models.IntegerField(
+        default=0,
+        verbose_name='В избранном'
+    )
+    shopping_cart_count = models.IntegerField(
+        default=0,
+        verbose_name='В списках покупок'
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Подписчиков'
+    )
+    top_ingredients = models.JSONField(
+        default=list,
+        verbose_name='Частые ингредиенты'
+    )
+    tags = models.JSONField(
+        default=list,
+        verbose_name='Распределение по тегам'
+    )
+    version = models.BigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author_id}: {self.recipes_count}'
+
+
+class Checkpoint(models.Model):
+    """
+    Позиция последней обработанной записи для инкрементальных пересчетов
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Название'
+    )
+    position = models.BigIntegerField(
+        default=0,
+        verbose_name='Позиция'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка'
+        verbose_name_plural = 'Контрольные точки'
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Предрассчитанные похожие рецепты (соседи) с оценкой сходства
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} -> {self.similar_id}: {self.score}'
+
+
+class ShoppingListExport(models.Model):
+    """
+    Готовый файл списка покупок. Ключ - хеш состава корзины и формат,
+    поэтому одинаковые корзины используют один файл
+    """
+    digest = models.CharField(
+        max_length=64,
+        verbose_name='Хеш списка'
+    )
+    file_format = models.CharField(
+        max_length=10,
+        verbose_name='Формат'
+    )
+    file = models.FileField(
+        upload_to='shopping_lists/',
+        verbose_name='Файл'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата создания'
+    )
+
+    class Meta:
+        verbose_name = 'Выгрузка списка покупок'
+        verbose_name_plural = 'Выгрузки списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['digest', 'file_format'],
+                name='unique_shopping_list_export'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.digest[:12]}.{self.file_format}'
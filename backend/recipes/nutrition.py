@@ -0,0 +1,156 @@
+"""
+Пищевая ценность рецептов: суммы по ингредиентам считаются при записи
+ингредиентов рецепта и хранятся в самом рецепте, поэтому фильтр
+и сортировка по калорийности идут по индексу без вычислений в запросе.
+После загрузки пищевой ценности ингредиентов затронутые рецепты
+пересчитываются фоновой задачей пачками
+"""
+import csv
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import NUTRIENTS, Ingredient, IngredientsInRecipe, Recipe
+
+RECOMPUTE_TASK = 'recipes.recompute_nutrition'
+
+
+def compute_totals(recipe_ids):
+    """
+    Пищевая ценность рецептов одним запросом с группировкой:
+    {id рецепта: {показатель: сумма}}. Ингредиенты без данных
+    не учитываются, рецепт без данных получает None
+    """
+    totals = {
+        recipe_id: dict.fromkeys(NUTRIENTS) for recipe_id in recipe_ids
+    }
+    rows = IngredientsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values('recipe_id').annotate(**{
+        name: Sum(
+            F('amount')
+            * F('ingredient__nutrition_factor')
+            * F(f'ingredient__{name}')
+        )
+        for name in NUTRIENTS
+    })
+    for row in rows:
+        totals[row['recipe_id']] = {name: row[name] for name in NUTRIENTS}
+    return totals
+
+
+def update_recipe_nutrition(recipe_ids):
+    """
+    Пересчет и запись пищевой ценности рецептов (включая помеченные
+    на удаление), возвращает посчитанные суммы
+    """
+    totals = compute_totals(recipe_ids)
+    Recipe.all_objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, **values)
+            for recipe_id, values in totals.items()
+        ],
+        NUTRIENTS,
+        batch_size=500,
+    )
+    return totals
+
+
+def refresh_recipe_nutrition(recipe):
+    """
+    Пересчет для одного рецепта с обновлением полей объекта, чтобы
+    последующий save() не затер суммы
+    """
+    totals = update_recipe_nutrition([recipe.pk])[recipe.pk]
+    for name, value in totals.items():
+        setattr(recipe, name, value)
+
+
+def recompute_nutrition(ingredient_ids=None, chunk_size=None):
+    """
+    Пересчет рецептов с указанными ингредиентами (или всех) пачками
+    по возрастанию id, каждая пачка - отдельная транзакция.
+    Возвращает число пересчитанных рецептов
+    """
+    chunk_size = chunk_size or getattr(
+        settings, 'NUTRITION_RECOMPUTE_CHUNK_SIZE', 500
+    )
+    queryset = Recipe.all_objects.order_by('pk')
+    if ingredient_ids is not None:
+        queryset = queryset.filter(
+            pk__in=IngredientsInRecipe.objects.filter(
+                ingredient_id__in=ingredient_ids
+            ).values('recipe_id')
+        )
+    updated = 0
+    last_id = 0
+    while True:
+        recipe_ids = list(
+            queryset.filter(pk__gt=last_id).values_list(
+                'pk', flat=True
+            )[:chunk_size]
+        )
+        if not recipe_ids:
+            return updated
+        with transaction.atomic():
+            update_recipe_nutrition(recipe_ids)
+        updated += len(recipe_ids)
+        last_id = recipe_ids[-1]
+
+
+def parse_value(value):
+    value = value.strip().replace(',', '.')
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f'не число {value}')
+    if number < 0:
+        raise ValueError(f'отрицательное значение {value}')
+    return number
+
+
+def load_nutrition(path):
+    """
+    Загрузка пищевой ценности из CSV в формате data/ingredients.csv
+    с дополнительными колонками: название, единица, ккал, белки, жиры,
+    углеводы (пустое значение - нет данных). Ингредиенты ищутся по паре
+    (название, единица) одним запросом и обновляются пачками.
+    Возвращает id измененных ингредиентов и строки с ошибками
+    """
+    ingredients = {
+        (name, unit): (pk, tuple(values))
+        for pk, name, unit, *values in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit', *NUTRIENTS
+        ).iterator()
+    }
+    changed = []
+    errors = []
+    with open(path, encoding='utf-8', newline='') as source:
+        for line_number, row in enumerate(csv.reader(source), 1):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if len(row) != 2 + len(NUTRIENTS):
+                errors.append((line_number, 'неверное число колонок'))
+                continue
+            name, unit, *raw_values = (cell.strip() for cell in row)
+            try:
+                values = tuple(parse_value(value) for value in raw_values)
+            except ValueError as error:
+                errors.append((line_number, str(error)))
+                continue
+            found = ingredients.get((name, unit))
+            if found is None:
+                errors.append(
+                    (line_number, f'нет ингредиента {name}, {unit}')
+                )
+                continue
+            pk, current = found
+            if values != current:
+                changed.append(
+                    Ingredient(pk=pk, **dict(zip(NUTRIENTS, values)))
+                )
+    Ingredient.objects.bulk_update(changed, NUTRIENTS, batch_size=1000)
+    return [ingredient.pk for ingredient in changed], errors
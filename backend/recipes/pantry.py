@@ -0,0 +1,59 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PantryItem
+
+UPSERT_BATCH_SIZE = 500
+
+
+def upsert_pantry(user, amounts):
+    """
+    Запись запасов {id ингредиента: количество} пачками
+    INSERT ... ON CONFLICT (user, ingredient) DO UPDATE: новые строки
+    добавляются, существующие перезаписываются без предварительной
+    выборки
+    """
+    quote = connection.ops.quote_name
+    meta = PantryItem._meta
+    user_column, ingredient_column, amount_column, updated_column = (
+        quote(meta.get_field(name).column)
+        for name in ('user', 'ingredient', 'amount', 'updated_at')
+    )
+    now = meta.get_field('updated_at').get_db_prep_save(
+        timezone.now(), connection
+    )
+    items = list(amounts.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            batch = items[start:start + UPSERT_BATCH_SIZE]
+            params = []
+            for ingredient_id, amount in batch:
+                params.extend((user.pk, ingredient_id, amount, now))
+            cursor.execute(
+                f'INSERT INTO {quote(meta.db_table)} ({user_column}, '
+                f'{ingredient_column}, {amount_column}, {updated_column}) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT ({user_column}, {ingredient_column}) '
+                f'DO UPDATE SET {amount_column} = EXCLUDED.{amount_column}, '
+                f'{updated_column} = EXCLUDED.{updated_column}',
+                params,
+            )
+
+
+def sync_pantry(user, amounts, replace=False):
+    """
+    Применение пачки запасов из клиента в одной транзакции: нулевое
+    количество удаляет запас, при replace=True удаляются и все запасы,
+    которых нет в пачке
+    """
+    keep = {pk: amount for pk, amount in amounts.items() if amount > 0}
+    with transaction.atomic():
+        stale = PantryItem.objects.filter(user=user)
+        if replace:
+            stale = stale.exclude(ingredient_id__in=keep)
+        else:
+            stale = stale.filter(ingredient_id__in=[
+                pk for pk, amount in amounts.items() if amount <= 0
+            ])
+        stale.delete()
+        upsert_pantry(user, keep)
@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Min
+from django.db.models.deletion import Collector
+from django.utils import timezone
+from jobs.queue import enqueue_once
+from users.models import User
+
+from .models import Recipe
+from .stats import RECONCILE_TASK
+
+PURGE_TASK = 'recipes.purge_deleted'
+SOFT_DELETED = (('users', User), ('recipes', Recipe))
+
+
+def soft_delete_recipes(queryset):
+    """
+    Пометка рецептов на удаление одним UPDATE, связанные строки
+    удаляются позже фоновой очисткой
+    """
+    with transaction.atomic():
+        marked = queryset.filter(deleted_at__isnull=True).update(
+            deleted_at=timezone.now()
+        )
+        if marked:
+            enqueue_once(PURGE_TASK)
+    return marked
+
+
+def soft_delete_user(user):
+    """
+    Пометка пользователя и его рецептов на удаление. Пользователь
+    сохраняется через save(), чтобы сбросились кеши аутентификации
+    """
+    with transaction.atomic():
+        user.deleted_at = timezone.now()
+        user.is_active = False
+        user.save(update_fields=('deleted_at', 'is_active'))
+        Recipe.all_objects.filter(
+            author=user, deleted_at__isnull=True
+        ).update(deleted_at=user.deleted_at)
+        enqueue_once(PURGE_TASK)
+
+
+def cascade_relations(model):
+    """
+    Обратные связи с on_delete=CASCADE, включая автоматические
+    промежуточные таблицы ManyToMany
+    """
+    return [
+        relation for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created
+        and not relation.concrete
+        and (relation.one_to_many or relation.one_to_one)
+        and relation.on_delete is models.CASCADE
+    ]
+
+
+def delete_batch(model, pks):
+    """
+    Удаление пачки строк: без обработчиков сигналов и каскадов - одним
+    DELETE без выборки объектов, иначе через Collector в пределах пачки
+    """
+    queryset = model._base_manager.filter(pk__in=pks)
+    with transaction.atomic(using=queryset.db):
+        if Collector(using=queryset.db).can_fast_delete(queryset):
+            return queryset._raw_delete(queryset.db)
+        deleted, _ = queryset.delete()
+        return deleted
+
+
+def purge_queryset(queryset, batch_size):
+    """
+    Удаление строк пачками снизу вверх: сначала зависимые строки каждой
+    пачки, затем сама пачка, поэтому Collector не обходит весь каскад
+    и блокировки держатся недолго. Возвращает число удаленных строк
+    """
+    queryset = queryset.order_by()
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        for relation in cascade_relations(queryset.model):
+            deleted += purge_queryset(
+                relation.related_model._base_manager.filter(
+                    **{f'{relation.field.name}__in': pks}
+                ),
+                batch_size,
+            )
+        deleted += delete_batch(queryset.model, pks)
+
+
+def purge_deleted(batch_size=None):
+    """
+    Окончательное удаление помеченных пользователей и рецептов
+    вместе с зависимыми строками. Возвращает число удаленных строк.
+    После удаления ставится сверка статистики авторов: удаление из админки
+    и избранное, списки покупок и подписки удаленных пользователей
+    счетчики не уменьшают
+    """
+    batch_size = batch_size or getattr(settings, 'PURGE_BATCH_SIZE', 500)
+    deleted = {
+        name: purge_queryset(
+            model._base_manager.filter(deleted_at__isnull=False), batch_size
+        )
+        for name, model in SOFT_DELETED
+    }
+    if any(deleted.values()):
+        enqueue_once(RECONCILE_TASK)
+    return deleted
+
+
+def purge_backlog():
+    """
+    Очередь на удаление: число помеченных строк и возраст самой старой
+    пометки в секундах
+    """
+    now = timezone.now()
+    backlog = {}
+    for name, model in SOFT_DELETED:
+        stats = model._base_manager.filter(
+            deleted_at__isnull=False
+        ).aggregate(count=Count('pk'), oldest=Min('deleted_at'))
+        backlog[name] = {
+            'count': stats['count'],
+            'oldest_age': (
+                (now - stats['oldest']).total_seconds()
+                if stats['oldest'] else 0
+            ),
+        }
+    return backlog
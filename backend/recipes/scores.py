@@ -0,0 +1,209 @@
+"""
+Оценки рецептов обновляются по часовым сводкам событий (HourlyRollup)
+с отметки прошлого запуска: добавления и удаления в избранном и списке
+покупок дают прирост или уменьшение за каждый час. Берутся только часы,
+которые сводки больше не пересчитывают (старше отметки сводок минус
+EVENTS_ROLLUP_LATENESS), поэтому ни один час не учитывается дважды
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from events.models import Event, HourlyRollup
+from events.rollups import ROLLUP_CHECKPOINT, floor_hour
+
+from .models import Checkpoint, Favorite, Recipe, RecipeScore, ShoppingCart
+
+SCORE_SOURCES = {
+    'favorite': Favorite,
+    'shopping_cart': ShoppingCart,
+}
+SCORE_EVENTS = {
+    Event.FAVORITE_ADDED: ('favorite', 1),
+    Event.FAVORITE_REMOVED: ('favorite', -1),
+    Event.CART_ADDED: ('shopping_cart', 1),
+    Event.CART_REMOVED: ('shopping_cart', -1),
+}
+TRENDING_EPOCH = datetime(2022, 12, 1, tzinfo=timezone.utc)
+SCORE_CHECKPOINT = 'recipe_scores'
+
+
+def log_add_exp(first, second):
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def trending_increment(weight, moment):
+    """
+    Вклад события в трендовость в логарифмической шкале.
+    Затухание считается относительно фиксированной эпохи, поэтому
+    сохраненные значения сравнимы между собой без пересчета
+    """
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE', 3 * 24 * 60 * 60)
+    decay = math.log(2) / half_life
+    age = (moment - TRENDING_EPOCH).total_seconds()
+    return math.log(weight) + decay * age
+
+
+def weighted_totals():
+    """
+    Взвешенное число текущих строк избранного и списка покупок
+    по рецептам - основа полного пересчета
+    """
+    weights = getattr(settings, 'POPULARITY_WEIGHTS', {})
+    totals = defaultdict(float)
+    for name, model in SCORE_SOURCES.items():
+        rows = model.objects.order_by().values('recipe').annotate(
+            total=Count('id')
+        ).values_list('recipe', 'total')
+        for recipe_id, total in rows:
+            totals[recipe_id] += total * weights.get(name, 1)
+    return totals
+
+
+def rollup_deltas(start, end=None):
+    """
+    Взвешенные добавления и удаления по рецептам и часам из сводок
+    за [start, end): {recipe_id: [(час, добавлено, удалено), ...]}
+    """
+    weights = getattr(settings, 'POPULARITY_WEIGHTS', {})
+    rows = HourlyRollup.objects.filter(
+        bucket__gte=start, kind__in=SCORE_EVENTS, recipe_id__gt=0
+    )
+    if end is not None:
+        rows = rows.filter(bucket__lt=end)
+    rows = rows.order_by().values('recipe_id', 'bucket', 'kind').annotate(
+        total=Sum('count')
+    )
+    buckets = defaultdict(lambda: [0, 0])
+    for row in rows:
+        name, sign = SCORE_EVENTS[row['kind']]
+        weight = row['total'] * weights.get(name, 1)
+        buckets[row['recipe_id'], row['bucket']][sign < 0] += weight
+    deltas = defaultdict(list)
+    for (recipe_id, bucket), (added, removed) in sorted(buckets.items()):
+        deltas[recipe_id].append((bucket, added, removed))
+    return deltas
+
+
+def ensure_recipe_scores(recipe_ids):
+    """
+    Нулевые оценки для новых рецептов: без строки RecipeScore рецепт
+    не попадет в сортировку по популярности и трендовости
+    """
+    RecipeScore.objects.bulk_create(
+        (RecipeScore(recipe_id=recipe_id) for recipe_id in recipe_ids),
+        ignore_conflicts=True,
+    )
+
+
+def apply_delta(score, moment, added, removed):
+    """
+    Прирост добавляется в трендовость с временем своего часа, при
+    удалениях трендовость уменьшается в той же пропорции, что и сумма
+    """
+    if added:
+        score.trending = trending_increment(added, moment) if (
+            score.popularity <= 0
+        ) else log_add_exp(score.trending, trending_increment(added, moment))
+        score.popularity += added
+    if removed:
+        remaining = score.popularity - removed
+        if remaining <= 0:
+            score.popularity = score.trending = 0
+        else:
+            score.trending += math.log(remaining / score.popularity)
+            score.popularity = remaining
+
+
+def settled_until():
+    """
+    Граница часов, которые сводки уже не пересчитывают, или None,
+    если сводки еще не строились
+    """
+    position = Checkpoint.objects.filter(
+        name=ROLLUP_CHECKPOINT
+    ).values_list('position', flat=True).first()
+    if not position:
+        return None
+    return floor_hour(datetime.fromtimestamp(
+        position, tz=timezone.utc
+    ) - timedelta(
+        seconds=getattr(settings, 'EVENTS_ROLLUP_LATENESS', 60 * 60)
+    ))
+
+
+def rebuild_recipe_scores(until):
+    """
+    Полный пересчет по таблицам избранного и списка покупок. Часы
+    после until, уже попавшие в сводки, вычитаются: следующий запуск
+    добавит их из сводок
+    """
+    ensure_recipe_scores(Recipe.all_objects.filter(
+        score__isnull=True
+    ).values_list('id', flat=True))
+    totals = weighted_totals()
+    if until is not None:
+        for recipe_id, buckets in rollup_deltas(until).items():
+            for _, added, removed in buckets:
+                totals[recipe_id] -= added - removed
+    moment = until or datetime.now(timezone.utc)
+    changed = []
+    for score in RecipeScore.objects.all().iterator():
+        total = max(totals.get(score.recipe_id, 0), 0)
+        score.popularity = total
+        score.trending = trending_increment(total, moment) if total else 0
+        changed.append(score)
+    RecipeScore.objects.bulk_update(
+        changed, ('popularity', 'trending'), batch_size=500
+    )
+    return len(changed)
+
+
+@transaction.atomic
+def update_recipe_scores(full=False):
+    """
+    Обновление RecipeScore по сводкам событий с отметки прошлого
+    запуска. full=True (и первый запуск) пересчитывает оценки по таблицам
+    избранного и списка покупок, трендовость - как будто все добавления
+    случились на границе сводок
+    """
+    # блокировка строки: параллельный запуск иначе применил бы те же
+    # часы второй раз
+    checkpoint, _ = Checkpoint.objects.select_for_update().get_or_create(
+        name=SCORE_CHECKPOINT
+    )
+    until = settled_until()
+    if full or not checkpoint.position:
+        count = rebuild_recipe_scores(until)
+    elif until is None:
+        return 0
+    else:
+        start = datetime.fromtimestamp(checkpoint.position, tz=timezone.utc)
+        if start >= until:
+            return 0
+        deltas = rollup_deltas(start, until)
+        # журнал хранит id без внешних ключей: удаленных рецептов
+        # в таблице уже нет
+        ensure_recipe_scores(Recipe.all_objects.filter(
+            pk__in=list(deltas), score__isnull=True
+        ).values_list('id', flat=True))
+        scores = RecipeScore.objects.in_bulk(list(deltas))
+        for recipe_id, score in scores.items():
+            for bucket, added, removed in deltas[recipe_id]:
+                apply_delta(
+                    score, bucket + timedelta(minutes=30), added, removed
+                )
+        RecipeScore.objects.bulk_update(
+            scores.values(), ('popularity', 'trending'), batch_size=500
+        )
+        count = len(scores)
+    if until is not None:
+        checkpoint.position = int(until.timestamp())
+        checkpoint.save(update_fields=('position',))
+    return count
@@ -0,0 +1,270 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (BooleanField, Case, CharField, FloatField, Func,
+                              Q, Value, When)
+from django.db.models.functions import Greatest
+
+from .catalog import get_catalog, source_version
+from .models import Ingredient
+
+TRANSLIT = (
+    ('shch', 'щ'), ('sch', 'щ'), ('zh', 'ж'), ('kh', 'х'), ('ts', 'ц'),
+    ('ch', 'ч'), ('sh', 'ш'), ('yu', 'ю'), ('ya', 'я'), ('yo', 'е'),
+    ('ye', 'е'), ('a', 'а'), ('b', 'б'), ('v', 'в'), ('g', 'г'),
+    ('d', 'д'), ('e', 'е'), ('z', 'з'), ('i', 'и'), ('y', 'ы'),
+    ('j', 'й'), ('k', 'к'), ('l', 'л'), ('m', 'м'), ('n', 'н'),
+    ('o', 'о'), ('p', 'п'), ('r', 'р'), ('s', 'с'), ('t', 'т'),
+    ('u', 'у'), ('f', 'ф'), ('h', 'х'), ('c', 'ц'), ('w', 'в'),
+    ('x', 'кс'), ('q', 'к'), ("'", 'ь'),
+)
+TRANSLIT_PATTERN = re.compile('|'.join(re.escape(key) for key, _ in TRANSLIT))
+TRANSLIT_MAP = dict(TRANSLIT)
+KEYBOARD_LAYOUT = str.maketrans(
+    "qwertyuiop[]asdfghjkl;'zxcvbnm,.`",
+    'йцукенгшщзхъфывапролджэячсмитьбюе',
+)
+LATIN = re.compile('[a-z]')
+WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    return text.lower().replace('ё', 'е').strip()
+
+
+def query_variants(query):
+    """
+    Варианты запроса: как есть, транслитерация латиницы и набор
+    в неправильной раскладке ("pomidor", "gjvbljh" -> "помидор")
+    """
+    query = normalize(query)
+    variants = [query]
+    if LATIN.search(query):
+        for variant in (
+            TRANSLIT_PATTERN.sub(
+                lambda match: TRANSLIT_MAP[match.group()], query
+            ),
+            query.translate(KEYBOARD_LAYOUT),
+        ):
+            if variant not in variants:
+                variants.append(variant)
+    return variants
+
+
+def trigrams(text):
+    """
+    Триграммы по правилам pg_trgm: каждое слово дополняется
+    двумя пробелами слева и одним справа
+    """
+    grams = set()
+    for word in WORD.findall(normalize(text)):
+        padded = f'  {word} '
+        grams.update(
+            padded[index:index + 3] for index in range(len(padded) - 2)
+        )
+    return grams
+
+
+class NgramIndex:
+    """
+    Триграммный индекс названий в памяти процесса с ранжированием
+    по той же мере сходства, что similarity() в pg_trgm
+    """
+    def __init__(self, items):
+        self.names = {}
+        self.sizes = {}
+        self.postings = defaultdict(set)
+        for pk, name in items:
+            grams = trigrams(name)
+            self.names[pk] = normalize(name)
+            self.sizes[pk] = len(grams)
+            for gram in grams:
+                self.postings[gram].add(pk)
+
+    def count_shared(self, grams, threshold):
+        """
+        Число общих триграмм для кандидатов. Для сходства не ниже порога
+        нужно не меньше threshold * len(grams) общих триграмм, поэтому
+        кандидатов достаточно взять из самых редких триграмм запроса,
+        а по остальным только проверить вхождение
+        """
+        postings = sorted(
+            (self.postings.get(gram, set()) for gram in grams), key=len
+        )
+        required = max(1, math.ceil(threshold * len(grams)))
+        rare = postings[:len(grams) - required + 1]
+        frequent = postings[len(grams) - required + 1:]
+        shared = Counter()
+        for posting in rare:
+            shared.update(posting)
+        for pk in shared:
+            shared[pk] += sum(pk in posting for posting in frequent)
+        return shared
+
+    def search(self, variants, limit, threshold):
+        scores = {}
+        for variant in variants:
+            grams = trigrams(variant)
+            if not grams:
+                continue
+            shared = self.count_shared(grams, threshold)
+            for pk, count in shared.items():
+                similarity = count / (len(grams) + self.sizes[pk] - count)
+                prefix = self.names[pk].startswith(variant)
+                if similarity >= threshold or prefix:
+                    scores[pk] = max(
+                        scores.get(pk, (False, 0)), (prefix, similarity)
+                    )
+        return [
+            pk for pk, _ in heapq.nsmallest(
+                limit,
+                scores.items(),
+                key=lambda item: (
+                    not item[1][0], -item[1][1], self.names[item[0]]
+                ),
+            )
+        ]
+
+
+index_lock = threading.Lock()
+index_state = {'index': None, 'version': None}
+
+
+def get_index():
+    """
+    Индекс строится по снимку каталога, если он актуален, иначе из БД.
+    Версия - путь снимка или версия справочников в БД, поэтому изменение
+    ингредиентов в любом процессе перестраивает индекс во всех
+    """
+    catalog = get_catalog()
+    version = source_version() if catalog is None else catalog.path
+    with index_lock:
+        if index_state['index'] is None or index_state['version'] != version:
+            index_state['index'] = NgramIndex(
+                Ingredient.objects.values_list('id', 'name').iterator()
+                if catalog is None else catalog.iter_names()
+            )
+            index_state['version'] = version
+        return index_state['index']
+
+
+def set_similarity_threshold(connection):
+    """
+    Порог оператора % для соединения: pg_trgm берет его из настройки
+    pg_trgm.similarity_threshold, а не из запроса
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, false)",
+            [str(getattr(settings, 'INGREDIENT_SEARCH_THRESHOLD', 0.3))],
+        )
+
+
+class FoldedName(Func):
+    """
+    Название с ё, замененной на е, как в normalize(). Выражение совпадает
+    с выражением GIN-индекса recipes_ingredient_name_folded_trgm
+    """
+    template = "translate(%(expressions)s, 'Ёё', 'Ее')"
+    output_field = CharField()
+
+
+class TrigramMatch(Func):
+    """
+    Оператор % из pg_trgm, использующий GIN-индекс по названию
+    """
+    arg_joiner = ' %% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+class PrefixMatch(Func):
+    """
+    ILIKE по началу строки: в отличие от istartswith (UPPER(...) LIKE)
+    тоже обслуживается GIN-индексом gin_trgm_ops
+    """
+    arg_joiner = ' ILIKE '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+def escape_like(text):
+    return (
+        text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+
+
+def similarity(variant):
+    return Func(
+        FoldedName('name'), Value(variant), function='similarity',
+        output_field=FloatField()
+    )
+
+
+def trigram_search(variants, limit, queryset=None):
+    if queryset is None:
+        queryset = Ingredient.objects.all()
+    match = Q()
+    prefix = Q()
+    for variant in variants:
+        match |= Q(TrigramMatch(FoldedName('name'), Value(variant)))
+        prefix |= Q(PrefixMatch(
+            FoldedName('name'), Value(escape_like(variant) + '%')
+        ))
+    scores = [similarity(variant) for variant in variants]
+    return queryset.filter(match | prefix).annotate(
+        rank=Greatest(*scores) if len(scores) > 1 else scores[0],
+        is_prefix=Case(
+            When(prefix, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+    ).order_by('-is_prefix', '-rank', 'name')[:limit]
+
+
+def search_ingredient_ids(query, limit=None):
+    """
+    Id ингредиентов по нечеткому запросу в порядке ранжирования
+    """
+    limit = limit or getattr(settings, 'INGREDIENT_SEARCH_LIMIT', 20)
+    variants = query_variants(query)
+    if connection.vendor == 'postgresql':
+        return list(
+            trigram_search(variants, limit).values_list('id', flat=True)
+        )
+    return get_index().search(
+        variants,
+        limit,
+        getattr(settings, 'INGREDIENT_SEARCH_THRESHOLD', 0.3),
+    )
+
+
+def search_ingredients(query, limit=None, queryset=None):
+    """
+    Нечеткий поиск ингредиентов с ранжированием: сначала совпадения
+    по началу названия, затем по убыванию триграммного сходства.
+    На PostgreSQL - pg_trgm, на остальных БД - индекс в памяти.
+    Результат ограничен queryset, если он передан
+    """
+    if connection.vendor == 'postgresql':
+        return trigram_search(
+            query_variants(query),
+            limit or getattr(settings, 'INGREDIENT_SEARCH_LIMIT', 20),
+            queryset,
+        )
+    if queryset is None:
+        queryset = Ingredient.objects.all()
+    ids = search_ingredient_ids(query, limit)
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *(When(pk=pk, then=Value(position)) for position, pk in enumerate(
+            ids
+        )),
+        default=Value(len(ids)),
+    ))
@@ -0,0 +1,188 @@
+import csv
+import hashlib
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+from jobs.queue import enqueue_once
+
+from .catalog import source_version
+from .models import (IngredientsInRecipe, PantryItem, ShoppingCart,
+                     ShoppingListExport)
+from .units import format_amount, humanize
+
+MIN_REMAINING = 1e-6
+PURGE_EXPORTS_TASK = 'recipes.purge_exports'
+EXPORT_FORMATS = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def subtract_pantry(totals, user):
+    """
+    Остаток к покупке: потребность минус запасы пользователя в той же
+    канонической единице. Вычитание делается в БД через LEFT JOIN двух
+    сгруппированных выборок, полностью покрытые запасом позиции
+    в результат не попадают
+    """
+    pantry = PantryItem.objects.filter(user=user).order_by().values_list(
+        'ingredient__name', 'ingredient__canonical_unit'
+    ).annotate(total=Sum(F('amount') * F('ingredient__unit_factor')))
+    needed_sql, needed_params = totals.query.sql_with_params()
+    pantry_sql, pantry_params = pantry.query.sql_with_params()
+    quote = connection.ops.quote_name
+    name, unit, total = quote('name'), quote('canonical_unit'), quote('total')
+    remaining = f'needed.{total} - COALESCE(pantry.{total}, 0)'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT needed.{name}, needed.{unit}, {remaining} '
+            f'FROM ({needed_sql}) needed '
+            f'LEFT JOIN ({pantry_sql}) pantry '
+            f'ON pantry.{name} = needed.{name} '
+            f'AND pantry.{unit} = needed.{unit} '
+            f'WHERE {remaining} > %s '
+            f'ORDER BY needed.{name}, needed.{unit}',
+            (*needed_params, *pantry_params, MIN_REMAINING),
+        )
+        return cursor.fetchall()
+
+
+def summarize_ingredients(queryset, multiplier, pantry_user=None):
+    """
+    Ингредиенты рецептов из queryset одним запросом с группировкой в БД:
+    количества умножаются на multiplier, приводятся к канонической
+    единице ингредиента и суммируются, при pantry_user - за вычетом
+    его запасов.
+    Результат - кортежи (название, единица, количество)
+    """
+    totals = queryset.order_by().values_list(
+        'ingredient__name', 'ingredient__canonical_unit'
+    ).annotate(
+        total=Sum(F('amount') * F('ingredient__unit_factor') * multiplier)
+    )
+    if pantry_user is not None:
+        totals = subtract_pantry(totals, pantry_user)
+    else:
+        totals = totals.order_by(
+            'ingredient__name', 'ingredient__canonical_unit'
+        )
+    rows = []
+    for name, canonical_unit, total in totals:
+        amount, unit = humanize(total, canonical_unit)
+        rows.append((name, unit, amount))
+    return rows
+
+
+def get_shopping_list(user, use_pantry=True):
+    """
+    Список покупок пользователя с учетом множителя порций из корзины
+    и, по умолчанию, за вычетом запасов
+    """
+    return summarize_ingredients(
+        IngredientsInRecipe.objects.filter(
+            recipe__shopping_cart__user=user, recipe__deleted_at__isnull=True
+        ),
+        F('recipe__shopping_cart__multiplier'),
+        user if use_pantry else None,
+    )
+
+
+def cart_digest(user, use_pantry=True):
+    """
+    Хеш состава корзины: рецепты с множителями и отпечатком их
+    ингредиентов, запасы при use_pantry и версия справочников.
+    Считается без группировки по ингредиентам и вычитания запасов,
+    поэтому готовый файл находится дешевле, чем строится список
+    """
+    cart = ShoppingCart.objects.filter(
+        user=user, recipe__deleted_at__isnull=True
+    ).order_by('recipe_id').values_list('recipe_id', 'multiplier').annotate(
+        rows=Count('recipe__ingridients_in_recipe'),
+        last_row=Max('recipe__ingridients_in_recipe__id'),
+        amount=Sum('recipe__ingridients_in_recipe__amount'),
+    )
+    digest = hashlib.sha256()
+    digest.update(f'{source_version()}\t{use_pantry}\n'.encode())
+    for row in cart:
+        digest.update('\t'.join(map(repr, row)).encode() + b'\n')
+    if use_pantry:
+        digest.update(b'pantry\n')
+        pantry = PantryItem.objects.filter(user=user).order_by(
+            'ingredient_id'
+        ).values_list('ingredient_id', 'amount')
+        for row in pantry:
+            digest.update('\t'.join(map(repr, row)).encode() + b'\n')
+    return digest.hexdigest()
+
+
+def render_txt(rows):
+    return ''.join(
+        f'{name} ({unit})\n' if amount is None
+        else f'{name} ({unit}) - {format_amount(amount)}\n'
+        for name, unit, amount in rows
+    )
+
+
+def render_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    writer.writerows(
+        (name, unit, '' if amount is None else format_amount(amount))
+        for name, unit, amount in rows
+    )
+    return output.getvalue()
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+}
+
+
+def purge_exports():
+    """
+    Удаление файлов старше SHOPPING_LIST_EXPORT_TTL секунд. Запускается
+    фоновой задачей, которую ставит создание нового файла
+    """
+    ttl = getattr(settings, 'SHOPPING_LIST_EXPORT_TTL', 7 * 24 * 60 * 60)
+    expired = ShoppingListExport.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=ttl)
+    )
+    for export in expired:
+        export.file.delete(save=False)
+    return expired.delete()[0]
+
+
+def get_export(user, file_format, use_pantry=True):
+    """
+    Готовый файл по хешу состава корзины; если его нет,
+    список покупок считается, файл формируется и сохраняется
+    """
+    digest = cart_digest(user, use_pantry)
+    export = ShoppingListExport.objects.filter(
+        digest=digest, file_format=file_format
+    ).first()
+    if export is not None:
+        return export
+    rows = get_shopping_list(user, use_pantry)
+    export = ShoppingListExport(digest=digest, file_format=file_format)
+    content = RENDERERS[file_format](rows).encode()
+    export.file.save(
+        f'{digest}.{file_format}', ContentFile(content), save=False
+    )
+    try:
+        with transaction.atomic():
+            export.save()
+    except IntegrityError:
+        export.file.delete(save=False)
+        return ShoppingListExport.objects.get(
+            digest=digest, file_format=file_format
+        )
+    enqueue_once(PURGE_EXPORTS_TASK)
+    return export
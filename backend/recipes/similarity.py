@@ -0,0 +1,213 @@
+import heapq
+import math
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+
+from .models import Favorite, IngredientsInRecipe, Recipe, SimilarRecipe
+
+
+def group_pairs(pairs):
+    groups = defaultdict(set)
+    for key, value in pairs:
+        groups[key].add(value)
+    return groups
+
+
+def build_index(groups):
+    index = defaultdict(list)
+    for key, items in groups.items():
+        for item in items:
+            index[item].append(key)
+    return index
+
+
+class SimilarityData:
+    """
+    Разреженные векторы рецептов: ингредиенты с весами IDF
+    и множества пользователей, добавивших рецепт в избранное.
+    Сходство - косинусная мера по каждому признаку, смешанная с весом
+    SIMILAR_RECIPES_INGREDIENT_WEIGHT
+    """
+    def __init__(self, ingredients, document_count, document_freq,
+                 fans, fan_counts):
+        self.ingredients = ingredients
+        self.idf = {
+            ingredient: math.log(1 + document_count / freq)
+            for ingredient, freq in document_freq.items()
+        }
+        self.ingredient_norms = {
+            recipe: math.sqrt(sum(self.idf[item] ** 2 for item in items))
+            for recipe, items in ingredients.items()
+        }
+        self.ingredient_index = build_index(ingredients)
+        self.fans = fans
+        self.fan_norms = {
+            recipe: math.sqrt(count) for recipe, count in fan_counts.items()
+        }
+        self.fan_index = build_index(fans)
+
+    def cosine(self, recipe_id, groups, index, norms, weight):
+        norm = norms.get(recipe_id)
+        if not norm:
+            return {}
+        dots = defaultdict(float)
+        for item in groups.get(recipe_id, ()):
+            item_weight = weight(item) ** 2
+            for other in index[item]:
+                if other != recipe_id:
+                    dots[other] += item_weight
+        return {
+            other: dot / (norm * norms[other])
+            for other, dot in dots.items()
+        }
+
+    def neighbors(self, recipe_id, limit, ingredient_weight):
+        by_ingredients = self.cosine(
+            recipe_id, self.ingredients, self.ingredient_index,
+            self.ingredient_norms, self.idf.__getitem__
+        )
+        by_favorites = self.cosine(
+            recipe_id, self.fans, self.fan_index,
+            self.fan_norms, lambda item: 1
+        )
+        scores = {
+            other: (
+                ingredient_weight * by_ingredients.get(other, 0)
+                + (1 - ingredient_weight) * by_favorites.get(other, 0)
+            )
+            for other in by_ingredients.keys() | by_favorites.keys()
+        }
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+
+    @classmethod
+    def load(cls):
+        """
+        Данные по всем рецептам для пакетного расчета
+        """
+        ingredients = group_pairs(IngredientsInRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator())
+        fans = group_pairs(
+            Favorite.objects.values_list('recipe_id', 'user_id').iterator()
+        )
+        document_freq = defaultdict(int)
+        for items in ingredients.values():
+            for item in items:
+                document_freq[item] += 1
+        return cls(
+            ingredients, len(ingredients), document_freq, fans,
+            {recipe: len(users) for recipe, users in fans.items()}
+        )
+
+    @classmethod
+    def load_for(cls, recipe_id):
+        """
+        Данные только по окрестности рецепта: рецептам с общими
+        ингредиентами или общими поклонниками
+        """
+        own_ingredients = IngredientsInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values('ingredient_id')
+        ingredients = group_pairs(IngredientsInRecipe.objects.filter(
+            recipe_id__in=IngredientsInRecipe.objects.filter(
+                ingredient_id__in=own_ingredients
+            ).values('recipe_id')
+        ).values_list('recipe_id', 'ingredient_id'))
+        involved = set().union(*ingredients.values())
+        document_freq = dict(IngredientsInRecipe.objects.filter(
+            ingredient_id__in=involved
+        ).order_by().values('ingredient_id').annotate(
+            total=Count('id')
+        ).values_list('ingredient_id', 'total'))
+        document_count = IngredientsInRecipe.objects.values(
+            'recipe_id'
+        ).distinct().count()
+        own_fans = Favorite.objects.filter(
+            recipe_id=recipe_id
+        ).values('user_id')
+        fans = group_pairs(Favorite.objects.filter(
+            user_id__in=own_fans
+        ).values_list('recipe_id', 'user_id'))
+        fan_counts = dict(Favorite.objects.filter(
+            recipe_id__in=list(fans)
+        ).order_by().values('recipe_id').annotate(
+            total=Count('id')
+        ).values_list('recipe_id', 'total'))
+        return cls(
+            ingredients, document_count, document_freq, fans, fan_counts
+        )
+
+
+def get_limits():
+    return (
+        getattr(settings, 'SIMILAR_RECIPES_COUNT', 10),
+        getattr(settings, 'SIMILAR_RECIPES_INGREDIENT_WEIGHT', 0.7),
+    )
+
+
+shared_data = None
+
+
+def init_worker(data):
+    global shared_data
+    shared_data = data
+
+
+def score_chunk(recipe_ids):
+    limit, ingredient_weight = get_limits()
+    return [
+        (recipe_id, other, score)
+        for recipe_id in recipe_ids
+        for other, score in shared_data.neighbors(
+            recipe_id, limit, ingredient_weight
+        )
+    ]
+
+
+def save_neighbors(recipe_ids, rows):
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create([
+            SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+            for recipe_id, other, score in rows
+        ], batch_size=1000)
+
+
+def build_similar_recipes(workers=None, chunk_size=500):
+    """
+    Пакетный пересчет таблицы похожих рецептов: расчет по частям
+    в пуле процессов, запись частями по мере готовности
+    """
+    data = SimilarityData.load()
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    chunks = [
+        recipe_ids[start:start + chunk_size]
+        for start in range(0, len(recipe_ids), chunk_size)
+    ]
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(data,)
+    ) as executor:
+        for chunk, rows in zip(chunks, executor.map(score_chunk, chunks)):
+            save_neighbors(chunk, rows)
+    return len(recipe_ids)
+
+
+def refresh_similar_recipes(recipe_id):
+    """
+    Пересчет соседей одного рецепта после его создания или изменения
+    """
+    limit, ingredient_weight = get_limits()
+    data = SimilarityData.load_for(recipe_id)
+    save_neighbors([recipe_id], [
+        (recipe_id, other, score)
+        for other, score in data.neighbors(
+            recipe_id, limit, ingredient_weight
+        )
+    ])
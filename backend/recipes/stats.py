@@ -0,0 +1,198 @@
+"""
+Статистика авторов в таблице AuthorStats. Счетчики меняются путями
+записи одним UPDATE ... SET x = x + delta, состав рецептов (частые
+ингредиенты и теги) пересчитывается по рецептам автора только при
+изменении его рецептов. Расхождения после массовых операций (импорт,
+админка, удаление пользователей) исправляет фоновая сверка, которую
+ставят импорт и очистка удаленных
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from users.models import Follow, User
+
+from .models import (AuthorStats, Favorite, IngredientsInRecipe, Recipe,
+                     ShoppingCart)
+
+RECONCILE_TASK = 'recipes.reconcile_author_stats'
+FIELDS = (
+    'recipes_count', 'favorites_count', 'shopping_cart_count',
+    'followers_count', 'top_ingredients', 'tags',
+)
+
+
+def count_by(queryset, field):
+    return dict(
+        queryset.order_by().values_list(field).annotate(total=Count('pk'))
+    )
+
+
+def by_popularity(item):
+    return -item['recipes'], item['name']
+
+
+def author_composition(author_ids):
+    """
+    Частые ингредиенты (число рецептов с ингредиентом) и распределение
+    рецептов по тегам для каждого автора
+    """
+    active = {
+        'recipe__author_id__in': author_ids,
+        'recipe__deleted_at__isnull': True,
+    }
+    ingredients = defaultdict(list)
+    rows = IngredientsInRecipe.objects.filter(**active).order_by().values(
+        'recipe__author_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit',
+    ).annotate(recipes=Count('recipe_id', distinct=True))
+    for row in rows:
+        ingredients[row['recipe__author_id']].append({
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'recipes': row['recipes'],
+        })
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(**active).order_by().values(
+        'recipe__author_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug',
+    ).annotate(recipes=Count('recipe_id'))
+    for row in rows:
+        tags[row['recipe__author_id']].append({
+            'id': row['tag_id'],
+            'name': row['tag__name'],
+            'color': row['tag__color'],
+            'slug': row['tag__slug'],
+            'recipes': row['recipes'],
+        })
+    top_size = getattr(settings, 'AUTHOR_STATS_TOP_INGREDIENTS', 10)
+    return {
+        author_id: {
+            'top_ingredients': sorted(
+                ingredients[author_id], key=by_popularity
+            )[:top_size],
+            'tags': sorted(tags[author_id], key=by_popularity),
+        }
+        for author_id in author_ids
+    }
+
+
+def compute_author_stats(author_ids):
+    """
+    Статистика авторов по исходным таблицам, по одному запросу
+    на показатель для всей пачки
+    """
+    received = {
+        'recipe__author_id__in': author_ids,
+        'recipe__deleted_at__isnull': True,
+    }
+    counters = {
+        'recipes_count': count_by(
+            Recipe.objects.filter(author_id__in=author_ids), 'author_id'
+        ),
+        'favorites_count': count_by(
+            Favorite.objects.filter(**received), 'recipe__author_id'
+        ),
+        'shopping_cart_count': count_by(
+            ShoppingCart.objects.filter(**received), 'recipe__author_id'
+        ),
+        'followers_count': count_by(
+            Follow.objects.filter(author_id__in=author_ids), 'author_id'
+        ),
+    }
+    composition = author_composition(author_ids)
+    return {
+        author_id: {
+            **{
+                name: values.get(author_id, 0)
+                for name, values in counters.items()
+            },
+            **composition[author_id],
+        }
+        for author_id in author_ids
+    }
+
+
+def rebuild_author_stats(author_ids):
+    """
+    Сверка строк статистики с исходными таблицами: отличающиеся строки
+    перезаписываются с новой версией, отсутствующие создаются.
+    Возвращает число исправленных строк
+    """
+    computed = compute_author_stats(author_ids)
+    with transaction.atomic():
+        existing = AuthorStats.objects.select_for_update().in_bulk(
+            author_ids
+        )
+        changed = []
+        for author_id, values in computed.items():
+            stats = existing.get(author_id)
+            if stats is None or all(
+                getattr(stats, name) == value for name, value in values.items()
+            ):
+                continue
+            for name, value in values.items():
+                setattr(stats, name, value)
+            stats.version += 1
+            changed.append(stats)
+        AuthorStats.objects.bulk_update(
+            changed, (*FIELDS, 'version'), batch_size=500
+        )
+        missing = [
+            AuthorStats(author_id=author_id, version=1, **values)
+            for author_id, values in computed.items()
+            if author_id not in existing
+        ]
+        AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(changed) + len(missing)
+
+
+def adjust_author_stats(author_id, composition=False, **deltas):
+    """
+    Изменение счетчиков автора на deltas, при composition=True еще
+    и пересчет состава его рецептов. Строки еще нет - она строится
+    целиком по исходным таблицам
+    """
+    values = {name: F(name) + delta for name, delta in deltas.items()}
+    if composition:
+        values.update(author_composition([author_id])[author_id])
+    if not AuthorStats.objects.filter(author_id=author_id).update(
+        version=F('version') + 1, **values
+    ):
+        rebuild_author_stats([author_id])
+
+
+def get_author_stats(author_id):
+    """
+    Статистика автора одним чтением строки по первичному ключу,
+    None - пользователя нет или он удален
+    """
+    stats = AuthorStats.objects.filter(
+        author_id=author_id, author__deleted_at__isnull=True
+    ).first()
+    if stats is None and User.objects.filter(pk=author_id).exists():
+        rebuild_author_stats([author_id])
+        stats = AuthorStats.objects.get(author_id=author_id)
+    return stats
+
+
+def reconcile_author_stats(batch_size=None):
+    """
+    Сверка статистики всех пользователей пачками,
+    возвращает число проверенных и исправленных строк
+    """
+    batch_size = batch_size or getattr(
+        settings, 'AUTHOR_STATS_BATCH_SIZE', 500
+    )
+    checked = fixed = 0
+    last_id = 0
+    while True:
+        author_ids = list(User.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:batch_size])
+        if not author_ids:
+            return {'checked': checked, 'fixed': fixed}
+        fixed += rebuild_author_stats(author_ids)
+        checked += len(author_ids)
+        last_id = author_ids[-1]
@@ -0,0 +1,48 @@
+from jobs.queue import task
+
+from .catalog import BUILD_TASK, build_snapshot
+from .nutrition import RECOMPUTE_TASK, recompute_nutrition
+from .purge import PURGE_TASK, purge_deleted
+from .shopping_list import PURGE_EXPORTS_TASK, get_export, purge_exports
+from .similarity import refresh_similar_recipes
+from .stats import RECONCILE_TASK, reconcile_author_stats
+
+
+@task('recipes.refresh_similar')
+def refresh_similar(recipe_id):
+    refresh_similar_recipes(recipe_id)
+
+
+@task('recipes.export_shopping_list')
+def export_shopping_list(user_id, file_format, use_pantry=True):
+    export = get_export(user_id, file_format, use_pantry)
+    return {
+        'digest': export.digest,
+        'file_format': export.file_format,
+        'url': export.file.url,
+    }
+
+
+@task(PURGE_EXPORTS_TASK)
+def purge_shopping_list_exports():
+    return {'exports': purge_exports()}
+
+
+@task(PURGE_TASK)
+def purge_deleted_rows():
+    return purge_deleted()
+
+
+@task(BUILD_TASK)
+def build_catalog():
+    return {'path': build_snapshot()}
+
+
+@task(RECONCILE_TASK)
+def reconcile_stats():
+    return reconcile_author_stats()
+
+
+@task(RECOMPUTE_TASK)
+def recompute_recipe_nutrition(ingredient_ids=None):
+    return {'recipes': recompute_nutrition(ingredient_ids)}
@@ -0,0 +1,109 @@
+from collections import namedtuple
+
+MASS = 'mass'
+VOLUME = 'volume'
+COUNT = 'count'
+TO_TASTE = 'to_taste'
+
+Unit = namedtuple('Unit', ('dimension', 'canonical', 'factor'))
+
+UNITS = {
+    'г': Unit(MASS, 'г', 1),
+    'кг': Unit(MASS, 'г', 1000),
+    'мл': Unit(VOLUME, 'мл', 1),
+    'л': Unit(VOLUME, 'мл', 1000),
+    'стакан': Unit(VOLUME, 'мл', 250),
+    'ст. л.': Unit(VOLUME, 'мл', 15),
+    'ч. л.': Unit(VOLUME, 'мл', 5),
+    'капля': Unit(VOLUME, 'мл', 0.05),
+    'по вкусу': Unit(TO_TASTE, 'по вкусу', 1),
+}
+
+# Шаг округления количества в канонической единице по классу единиц
+ROUNDING_STEPS = {
+    MASS: 1,
+    VOLUME: 1,
+    COUNT: 0.5,
+}
+
+# Количество канонической единицы, на которое задается пищевая ценность
+# ингредиента: 100 г, 100 мл или 1 шт.
+NUTRITION_BASES = {
+    MASS: 100,
+    VOLUME: 100,
+    COUNT: 1,
+}
+
+# Крупные единицы для компактного вывода: (единица, множитель)
+DISPLAY_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def get_unit(measurement_unit):
+    """
+    Единица из реестра. Неизвестные единицы (шт., пучок, банка...)
+    считаются штучными и приводятся только сами к себе
+    """
+    unit = measurement_unit.strip()
+    return UNITS.get(unit) or Unit(COUNT, unit, 1)
+
+
+def nutrition_factor(measurement_unit):
+    """
+    Доля базового количества пищевой ценности в одной единице
+    измерения ингредиента: 1 кг -> 10 (по 100 г). 'По вкусу'
+    в пищевую ценность не входит
+    """
+    unit = get_unit(measurement_unit)
+    base = NUTRITION_BASES.get(unit.dimension)
+    return unit.factor / base if base else 0
+
+
+def round_amount(amount, dimension):
+    """
+    Округление до шага класса единиц, ненулевое количество
+    не округляется до нуля
+    """
+    step = ROUNDING_STEPS.get(dimension)
+    if step is None:
+        return amount
+    rounded = round(amount / step) * step
+    if amount > 0 and not rounded:
+        return step
+    return rounded
+
+
+def format_amount(amount):
+    return f'{amount:.3f}'.rstrip('0').rstrip('.')
+
+
+def humanize(amount, canonical_unit):
+    """
+    Количество в канонической единице в компактном виде:
+    1500 г -> (1.5, 'кг'). Для 'по вкусу' количество не выводится
+    """
+    dimension = get_unit(canonical_unit).dimension
+    if dimension == TO_TASTE:
+        return None, canonical_unit
+    amount = round_amount(amount, dimension)
+    larger = DISPLAY_UNITS.get(canonical_unit)
+    if larger is not None and amount >= larger[1]:
+        return amount / larger[1], larger[0]
+    return amount, canonical_unit
+
+
+def scale_amount(amount, measurement_unit, factor):
+    """
+    Пересчет количества на другое число порций: штучные единицы
+    округляются до половины, масса и объем - до трех значащих цифр,
+    'по вкусу' не пересчитывается
+    """
+    dimension = get_unit(measurement_unit).dimension
+    if dimension == TO_TASTE:
+        return amount
+    scaled = amount * factor
+    if dimension == COUNT:
+        return round_amount(scaled, dimension)
+    return float(f'{scaled:.3g}')
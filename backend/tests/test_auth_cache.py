@@ -0,0 +1,53 @@
+from unittest import mock
+
+from api.cache import TTLCache
+from api.v1 import authentication
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(TOKEN_CACHE_CHECK_INTERVAL=0)
+class TokenCacheTest(TestCase):
+    """
+    Отзыв токена и деактивация пользователя в другом процессе
+    сбрасывают кеш токенов этого процесса
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        authentication.token_cache.clear()
+        authentication.revocation_state.update(version=None, checked_at=None)
+
+    def get_me(self):
+        return self.client.get('/api/v1/users/me/').status_code
+
+    def in_other_process(self):
+        return mock.patch.object(
+            authentication, 'token_cache', TTLCache(maxsize=10, ttl=60)
+        )
+
+    def test_token_deleted_in_other_process(self):
+        self.assertEqual(self.get_me(), 200)
+        with self.in_other_process():
+            self.token.delete()
+        self.assertEqual(self.get_me(), 401)
+
+    def test_user_deactivated_in_other_process(self):
+        self.assertEqual(self.get_me(), 200)
+        with self.in_other_process():
+            self.user.is_active = False
+            self.user.save(update_fields=('is_active',))
+        self.assertEqual(self.get_me(), 401)
+
+    def test_login_keeps_cache(self):
+        self.assertEqual(self.get_me(), 200)
+        self.user.save(update_fields=('last_login',))
+        authentication.sync_revocations()
+        self.assertIsNotNone(authentication.token_cache.get(self.token.key))
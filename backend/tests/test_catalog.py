@@ -0,0 +1,97 @@
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from jobs.models import Job
+from recipes import catalog
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+
+class CatalogSnapshotTest(TestCase):
+    """
+    Чтения сверяют снимок с меткой версии без запросов к БД,
+    построение ставится при изменении справочников
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            CATALOG_SNAPSHOT_DIR=directory.name,
+            CATALOG_CHECK_INTERVAL=0,
+            CATALOG_VERSION_INTERVAL=60 * 60,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.reset_state()
+        self.addCleanup(self.reset_state)
+
+    def reset_state(self):
+        catalog.state.update(
+            snapshot=None, fresh=False, checked_at=None,
+            db_version=0, db_checked_at=None,
+        )
+
+    def build_jobs(self):
+        return Job.objects.filter(name=catalog.BUILD_TASK, status=Job.QUEUED)
+
+    def test_reads_follow_version_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(
+                name='Завтрак', color='#E26C2D', slug='breakfast'
+            )
+        self.assertEqual(self.build_jobs().count(), 1)
+        self.assertIsNone(catalog.get_catalog())
+        self.build_jobs().delete()
+        catalog.build_snapshot()
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual(
+                    [tag['slug'] for tag in catalog.get_catalog().tags()],
+                    ['breakfast'],
+                )
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='мука', measurement_unit='г')
+        with self.assertNumQueries(0):
+            self.assertIsNone(catalog.get_catalog())
+        self.assertEqual(self.build_jobs().count(), 1)
+        catalog.build_snapshot()
+        snapshot = catalog.get_catalog()
+        self.assertEqual(
+            [item['name'] for item in snapshot.ingredient_list()], ['мука']
+        )
+
+    def test_stale_read_does_not_enqueue(self):
+        self.assertIsNone(catalog.get_catalog())
+        self.assertFalse(self.build_jobs().exists())
+        catalog.ensure_catalog()
+        self.assertEqual(self.build_jobs().count(), 1)
+
+    def test_compact_expand_ingredients(self):
+        author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        flour = Ingredient.objects.create(name='мука', measurement_unit='г')
+        catalog.build_snapshot()
+        path = '/api/v1/recipes/?compact=1&expand=ingredients'
+
+        def count_queries():
+            recipe = Recipe.objects.create(
+                author=author, name='Блины', text='Приготовить',
+                cooking_time=10,
+            )
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=flour, amount=100
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = APIClient().get(path)
+            self.assertEqual(
+                response.data['results'][0]['ingredients'][0]['name'], 'мука'
+            )
+            return len(queries)
+
+        self.assertIsNotNone(catalog.get_catalog())
+        self.assertEqual(count_queries(), count_queries())
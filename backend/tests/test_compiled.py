@@ -0,0 +1,144 @@
+from unittest import mock
+
+from api.v1.serializers import (GetRecipeSerializer, RecipeShortSerializer,
+                                UsersSerializer)
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+from users.models import Follow, User
+
+
+def field_representation(serializer, instance):
+    return serializers.ModelSerializer.to_representation(serializer, instance)
+
+
+@override_settings(CATALOG_SNAPSHOT_DIR=None)
+class CompiledParityTest(TestCase):
+    """
+    Быстрый путь чтения (api.v1.compiled) выдает то же, что обход
+    полей сериализаторов DRF, для анонимного и авторизованного
+    пользователя
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email='reader@foodgram.ru', username='reader',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        cls.followed = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        cls.other = User.objects.create_user(
+            email='cook@foodgram.ru', username='cook',
+            first_name='Анна', last_name='Смирнова', password='pass12345x',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.followed)
+        breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        dinner = Tag.objects.create(
+            name='Ужин', color='#49B64E', slug='dinner'
+        )
+        flour = Ingredient.objects.create(name='мука', measurement_unit='г')
+        milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл'
+        )
+        salt = Ingredient.objects.create(
+            name='соль', measurement_unit='по вкусу'
+        )
+        pancakes = Recipe.objects.create(
+            author=cls.followed, name='Блины', text='Смешать и пожарить',
+            cooking_time=20, servings=4, image='recipes/images/pancakes.png',
+        )
+        pancakes.tags.set([breakfast, dinner])
+        soup = Recipe.objects.create(
+            author=cls.other, name='Суп', text='Сварить',
+            cooking_time=60, image='',
+        )
+        soup.tags.set([dinner])
+        IngredientsInRecipe.objects.bulk_create([
+            IngredientsInRecipe(recipe=pancakes, ingredient=flour, amount=250),
+            IngredientsInRecipe(recipe=pancakes, ingredient=milk, amount=0.5),
+            IngredientsInRecipe(recipe=soup, ingredient=salt, amount=1),
+        ])
+        Favorite.objects.create(user=cls.reader, recipe=pancakes)
+        ShoppingCart.objects.create(user=cls.reader, recipe=soup)
+
+    def get_context(self, user):
+        request = APIRequestFactory().get('/api/v1/recipes/')
+        request.user = user
+        return {'request': request}
+
+    def get_recipes(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'ingridients_in_recipe__ingredient'
+        ).order_by('pk')
+
+    def assert_parity(self, serializer_class, instances, context):
+        compiled = serializer_class(instances, many=True, context=context)
+        compiled = compiled.data
+        with mock.patch.object(
+            GetRecipeSerializer, 'to_representation', field_representation
+        ), mock.patch.object(
+            RecipeShortSerializer, 'to_representation', field_representation
+        ), mock.patch.object(
+            UsersSerializer, 'to_representation', field_representation
+        ):
+            expected = serializer_class(
+                instances, many=True, context=context
+            ).data
+        self.assertEqual(
+            [list(item) for item in compiled],
+            [list(item) for item in expected],
+        )
+        self.assertEqual(
+            [dict(item) for item in compiled],
+            [dict(item) for item in expected],
+        )
+        return compiled
+
+    def test_recipes(self):
+        for user in (AnonymousUser(), self.reader, self.other):
+            with self.subTest(user=user):
+                data = self.assert_parity(
+                    GetRecipeSerializer,
+                    list(self.get_recipes()),
+                    self.get_context(user),
+                )
+                self.assertEqual(
+                    [item['is_favorited'] for item in data],
+                    [user == self.reader, False],
+                )
+                self.assertEqual(
+                    [item['is_in_shopping_cart'] for item in data],
+                    [False, user == self.reader],
+                )
+                self.assertEqual(
+                    [item['author']['is_subscribed'] for item in data],
+                    [user == self.reader, False],
+                )
+
+    def test_short_recipes(self):
+        for user in (AnonymousUser(), self.reader):
+            with self.subTest(user=user):
+                self.assert_parity(
+                    RecipeShortSerializer,
+                    list(self.get_recipes()),
+                    self.get_context(user),
+                )
+
+    def test_users(self):
+        users = list(User.objects.order_by('pk'))
+        for user in (AnonymousUser(), self.reader, self.other):
+            with self.subTest(user=user):
+                data = self.assert_parity(
+                    UsersSerializer, users, self.get_context(user)
+                )
+                self.assertEqual(
+                    [item['is_subscribed'] for item in data],
+                    [False, user == self.reader, False],
+                )
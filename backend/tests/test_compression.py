@@ -0,0 +1,77 @@
+import gzip
+import json
+import tempfile
+
+from django.test import TestCase, override_settings
+from recipes import catalog
+from recipes.models import Tag
+from rest_framework.test import APIClient
+
+OTHER_WORKER_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'other-worker',
+    }
+}
+
+
+@override_settings(COMPRESSION_MIN_SIZE=0, COMPRESSION_BROTLI=False)
+class CompressedCacheTest(TestCase):
+    """
+    Сжатая копия справочного ответа отдается без запросов к БД
+    и сбрасывается, когда теги меняются в другом процессе со своим
+    локальным кешем
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            CATALOG_SNAPSHOT_DIR=directory.name,
+            CATALOG_CHECK_INTERVAL=0,
+            CATALOG_VERSION_INTERVAL=60 * 60,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.reset_state()
+        self.addCleanup(self.reset_state)
+
+    def reset_state(self):
+        catalog.state.update(
+            snapshot=None, fresh=False, checked_at=None,
+            db_version=0, db_checked_at=None,
+        )
+
+    def get_tags(self):
+        response = APIClient().get(
+            '/api/v1/tags/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        return sorted(
+            tag['slug'] for tag in json.loads(gzip.decompress(
+                response.content
+            ))
+        )
+
+    def test_change_in_other_process(self):
+        slugs = [f'breakfast-{number}' for number in range(10)]
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.bulk_create(
+                Tag(
+                    name=f'Завтрак {number}', color=f'#E26C{number}D',
+                    slug=slug,
+                )
+                for number, slug in enumerate(slugs)
+            )
+            catalog.invalidate_catalog()
+        catalog.build_snapshot()
+        self.assertEqual(self.get_tags(), slugs)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_tags(), slugs)
+        with override_settings(CACHES=OTHER_WORKER_CACHES), \
+                self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Ужин', color='#49B64E', slug='dinner')
+        self.assertEqual(self.get_tags(), slugs + ['dinner'])
+        catalog.build_snapshot()
+        self.assertEqual(self.get_tags(), slugs + ['dinner'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_tags(), slugs + ['dinner'])
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+@override_settings(CATALOG_SNAPSHOT_DIR=None)
+class ImportRejectsTest(TransactionTestCase):
+    """
+    Некорректные записи NDJSON уходят в файл отказов, остальные
+    записи импортируются
+    """
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        self.flour = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'recipes.ndjson')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def recipe(self, **fields):
+        return {
+            'name': 'Блины',
+            'text': 'Смешать и пожарить',
+            'cooking_time': 20,
+            'tags': ['breakfast'],
+            'ingredients': [{'id': self.flour.id, 'amount': 250}],
+            **fields,
+        }
+
+    def test_malformed_records(self):
+        records = [
+            self.recipe(),
+            self.recipe(ingredients=[{'id': [self.flour.id], 'amount': 10}]),
+            self.recipe(ingredients=[{'id': {'pk': 1}, 'amount': 10}]),
+            self.recipe(ingredients=[
+                {'name': 'мука', 'measurement_unit': ['г'], 'amount': 10}
+            ]),
+            self.recipe(ingredients=[
+                {'name': 'мука', 'measurement_unit': {'г': 1}, 'amount': 10}
+            ]),
+            self.recipe(author=['chef']),
+            self.recipe(author={'username': 'chef'}),
+            self.recipe(tags=7),
+            self.recipe(name='Оладьи', author='chef'),
+        ]
+        with open(self.path, 'w', encoding='utf-8') as source:
+            for record in records:
+                source.write(json.dumps(record, ensure_ascii=False) + '\n')
+        call_command(
+            'import_recipes', self.path, author='chef', workers=2,
+            stdout=open(os.devnull, 'w'),
+        )
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('name', flat=True)),
+            ['Блины', 'Оладьи'],
+        )
+        with open(self.path + '.rejects', encoding='utf-8') as rejects:
+            rejected = [json.loads(line) for line in rejects]
+        self.assertEqual(
+            [item['line'] for item in rejected], [2, 3, 4, 5, 6, 7, 8]
+        )
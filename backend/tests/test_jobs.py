@@ -0,0 +1,76 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from jobs import queue
+from jobs.models import Job
+from jobs.queue import claim, prune_jobs, run_job, touch_job
+
+
+@override_settings(JOB_LEASE=60, JOB_RETENTION=60 * 60)
+class JobQueueTest(TestCase):
+    """
+    Задачи без сигнала обработчика повторяются только пока есть попытки,
+    задачи с продленной арендой не забираются, старые выполненные задачи
+    удаляются
+    """
+    def create_job(self, **fields):
+        return Job.objects.create(name='recipes.build_catalog', **fields)
+
+    def test_stale_job_without_attempts_fails(self):
+        expired = timezone.now() - timedelta(minutes=5)
+        exhausted = self.create_job(
+            status=Job.RUNNING, attempts=3, started_at=expired,
+            heartbeat_at=expired,
+        )
+        retried = self.create_job(
+            status=Job.RUNNING, attempts=1, started_at=expired,
+            heartbeat_at=expired,
+        )
+        job = claim()
+        self.assertEqual(job.pk, retried.pk)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(claim())
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertEqual(exhausted.attempts, 3)
+        self.assertIsNotNone(exhausted.finished_at)
+
+    def test_running_job_with_heartbeat_is_kept(self):
+        started_at = timezone.now() - timedelta(minutes=5)
+        job = self.create_job(
+            status=Job.RUNNING, attempts=1, started_at=started_at,
+            heartbeat_at=started_at,
+        )
+        self.assertTrue(touch_job(job))
+        self.assertIsNone(claim())
+
+    def test_result_of_reclaimed_job_is_dropped(self):
+        expired = timezone.now() - timedelta(minutes=5)
+        self.create_job(
+            status=Job.RUNNING, attempts=0, started_at=expired,
+            heartbeat_at=expired,
+        )
+        lost = claim()
+        Job.objects.filter(pk=lost.pk).update(heartbeat_at=expired)
+        current = claim()
+        self.assertEqual(current.attempts, lost.attempts + 1)
+        self.assertFalse(touch_job(lost))
+        with mock.patch.dict(
+            queue.registry, {lost.name: lambda: {'path': 'lost'}}
+        ):
+            run_job(lost)
+        current.refresh_from_db()
+        self.assertEqual(current.status, Job.RUNNING)
+        self.assertIsNone(current.result)
+
+    def test_prune_done_jobs(self):
+        old = timezone.now() - timedelta(hours=2)
+        self.create_job(status=Job.DONE, finished_at=old)
+        recent = self.create_job(status=Job.DONE, finished_at=timezone.now())
+        failed = self.create_job(status=Job.FAILED, finished_at=old)
+        self.assertEqual(prune_jobs(batch_size=1), 1)
+        self.assertQuerysetEqual(
+            Job.objects.order_by('pk'), [recent, failed], transform=None
+        )
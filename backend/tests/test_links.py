@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import TransactionTestCase
+from events.buffer import flush_events
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.stats import rebuild_author_stats
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+
+class ParallelLinkTest(TransactionTestCase):
+    """
+    Одновременные одинаковые запросы избранного, списка покупок
+    и подписки (двойное нажатие в клиенте): одна строка, один ответ 201,
+    остальные - 200
+    """
+    workers = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite в памяти не ждет блокировок, DB_TEST_NAME')
+        self.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        self.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Блины', text='Смешать и пожарить',
+            cooking_time=20, servings=2, image='recipes/images/test.png',
+        )
+        self.token = Token.objects.create(user=self.user).key
+        # строки статистики заранее: параллельные запросы только
+        # увеличивают счетчики, как в работающем сервисе
+        rebuild_author_stats([self.user.id, self.author.id])
+
+    def tearDown(self):
+        flush_events()
+
+    def post_parallel(self, path, data=None, **headers):
+        barrier = threading.Barrier(self.workers)
+
+        def post(_):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+            barrier.wait()
+            try:
+                return client.post(path, data, format='json', **headers)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            return list(executor.map(post, range(self.workers)))
+
+    def assert_single_create(self, responses):
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [200] * (self.workers - 1) + [201])
+
+    def test_favorite(self):
+        self.assert_single_create(self.post_parallel(
+            f'/api/v1/recipes/{self.recipe.id}/favorite/'
+        ))
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    def test_shopping_cart(self):
+        responses = self.post_parallel(
+            f'/api/v1/recipes/{self.recipe.id}/shopping_cart/',
+            {'servings': 4},
+        )
+        self.assert_single_create(responses)
+        self.assertEqual(responses[0].data['name'], 'Блины')
+        cart_item = ShoppingCart.objects.get()
+        self.assertEqual(cart_item.multiplier, 2)
+
+    def test_subscribe(self):
+        self.assert_single_create(self.post_parallel(
+            f'/api/v1/users/{self.author.id}/subscribe/'
+        ))
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_idempotency_key(self):
+        path = f'/api/v1/recipes/{self.recipe.id}/favorite/'
+        responses = self.post_parallel(path, HTTP_IDEMPOTENCY_KEY='tap-1')
+        executed = [
+            response for response in responses
+            if response.status_code == 201
+            and 'Idempotent-Replayed' not in response
+        ]
+        self.assertEqual(len(executed), 1)
+        self.assertTrue(all(
+            response.status_code in (201, 409) for response in responses
+        ))
+        self.assertEqual(Favorite.objects.count(), 1)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        replayed = client.post(path, HTTP_IDEMPOTENCY_KEY='tap-1')
+        self.assertEqual(replayed.status_code, 201)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed.data, executed[0].data)
+        other = client.post(
+            f'/api/v1/recipes/{self.recipe.id}/shopping_cart/',
+            HTTP_IDEMPOTENCY_KEY='tap-1',
+        )
+        self.assertEqual(other.status_code, 422)
+        self.assertFalse(ShoppingCart.objects.exists())
+
+
+class ShoppingCartServingsTest(TransactionTestCase):
+    """
+    Повторное добавление в список покупок с другим числом порций
+    меняет множитель существующей строки
+    """
+    def tearDown(self):
+        flush_events()
+
+    def test_repeat_with_servings(self):
+        user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        recipe = Recipe.objects.create(
+            author=user, name='Блины', text='Смешать и пожарить',
+            cooking_time=20, servings=2,
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        path = f'/api/v1/recipes/{recipe.id}/shopping_cart/'
+        self.assertEqual(client.post(path).status_code, 201)
+        self.assertEqual(ShoppingCart.objects.get().multiplier, 1)
+        response = client.post(path, {'servings': 6}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ShoppingCart.objects.get().multiplier, 3)
+        self.assertEqual(client.post(path).status_code, 200)
+        self.assertEqual(ShoppingCart.objects.get().multiplier, 3)
+        missing = client.post(f'/api/v1/recipes/{recipe.id + 1}/favorite/')
+        self.assertEqual(missing.status_code, 404)
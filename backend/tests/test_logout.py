@@ -0,0 +1,38 @@
+from api.v1.tokens import JWTObtainPairSerializer, revocation_list
+from api.v1.views import JWTLogoutView
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import User
+
+
+class JWTLogoutTest(TestCase):
+    """
+    Выход по JWT отзывает оба токена, при входе по токену DRF
+    возвращается 400, а не ошибка сервера
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        self.refresh = JWTObtainPairSerializer.get_token(self.user)
+
+    def logout(self, token):
+        request = APIRequestFactory().post(
+            '/api/v1/auth/jwt/logout/', {'refresh': str(self.refresh)},
+            format='json',
+        )
+        force_authenticate(request, self.user, token)
+        return JWTLogoutView.as_view()(request)
+
+    def test_drf_token(self):
+        token = Token.objects.create(user=self.user)
+        self.assertEqual(self.logout(token).status_code, 400)
+        self.assertFalse(revocation_list.is_revoked(self.refresh))
+
+    def test_jwt(self):
+        access = self.refresh.access_token
+        self.assertEqual(self.logout(access).status_code, 204)
+        self.assertTrue(revocation_list.is_revoked(self.refresh))
+        self.assertTrue(revocation_list.is_revoked(access))
@@ -0,0 +1,79 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+from events.buffer import flush_events
+from recipes import meal_plans
+from recipes.models import AuthorStats, MealPlan, Recipe, ShoppingCart
+from recipes.stats import rebuild_author_stats
+from rest_framework.test import APIClient
+from users.models import User
+
+
+class PlanToShoppingCartTest(TestCase):
+    """
+    Перенос плана в список покупок считает добавленными только
+    вставленные им строки
+    """
+    path = '/api/v1/meal-plans/to_shopping_cart/'
+    period = {'start': '2026-10-19', 'end': '2026-10-25'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.user, name=name, text='Приготовить',
+                cooking_time=10, servings=2,
+            )
+            for name in ('Блины', 'Суп')
+        ]
+        for recipe in cls.recipes:
+            MealPlan.objects.create(
+                user=cls.user, date=date(2026, 10, 20),
+                slot=MealPlan.DINNER, recipe=recipe, servings=4,
+            )
+        rebuild_author_stats([cls.user.id])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        flush_events()
+
+    def test_added(self):
+        response = self.client.post(self.path, self.period, format='json')
+        self.assertEqual((response.data['added'], response.data['updated']),
+                         (2, 0))
+        response = self.client.post(self.path, self.period, format='json')
+        self.assertEqual((response.data['added'], response.data['updated']),
+                         (0, 0))
+        stats = AuthorStats.objects.get(author=self.user)
+        self.assertEqual(stats.shopping_cart_count, 2)
+
+    def test_row_inserted_concurrently(self):
+        ShoppingCart.objects.create(
+            user=self.user, recipe=self.recipes[0], multiplier=1
+        )
+        rebuild_author_stats([self.user.id])
+        # параллельный запрос вставил строку после выборки
+        # существующих строк
+        locked = meal_plans.locked_cart_items
+        with mock.patch.object(
+            meal_plans, 'locked_cart_items',
+            side_effect=[{}, locked(self.user, [self.recipes[0].id])],
+        ):
+            response = self.client.post(
+                self.path, self.period, format='json'
+            )
+        self.assertEqual((response.data['added'], response.data['updated']),
+                         (1, 1))
+        self.assertEqual(
+            ShoppingCart.objects.get(recipe=self.recipes[0]).multiplier, 2
+        )
+        stats = AuthorStats.objects.get(author=self.user)
+        self.assertEqual(stats.shopping_cart_count, 2)
@@ -0,0 +1,162 @@
+import tempfile
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from events.models import Event, HourlyRollup
+from events.rollups import ROLLUP_CHECKPOINT, floor_hour
+from recipes.models import (Checkpoint, Favorite, Ingredient, Recipe,
+                            RecipeScore, ShoppingCart, Tag)
+from recipes.scores import ensure_recipe_scores, update_recipe_scores
+from rest_framework.test import APIClient
+from users.models import User
+
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+@override_settings(EVENTS_ROLLUP_LATENESS=0)
+class RecipeScoreTest(TestCase):
+    """
+    Оценки обновляются по сводкам событий с отметки прошлого запуска,
+    сортировка по ним идет от RecipeScore без внешнего соединения
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        cls.readers = [
+            User.objects.create_user(
+                email=f'reader{number}@foodgram.ru',
+                username=f'reader{number}', first_name='Иван',
+                last_name='Иванов', password='pass12345x',
+            )
+            for number in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=name, text='Приготовить',
+                cooking_time=10,
+            )
+            for name in ('Блины', 'Суп', 'Каша')
+        ]
+        ensure_recipe_scores(recipe.id for recipe in cls.recipes)
+
+    def get_score(self, recipe):
+        return RecipeScore.objects.get(recipe=recipe)
+
+    def set_rollups_until(self, moment):
+        Checkpoint.objects.update_or_create(
+            name=ROLLUP_CHECKPOINT,
+            defaults={'position': int(moment.timestamp())},
+        )
+
+    def add_rollup(self, bucket, kind, recipe, count=1):
+        HourlyRollup.objects.create(
+            bucket=bucket, kind=kind, recipe_id=recipe.id,
+            author_id=recipe.author_id, count=count,
+        )
+
+    def test_deltas_since_checkpoint(self):
+        pancakes, soup, _ = self.recipes
+        start = floor_hour(timezone.now()) - timedelta(hours=10)
+        Favorite.objects.create(user=self.readers[0], recipe=soup)
+        self.set_rollups_until(start)
+        self.assertEqual(update_recipe_scores(), 3)
+        self.assertEqual(self.get_score(soup).popularity, 2)
+        # час до отметки уже учтен полным пересчетом
+        self.add_rollup(start - timedelta(hours=1), Event.FAVORITE_ADDED, soup)
+        self.add_rollup(start, Event.FAVORITE_ADDED, soup, count=2)
+        self.add_rollup(start, Event.CART_ADDED, pancakes)
+        self.add_rollup(
+            start + timedelta(hours=1), Event.FAVORITE_REMOVED, soup
+        )
+        self.add_rollup(start + timedelta(hours=5), Event.CART_ADDED, soup)
+        self.set_rollups_until(start + timedelta(hours=2))
+        self.assertEqual(update_recipe_scores(), 2)
+        self.assertEqual(self.get_score(soup).popularity, 4)
+        self.assertEqual(self.get_score(pancakes).popularity, 1)
+        self.assertEqual(update_recipe_scores(), 0)
+        self.set_rollups_until(start + timedelta(hours=6))
+        update_recipe_scores()
+        self.assertEqual(self.get_score(soup).popularity, 5)
+        self.add_rollup(
+            start + timedelta(hours=6), Event.FAVORITE_REMOVED, soup, count=3
+        )
+        self.set_rollups_until(start + timedelta(hours=7))
+        update_recipe_scores()
+        self.assertEqual(self.get_score(soup).popularity, 0)
+        self.assertEqual(self.get_score(soup).trending, 0)
+
+    def test_full_skips_unsettled_hours(self):
+        soup = self.recipes[1]
+        start = floor_hour(timezone.now()) - timedelta(hours=10)
+        self.set_rollups_until(start)
+        for reader in self.readers:
+            Favorite.objects.create(user=reader, recipe=soup)
+        self.add_rollup(start, Event.FAVORITE_ADDED, soup, count=3)
+        update_recipe_scores(full=True)
+        self.assertEqual(self.get_score(soup).popularity, 0)
+        self.set_rollups_until(start + timedelta(hours=1))
+        update_recipe_scores()
+        self.assertEqual(self.get_score(soup).popularity, 6)
+
+    def test_removal_lowers_trending(self):
+        soup = self.recipes[1]
+        start = floor_hour(timezone.now()) - timedelta(hours=10)
+        self.set_rollups_until(start)
+        update_recipe_scores()
+        self.add_rollup(start, Event.FAVORITE_ADDED, soup, count=3)
+        self.set_rollups_until(start + timedelta(hours=1))
+        update_recipe_scores()
+        before = self.get_score(soup).trending
+        self.add_rollup(
+            start + timedelta(hours=1), Event.FAVORITE_REMOVED, soup
+        )
+        self.set_rollups_until(start + timedelta(hours=2))
+        update_recipe_scores()
+        self.assertLess(self.get_score(soup).trending, before)
+        self.assertEqual(self.get_score(soup).popularity, 4)
+
+    def test_ordering(self):
+        pancakes, soup, porridge = self.recipes
+        Favorite.objects.create(user=self.readers[0], recipe=soup)
+        ShoppingCart.objects.create(user=self.readers[0], recipe=pancakes)
+        update_recipe_scores()
+        egg = Ingredient.objects.create(name='яйцо', measurement_unit='шт')
+        tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root
+        ):
+            created = client.post('/api/v1/recipes/', {
+                'name': 'Омлет', 'text': 'Взбить и пожарить',
+                'cooking_time': 5, 'image': PIXEL,
+                'ingredients': [{'id': egg.id, 'amount': 2}],
+                'tags': [tag.id],
+            }, format='json')
+        self.assertEqual(created.status_code, 201, created.data)
+        for value in ('popular', 'trending'):
+            with self.subTest(ordering=value), CaptureQueriesContext(
+                connection
+            ) as queries:
+                response = client.get(
+                    '/api/v1/recipes/', {'ordering': value}
+                )
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.data['results']],
+                    [soup.id, pancakes.id, created.data['id'], porridge.id],
+                )
+                self.assertFalse(any(
+                    'LEFT OUTER JOIN "recipes_recipescore"' in query['sql']
+                    for query in queries
+                ))
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from recipes.models import Ingredient
+from recipes.search import (get_index, search_ingredient_ids,
+                            set_similarity_threshold, trigram_search)
+from rest_framework.test import APIClient
+
+OTHER_WORKER_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'other-worker',
+    }
+}
+
+
+@override_settings(CATALOG_SNAPSHOT_DIR=None)
+class IngredientSearchTest(TestCase):
+    """
+    Нечеткий поиск ингредиентов: пересечение с остальными фильтрами,
+    ё в названиях и порог сходства на PostgreSQL
+    """
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('мука пшеничная', 'медовик', 'мёд', 'мускат'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def test_name_filter_keeps_search(self):
+        response = APIClient().get(
+            '/api/v1/ingredients/', {'name': 'мед', 'search': 'мё'}
+        )
+        self.assertEqual([item['name'] for item in response.data], ['мёд'])
+
+    def test_index_follows_other_process(self):
+        get_index()
+        with override_settings(CACHES=OTHER_WORKER_CACHES):
+            Ingredient.objects.create(name='ёжевика', measurement_unit='г')
+        self.assertEqual(
+            Ingredient.objects.get(pk=search_ingredient_ids('ежевика')[0])
+            .name,
+            'ёжевика',
+        )
+
+    def test_trigram_search_folds_yo(self):
+        sql = str(trigram_search(['мед'], 5).query)
+        self.assertIn(
+            'translate("recipes_ingredient"."name", \'Ёё\', \'Ее\') % мед',
+            sql,
+        )
+        self.assertNotIn('"recipes_ingredient"."name" %', sql)
+
+    @override_settings(INGREDIENT_SEARCH_THRESHOLD=0.2)
+    def test_similarity_threshold(self):
+        connection = mock.MagicMock(vendor='postgresql')
+        set_similarity_threshold(connection)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, false)",
+            ['0.2'],
+        )
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(CATALOG_SNAPSHOT_DIR=None)
+class ScaledRecipeTest(TestCase):
+    """
+    Пересчет рецепта на порции после изменения состава: кеш
+    не отдает старые количества и не падает на новых ингредиентах
+    """
+    def setUp(self):
+        author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        self.flour = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        self.milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Блины', text='Смешать и пожарить',
+            cooking_time=20, servings=4,
+        )
+        IngredientsInRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.flour, amount=250
+        )
+        self.path = f'/api/v1/recipes/{self.recipe.id}/?servings=8'
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_amounts(self):
+        response = APIClient().get(self.path)
+        self.assertEqual(response.status_code, 200)
+        return {
+            item['id']: item['amount']
+            for item in response.json()['ingredients']
+        }
+
+    def test_changed_ingredients(self):
+        self.assertEqual(self.get_amounts(), {self.flour.id: 500})
+        IngredientsInRecipe.objects.filter(recipe=self.recipe).delete()
+        IngredientsInRecipe.objects.bulk_create([
+            IngredientsInRecipe(
+                recipe=self.recipe, ingredient=self.flour, amount=300
+            ),
+            IngredientsInRecipe(
+                recipe=self.recipe, ingredient=self.milk, amount=100
+            ),
+        ])
+        self.assertEqual(
+            self.get_amounts(), {self.flour.id: 600, self.milk.id: 200}
+        )
+
+    def test_changed_servings(self):
+        self.assertEqual(self.get_amounts(), {self.flour.id: 500})
+        Recipe.objects.filter(pk=self.recipe.pk).update(servings=2)
+        self.assertEqual(self.get_amounts(), {self.flour.id: 1000})
@@ -0,0 +1,74 @@
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from jobs.models import Job
+from recipes import shopping_list
+from recipes.models import (Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, ShoppingListExport)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(CATALOG_SNAPSHOT_DIR=None)
+class ShoppingListExportTest(TestCase):
+    """
+    Готовый файл списка покупок находится по составу корзины без
+    расчета списка, старые файлы удаляет фоновая задача
+    """
+    path = '/api/v1/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Блины', text='Смешать и пожарить',
+            cooking_time=20,
+        )
+        flour = Ingredient.objects.create(name='мука', measurement_unit='г')
+        IngredientsInRecipe.objects.create(
+            recipe=recipe, ingredient=flour, amount=200
+        )
+        cls.cart = ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.token = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def download(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_cached_file_skips_list(self):
+        with mock.patch.object(
+            shopping_list, 'get_shopping_list',
+            wraps=shopping_list.get_shopping_list,
+        ) as get_shopping_list:
+            self.assertEqual(self.download(), 'мука (г) - 200\n')
+            self.assertEqual(self.download(), 'мука (г) - 200\n')
+            self.assertEqual(get_shopping_list.call_count, 1)
+            self.cart.multiplier = 2
+            self.cart.save()
+            self.assertEqual(self.download(), 'мука (г) - 400\n')
+            self.assertEqual(get_shopping_list.call_count, 2)
+        self.assertEqual(ShoppingListExport.objects.count(), 2)
+
+    @override_settings(SHOPPING_LIST_EXPORT_TTL=0)
+    def test_purge_runs_in_background(self):
+        self.download()
+        jobs = Job.objects.filter(name=shopping_list.PURGE_EXPORTS_TASK)
+        self.assertEqual(jobs.count(), 1)
+        self.assertEqual(ShoppingListExport.objects.count(), 1)
+        self.assertEqual(shopping_list.purge_exports(), 1)
+        self.assertFalse(ShoppingListExport.objects.exists())
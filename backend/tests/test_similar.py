@@ -0,0 +1,47 @@
+from django.test import TestCase
+from recipes.models import Recipe, SimilarRecipe
+from recipes.purge import soft_delete_recipes
+from rest_framework.test import APIClient
+from users.models import User
+
+
+class SimilarRecipesTest(TestCase):
+    """
+    Похожие рецепты: 404 для нечислового, несуществующего
+    и удаленного рецепта
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        cls.recipe, cls.neighbor = (
+            Recipe.objects.create(
+                author=author, name=name, text='Приготовить',
+                cooking_time=10,
+            )
+            for name in ('Блины', 'Оладьи')
+        )
+        SimilarRecipe.objects.create(
+            recipe=cls.recipe, similar=cls.neighbor, score=0.9
+        )
+
+    def get_similar(self, pk):
+        return APIClient().get(f'/api/v1/recipes/{pk}/similar/')
+
+    def test_similar(self):
+        response = self.get_similar(self.recipe.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data], [self.neighbor.pk]
+        )
+
+    def test_missing_recipe(self):
+        self.assertEqual(self.get_similar('abc').status_code, 404)
+        missing = self.neighbor.pk + 1
+        self.assertEqual(self.get_similar(missing).status_code, 404)
+
+    def test_deleted_recipe(self):
+        soft_delete_recipes(Recipe.objects.filter(pk=self.recipe.pk))
+        self.assertEqual(self.get_similar(self.recipe.pk).status_code, 404)
@@ -0,0 +1,148 @@
+from django.test import TestCase
+from events.buffer import flush_events
+from events.models import Event
+from jobs.models import Job
+from recipes.models import AuthorStats, Favorite, Recipe, ShoppingCart
+from recipes.purge import purge_deleted, soft_delete_recipes, soft_delete_user
+from recipes.stats import (RECONCILE_TASK, rebuild_author_stats,
+                           reconcile_author_stats)
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+
+class PurgeReconcileTest(TestCase):
+    """
+    Удаления в обход путей записи (админка, удаление пользователя)
+    исправляются сверкой, которую ставит очистка удаленных
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@foodgram.ru', username='reader',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=name, text='Приготовить',
+                cooking_time=10,
+            )
+            for name in ('Блины', 'Суп')
+        ]
+        for recipe in cls.recipes:
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        rebuild_author_stats([cls.author.id, cls.reader.id])
+
+    def reconcile(self):
+        jobs = Job.objects.filter(name=RECONCILE_TASK, status=Job.QUEUED)
+        self.assertEqual(jobs.count(), 1)
+        jobs.delete()
+        reconcile_author_stats()
+        return AuthorStats.objects.get(author=self.author)
+
+    def test_soft_deleted_user(self):
+        soft_delete_user(self.reader)
+        purge_deleted()
+        stats = self.reconcile()
+        self.assertEqual(
+            (
+                stats.recipes_count, stats.favorites_count,
+                stats.shopping_cart_count, stats.followers_count,
+            ),
+            (2, 0, 0, 0),
+        )
+
+    def test_soft_deleted_recipes(self):
+        soft_delete_recipes(Recipe.objects.filter(pk=self.recipes[0].pk))
+        purge_deleted()
+        stats = self.reconcile()
+        self.assertEqual(
+            (
+                stats.recipes_count, stats.favorites_count,
+                stats.shopping_cart_count, stats.followers_count,
+            ),
+            (1, 1, 0, 1),
+        )
+
+    def test_nothing_purged(self):
+        purge_deleted()
+        self.assertFalse(Job.objects.filter(name=RECONCILE_TASK).exists())
+
+
+class UnlinkRecipeTest(TestCase):
+    """
+    Удаление из избранного и списка покупок уменьшает счетчики автора
+    и пишет событие с автором. Связи удаленного рецепта уже вычтены
+    из статистики, повторное удаление связи их не уменьшает
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Петр', last_name='Петров', password='pass12345x',
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@foodgram.ru', username='reader',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=name, text='Приготовить',
+                cooking_time=10,
+            )
+            for name in ('Блины', 'Суп')
+        ]
+        for recipe in cls.recipes:
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+        rebuild_author_stats([cls.author.id])
+
+    def tearDown(self):
+        flush_events()
+
+    def test_unlink_deleted_recipe(self):
+        recipe = self.recipes[0]
+        author = APIClient()
+        author.force_authenticate(self.author)
+        reader = APIClient()
+        reader.force_authenticate(self.reader)
+        self.assertEqual(
+            author.delete(f'/api/v1/recipes/{recipe.id}/').status_code, 204
+        )
+        for action in ('favorite', 'shopping_cart'):
+            response = reader.delete(f'/api/v1/recipes/{recipe.id}/{action}/')
+            self.assertEqual(response.status_code, 404)
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(
+            (
+                stats.recipes_count, stats.favorites_count,
+                stats.shopping_cart_count,
+            ),
+            (1, 1, 1),
+        )
+
+    def test_unlink_records_author(self):
+        recipe = self.recipes[1]
+        reader = APIClient()
+        reader.force_authenticate(self.reader)
+        for action in ('favorite', 'shopping_cart'):
+            response = reader.delete(f'/api/v1/recipes/{recipe.id}/{action}/')
+            self.assertEqual(response.status_code, 204)
+        flush_events()
+        events = Event.objects.values_list('kind', 'recipe_id', 'author_id')
+        self.assertEqual(
+            sorted(events),
+            [
+                (Event.CART_REMOVED, recipe.id, self.author.id),
+                (Event.FAVORITE_REMOVED, recipe.id, self.author.id),
+            ],
+        )
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(
+            (stats.favorites_count, stats.shopping_cart_count), (1, 1)
+        )
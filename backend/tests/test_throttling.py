@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from api.v1.throttling import (AnonBucketThrottle, CacheBucketStore,
+                               LocalBucketStore)
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class BucketStoreTest(SimpleTestCase):
+    """
+    Корзины токенов: общий кеш не выдает лишних токенов одновременным
+    запросам, память процесса ограничена
+    """
+    def tearDown(self):
+        cache.clear()
+
+    def test_cache_store_parallel(self):
+        store = CacheBucketStore()
+        barrier = threading.Barrier(16)
+
+        def consume(_):
+            barrier.wait()
+            return store.consume('throttle_test', 10, 1 / 60, 1000.0)
+
+        original_get = LocMemCache.get
+
+        def slow_get(self, *args, **kwargs):
+            value = original_get(self, *args, **kwargs)
+            time.sleep(0.001)
+            return value
+
+        with mock.patch.object(LocMemCache, 'get', slow_get), \
+                ThreadPoolExecutor(16) as executor:
+            waits = list(executor.map(consume, range(16)))
+        self.assertEqual(waits.count(0), 10)
+
+    def test_local_store_is_bounded(self):
+        store = LocalBucketStore()
+        store.max_keys = 100
+        for number in range(1000):
+            store.consume(f'client-{number}', 10, 1 / 60, 1000.0)
+        self.assertEqual(len(store.buckets), 100)
+        self.assertIn('client-999', store.buckets)
+
+
+class ClientIdentTest(SimpleTestCase):
+    """
+    Анонимы за nginx различаются по X-Forwarded-For
+    """
+    def get_key(self, forwarded_for):
+        request = APIRequestFactory().get(
+            '/api/v1/recipes/',
+            REMOTE_ADDR='172.18.0.5',
+            HTTP_X_FORWARDED_FOR=forwarded_for,
+        )
+        request = Request(request)
+        request.user = AnonymousUser()
+        return AnonBucketThrottle().get_cache_key(request, None)
+
+    def test_forwarded_for(self):
+        self.assertNotEqual(
+            self.get_key('203.0.113.7'), self.get_key('198.51.100.2')
+        )
+        self.assertIn('198.51.100.2', self.get_key('10.0.0.1, 198.51.100.2'))
@@ -0,0 +1,56 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.v1.tokens import (BloomFilter, JWTObtainPairSerializer,
+                           JWTRefreshSerializer, revocation_list)
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework_simplejwt.exceptions import InvalidToken
+from users.models import User
+
+
+class RefreshRotationTest(TransactionTestCase):
+    """
+    Обмененный refresh-токен нельзя обменять еще раз ни в другом
+    процессе до синхронизации фильтра отзыва, ни одновременным запросом
+    """
+    def setUp(self):
+        user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Иван', last_name='Иванов', password='pass12345x',
+        )
+        self.refresh = str(JWTObtainPairSerializer.get_token(user))
+
+    def refresh_token(self, token):
+        serializer = JWTRefreshSerializer(data={'refresh': token})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['refresh']
+
+    def test_replay_before_sync(self):
+        self.assertNotEqual(self.refresh_token(self.refresh), self.refresh)
+        # другой процесс: фильтр еще не знает об отзыве
+        revocation_list.bloom = BloomFilter()
+        revocation_list.synced_at = time.monotonic()
+        with self.assertRaises(InvalidToken):
+            self.refresh_token(self.refresh)
+
+    def test_parallel_refresh(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite в памяти не ждет блокировок, DB_TEST_NAME')
+        workers = 6
+        barrier = threading.Barrier(workers)
+
+        def refresh(_):
+            barrier.wait()
+            try:
+                self.refresh_token(self.refresh)
+                return True
+            except InvalidToken:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(refresh, range(workers)))
+        self.assertEqual(results.count(True), 1)
@@ -1,4 +1,6 @@
+from api.admin_tools import AutocompleteFilter, FastChangeListMixin
 from django.contrib import admin
+from recipes.purge import soft_delete_user
 
 from .models import Follow, User
 
@@ -21,9 +23,16 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ('username', 'email',)
     empty_value_display = '-пусто-'
 
+    def delete_model(self, request, obj):
+        soft_delete_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            soft_delete_user(user)
+
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(FastChangeListMixin, admin.ModelAdmin):
     """
     Панель админа для редактирования подписок на авторов
     со всеми необходимыми полями, фильтрами и поисками
@@ -33,6 +42,11 @@ class FollowAdmin(admin.ModelAdmin):
         'author',
     )
     list_display_links = ('user',)
-    search_fields = ('user', 'author',)
-    list_filter = ('user',)
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username',)
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('author', AutocompleteFilter),
+    )
+    autocomplete_fields = ('user', 'author')
     empty_value_display = '-пусто-'
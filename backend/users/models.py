@@ -1,11 +1,19 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 
 
+class ActiveUserManager(UserManager):
+    """
+    Менеджер пользователей без помеченных на удаление
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class User(AbstractUser):
     '''
-    Модель пользователя с добавлением ролей
+    Модель пользователя с добавлением ролей и мягким удалением
     '''
     USER = 'user'
     ADMIN = 'admin'
@@ -27,6 +35,17 @@ class User(AbstractUser):
         max_length=30, choices=ROLES,
         default='user', verbose_name='Роль'
     )
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Помечен на удаление'
+    )
+
+    objects = ActiveUserManager()
+    all_objects = UserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -71,3 +90,25 @@ class Follow(models.Model):
                 name='unique_follow'
             ),
         ]
+
+
+class RevokedToken(models.Model):
+    """
+    Отозванные JWT-токены (по jti) до истечения их срока действия
+    """
+    jti = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Идентификатор токена'
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name='Истекает'
+    )
+
+    class Meta:
+        verbose_name = 'Отозванный токен'
+        verbose_name_plural = 'Отозванные токены'
+
+    def __str__(self):
+        return self.jti